@@ -0,0 +1,135 @@
+"""
+Registro diferido del último acceso de las sesiones.
+
+El middleware anota en memoria el momento del último request de cada
+sesión y un hilo del proceso lo vuelca con un único UPDATE por lote cada
+AUDITORIA_SESION_FLUSH_INTERVAL segundos, en lugar de leer y reescribir
+la fila de SesionUsuario en cada request. El volcado no depende de que
+lleguen más requests: un worker inactivo también escribe lo pendiente.
+
+Al terminar el proceso de forma ordenada se vuelca lo pendiente (atexit).
+Si termina de forma abrupta (SIGKILL, reciclado forzado del worker) se
+pierden a lo sumo los accesos del último intervalo; la sesión conserva
+el último acceso ya escrito.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+
+from .models import SesionUsuario
+
+logger = logging.getLogger(__name__)
+
+
+class BufferAccesos:
+    """Acumula el último acceso por sesión y lo escribe en lote"""
+
+    def __init__(self, intervalo=60.0, lote=500):
+        self.intervalo = intervalo
+        self.lote = lote
+        self._pendientes = {}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._pid = None
+
+    def registrar(self, session_key, usuario_id, momento=None):
+        """Anota un acceso, sin consultas; el hilo del buffer lo escribe"""
+        self._asegurar_hilo()
+        momento = momento or timezone.now()
+        with self._lock:
+            self._pendientes[session_key] = (usuario_id, momento)
+
+    def pendientes(self):
+        return len(self._pendientes)
+
+    def detener(self, timeout=10.0):
+        """Detiene el hilo y vuelca los accesos pendientes"""
+        self._detener.set()
+        if self._hilo and self._hilo.is_alive():
+            self._hilo.join(timeout)
+        self.flush()
+
+    def flush(self):
+        """Escribe los accesos pendientes. Retorna las filas actualizadas"""
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+
+        claves = list(pendientes)
+        actualizadas = 0
+        for inicio in range(0, len(claves), self.lote):
+            actualizadas += self._actualizar({k: pendientes[k] for k in claves[inicio:inicio + self.lote]})
+        return actualizadas
+
+    def _asegurar_hilo(self):
+        # Tras un fork (gunicorn --preload) el hilo del padre no existe en el hijo
+        if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+            return
+
+        with self._lock:
+            if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(
+                target=self._ejecutar,
+                name='auditoria-accesos',
+                daemon=True
+            )
+            self._hilo.start()
+
+    def _ejecutar(self):
+        try:
+            while not self._detener.wait(self.intervalo):
+                if self._pendientes:
+                    close_old_connections()
+                    self.flush()
+        finally:
+            connection.close()
+
+    def _actualizar(self, pendientes):
+        # Cada sesión recibe su propio momento; la condición sobre el usuario
+        # evita tocar una sesión reasignada a otra cuenta
+        casos = [
+            When(session_key=session_key, usuario_id=usuario_id, then=Value(momento))
+            for session_key, (usuario_id, momento) in pendientes.items()
+        ]
+        try:
+            with transaction.atomic():
+                return SesionUsuario.objects.filter(
+                    session_key__in=list(pendientes),
+                    activa=True
+                ).update(
+                    fecha_ultimo_acceso=Case(
+                        *casos,
+                        default=F('fecha_ultimo_acceso'),
+                        output_field=DateTimeField()
+                    )
+                )
+        except DatabaseError:
+            logger.exception('Error al actualizar el último acceso de %d sesiones', len(pendientes))
+            return 0
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer_accesos():
+    """Retorna el buffer del proceso, creándolo según la configuración"""
+    global _buffer
+
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BufferAccesos(
+                    intervalo=getattr(settings, 'AUDITORIA_SESION_FLUSH_INTERVAL', 60.0)
+                )
+                atexit.register(_buffer.detener)
+    return _buffer
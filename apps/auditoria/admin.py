@@ -1,5 +1,7 @@
 from django.contrib import admin
+from .busqueda import buscar_logs
 from .models import AuditoriaLog, SesionUsuario
+from .utils import reconstruir_estados
 
 
 @admin.register(AuditoriaLog)
@@ -18,9 +20,9 @@ class AuditoriaLogAdmin(admin.ModelAdmin):
         'timestamp',
         'content_type'
     ]
+    # Muestra el buscador; la búsqueda la resuelve get_search_results
     search_fields = [
         'usuario__email', 
-        'descripcion', 
         'direccion_ip'
     ]
     readonly_fields = [
@@ -31,12 +33,39 @@ class AuditoriaLogAdmin(admin.ModelAdmin):
         'accion', 
         'content_type', 
         'object_id',
-        'descripcion', 
+        'descripcion_completa', 
         'datos_anteriores', 
         'datos_nuevos',
+        'estado_anterior',
+        'estado_nuevo',
         'exito'
     ]
     
+    @admin.display(description='Descripción')
+    def descripcion_completa(self, obj):
+        return obj.texto_descripcion
+    
+    def _estados(self, obj):
+        # Una sola reconstrucción por log para ambos campos
+        if not hasattr(obj, '_estados_completos'):
+            obj._estados_completos = reconstruir_estados(obj)
+        return obj._estados_completos
+    
+    @admin.display(description='Estado anterior completo')
+    def estado_anterior(self, obj):
+        return self._estados(obj)[0]
+    
+    @admin.display(description='Estado nuevo completo')
+    def estado_nuevo(self, obj):
+        return self._estados(obj)[1]
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Misma búsqueda que la API: IP, red, email o texto renderizado
+        termino = search_term.strip()
+        if not termino:
+            return queryset, False
+        return buscar_logs(queryset, termino), False
+    
     def has_add_permission(self, request):
         return False
     
@@ -67,6 +96,7 @@ class SesionUsuarioAdmin(admin.ModelAdmin):
     ]
     readonly_fields = [
         'session_key',
+        'user_agent',
         'fecha_inicio', 
         'fecha_ultimo_acceso',
         'fecha_cierre'
@@ -0,0 +1,115 @@
+"""
+Resolución de User-Agents a ids de AgenteUsuario.
+
+Los textos se identifican por su sha256. Los ids ya conocidos se guardan
+en una caché LRU del proceso, de modo que los agentes frecuentes no
+consultan la base de datos. La caché solo se alimenta después del commit
+para no retener ids de filas revertidas.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import AgenteUsuario
+
+
+def hash_agente(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class CacheAgentes:
+    """Caché LRU hash -> id de AgenteUsuario"""
+
+    def __init__(self, capacidad=1024):
+        self.capacidad = capacidad
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, hash_texto):
+        with self._lock:
+            agente_id = self._ids.get(hash_texto)
+            if agente_id is not None:
+                self._ids.move_to_end(hash_texto)
+            return agente_id
+
+    def guardar(self, ids):
+        with self._lock:
+            for hash_texto, agente_id in ids.items():
+                self._ids[hash_texto] = agente_id
+                self._ids.move_to_end(hash_texto)
+            while len(self._ids) > self.capacidad:
+                self._ids.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._ids.clear()
+
+    def __len__(self):
+        return len(self._ids)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache_agentes():
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheAgentes(getattr(settings, 'AUDITORIA_AGENTES_CACHE_SIZE', 1024))
+    return _cache
+
+
+def obtener_ids(textos, modelo=AgenteUsuario):
+    """
+    Retorna {hash: id} de los textos dados, creando los que no existen.
+
+    `modelo` permite usar la versión histórica del modelo en migraciones.
+    """
+    por_hash = {hash_agente(texto): texto for texto in textos}
+    if not por_hash:
+        return {}
+
+    ids = dict(modelo.objects.filter(hash__in=list(por_hash)).values_list('hash', 'id'))
+    faltantes = [modelo(hash=h, texto=texto) for h, texto in por_hash.items() if h not in ids]
+    if faltantes:
+        # Otro proceso puede insertar el mismo agente a la vez
+        modelo.objects.bulk_create(faltantes, ignore_conflicts=True)
+        ids.update(
+            modelo.objects.filter(hash__in=[agente.hash for agente in faltantes])
+            .values_list('hash', 'id')
+        )
+    return ids
+
+
+def resolver_agentes(objetos):
+    """Asigna agente_id a los objetos con un user_agent pendiente de resolver"""
+    cache = get_cache_agentes()
+    sin_resolver = []
+
+    for objeto in objetos:
+        if not objeto.__dict__.pop('_user_agent_pendiente', False):
+            continue
+        texto = objeto.__dict__['_user_agent']
+        if not texto:
+            objeto.agente_id = None
+            continue
+        agente_id = cache.obtener(hash_agente(texto))
+        if agente_id is None:
+            sin_resolver.append(objeto)
+        else:
+            objeto.agente_id = agente_id
+
+    if not sin_resolver:
+        return
+
+    ids = obtener_ids({objeto.__dict__['_user_agent'] for objeto in sin_resolver})
+    for objeto in sin_resolver:
+        objeto.agente_id = ids[hash_agente(objeto.__dict__['_user_agent'])]
+
+    transaction.on_commit(lambda: cache.guardar(ids))
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class AuditoriaConfig(AppConfig):
@@ -8,3 +9,17 @@ class AuditoriaConfig(AppConfig):
 
     def ready(self):
         import apps.auditoria.signals
+        from .registro import registro
+        registro.cargar_configuracion()
+        # Mantiene la tabla de plantillas al día con PLANTILLAS
+        post_migrate.connect(_sincronizar_plantillas, sender=self)
+
+
+def _sincronizar_plantillas(sender, using, apps=None, **kwargs):
+    from .plantillas import sincronizar_plantillas
+    try:
+        modelo = apps.get_model('auditoria', 'PlantillaDescripcion') if apps else None
+    except LookupError:
+        # Migraciones revertidas a un estado sin la tabla de plantillas
+        return
+    sincronizar_plantillas(using=using, modelo=modelo)
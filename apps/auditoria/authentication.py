@@ -1,10 +1,18 @@
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
-from django.contrib.auth import authenticate
-from apps.auditoria.models import AuditoriaLog, TipoAccion
+from rest_framework import permissions, status
+from django.contrib.auth.models import update_last_login
+from apps.auditoria.contadores import espera_login
+from apps.auditoria.login import PoolHashingSaturado, autenticar
+from apps.auditoria.revocacion import get_revocacion_tokens
+from apps.auditoria.signals import registrar_login
 from apps.auditoria.utils import obtener_datos_request
+from core.throttling import CuboTokensThrottle
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -22,39 +30,94 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
-    """Vista personalizada para login con auditoría"""
+    """
+    Vista personalizada para login con auditoría.
+
+    Autentica una sola vez (ver login.py) y emite el par de tokens para ese
+    usuario, sin volver a validar las credenciales con el serializer.
+    """
     
     serializer_class = CustomTokenObtainPairSerializer
+    # Se evalúa antes de post(): un login rechazado no consulta ni hashea
+    throttle_classes = [CuboTokensThrottle]
+    throttle_scope = 'login'
     
     def post(self, request, *args, **kwargs):
-        # Obtener datos del request
-        ip, user_agent = obtener_datos_request(request)
         email = request.data.get('email', '')
         
-        # Intentar autenticar
-        user = authenticate(
-            request=request,
-            username=email,
-            password=request.data.get('password', '')
-        )
-        
-        if user is not None:
-            # Login exitoso - el signal user_logged_in se encargará del log
-            response = super().post(request, *args, **kwargs)
-            
-            if response.status_code == 200:
-                # Agregar información adicional a la respuesta
-                response.data['user'] = {
-                    'id': user.id,
-                    'email': user.email,
-                    'is_staff': user.is_staff,
-                    'date_joined': user.date_joined.isoformat()
-                }
-            
-            return response
-        else:
+        # Una IP o email con demasiados fallos recientes no llega al hasher
+        ip, _ = obtener_datos_request(request)
+        espera = espera_login(ip, email)
+        if espera:
+            return Response(
+                {'detail': 'Demasiados intentos fallidos, intente más tarde'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(espera)}
+            )
+        
+        try:
+            user = autenticar(
+                request,
+                email,
+                request.data.get('password', '')
+            )
+        except PoolHashingSaturado:
+            return Response(
+                {'detail': 'Servicio de login ocupado, intente nuevamente'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'}
+            )
+        
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
             # Login fallido - se registra automáticamente por el signal
             return Response(
                 {'detail': 'Credenciales inválidas'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
+        
+        refresh = self.get_serializer_class().get_token(user)
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        
+        # El login JWT no emite user_logged_in: el log se registra aquí
+        registrar_login(request, user)
+        
+        return Response({
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'user': {
+                'id': user.id,
+                'email': user.email,
+                'is_staff': user.is_staff,
+                'date_joined': user.date_joined.isoformat()
+            }
+        })
+
+
+class RevocarTokenView(APIView):
+    """
+    Logout JWT: revoca el access token del request y, si se envía, el
+    refresh token del mismo usuario.
+    """
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        revocacion = get_revocacion_tokens()
+        
+        if request.data.get('refresh'):
+            try:
+                refresh = RefreshToken(request.data['refresh'])
+            except TokenError:
+                refresh = None
+            if refresh is None or str(refresh.get(api_settings.USER_ID_CLAIM)) != str(request.user.pk):
+                return Response(
+                    {'detail': 'Refresh token inválido'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            revocacion.revocar_token(refresh, motivo='Logout')
+        
+        if request.auth is not None:
+            revocacion.revocar_token(request.auth, motivo='Logout')
+        
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,231 @@
+"""
+Búsqueda de logs de auditoría.
+
+En PostgreSQL la descripción (o el texto renderizado de su plantilla) se
+indexa en una columna tsvector (configuración 'spanish') que mantiene un
+trigger al insertar, con índice GIN. Las IPs y los emails se resuelven con
+coincidencia exacta o por prefijo sobre índices B-tree. En otros motores se
+usa icontains sobre la descripción.
+"""
+import ipaddress
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, transaction
+from django.db.models import F, Lookup, Q
+from rest_framework.filters import BaseFilterBackend
+
+from .models import AuditoriaLog
+from .plantillas import PLANTILLAS
+
+TABLA = AuditoriaLog._meta.db_table
+CONFIGURACION = 'spanish'
+INDICE_BUSQUEDA = 'auditoria_busqueda_gin'
+INDICE_EMAIL = 'auditoria_usuario_email_prefijo_idx'
+FUNCION_TRIGGER = 'auditoria_logs_busqueda_trigger'
+TRIGGER = 'auditoria_logs_busqueda'
+TABLA_PLANTILLAS = 'auditoria_plantillas'
+
+# Prefijo de IPv4 por octetos completos: "10.", "192.168", "192.168.1."
+_PATRON_PREFIJO_IP = re.compile(r'^\d{1,3}(\.\d{1,3}){0,2}\.?$')
+
+
+def soporta_busqueda(conexion=None):
+    """Indica si la base de datos permite búsqueda de texto completo"""
+    return (conexion or connection).vendor == 'postgresql'
+
+
+class EnRed(Lookup):
+    """direccion_ip__en_red='192.168.1.0/24' (operador inet <<= de PostgreSQL)"""
+    lookup_name = 'en_red'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} <<= {rhs}::inet', lhs_params + rhs_params
+
+
+AuditoriaLog._meta.get_field('direccion_ip').register_lookup(EnRed)
+
+
+def crear_busqueda(cursor, tabla_usuarios, lote=10000):
+    """Crea el trigger, los índices y completa la columna en los logs existentes"""
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {FUNCION_TRIGGER}() RETURNS trigger AS $$
+        BEGIN
+            NEW.busqueda := to_tsvector('{CONFIGURACION}', COALESCE(NEW.descripcion, ''));
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute(f'DROP TRIGGER IF EXISTS {TRIGGER} ON {TABLA}')
+    cursor.execute(
+        f'CREATE TRIGGER {TRIGGER} BEFORE INSERT OR UPDATE OF descripcion ON {TABLA} '
+        f'FOR EACH ROW EXECUTE FUNCTION {FUNCION_TRIGGER}()'
+    )
+
+    # Los logs existentes se completan por rangos de id, cada uno en su transacción
+    cursor.execute(f'SELECT MIN(id), MAX(id) FROM {TABLA}')
+    minimo, maximo = cursor.fetchone()
+    if minimo is not None:
+        for inicio in range(minimo, maximo + 1, lote):
+            with transaction.atomic():
+                cursor.execute(
+                    f"UPDATE {TABLA} SET busqueda = to_tsvector('{CONFIGURACION}', "
+                    f"COALESCE(descripcion, '')) WHERE id >= %s AND id < %s AND busqueda IS NULL",
+                    [inicio, inicio + lote]
+                )
+
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {INDICE_BUSQUEDA} ON {TABLA} USING gin (busqueda)')
+    # Coincide con la expresión que genera el ORM para iexact / istartswith
+    cursor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDICE_EMAIL} ON {tabla_usuarios} '
+        f'(UPPER(email::text) text_pattern_ops)'
+    )
+
+
+def crear_trigger_plantillas(cursor):
+    """
+    Reemplaza el trigger para indexar el texto renderizado de los logs con
+    código de plantilla (ver plantillas.py), además de la descripción libre.
+    """
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {FUNCION_TRIGGER}() RETURNS trigger AS $$
+        DECLARE
+            texto text;
+            parametro record;
+        BEGIN
+            texto := COALESCE(NEW.descripcion, '');
+            IF NEW.codigo <> '' THEN
+                texto := texto || ' ' || COALESCE(
+                    (SELECT plantilla FROM {TABLA_PLANTILLAS} WHERE codigo = NEW.codigo), ''
+                );
+                texto := replace(texto, '{{modelo}}', COALESCE(
+                    (SELECT model FROM django_content_type WHERE id = NEW.content_type_id), ''
+                ));
+                texto := replace(texto, '{{id}}', COALESCE(NEW.object_id::text, ''));
+                IF NEW.parametros IS NOT NULL AND jsonb_typeof(NEW.parametros) = 'object' THEN
+                    FOR parametro IN SELECT key, value FROM jsonb_each_text(NEW.parametros) LOOP
+                        texto := replace(texto, '{{' || parametro.key || '}}', COALESCE(parametro.value, ''));
+                    END LOOP;
+                END IF;
+            END IF;
+            NEW.busqueda := to_tsvector('{CONFIGURACION}', texto);
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute(f'DROP TRIGGER IF EXISTS {TRIGGER} ON {TABLA}')
+    cursor.execute(
+        f'CREATE TRIGGER {TRIGGER} BEFORE INSERT OR UPDATE OF descripcion, codigo, parametros '
+        f'ON {TABLA} FOR EACH ROW EXECUTE FUNCTION {FUNCION_TRIGGER}()'
+    )
+
+
+def eliminar_busqueda(cursor):
+    cursor.execute(f'DROP INDEX IF EXISTS {INDICE_EMAIL}')
+    cursor.execute(f'DROP INDEX IF EXISTS {INDICE_BUSQUEDA}')
+    cursor.execute(f'DROP TRIGGER IF EXISTS {TRIGGER} ON {TABLA}')
+    cursor.execute(f'DROP FUNCTION IF EXISTS {FUNCION_TRIGGER}()')
+
+
+def clasificar_termino(termino):
+    """
+    Determina cómo buscar un término. Retorna (tipo, valor) donde tipo es
+    'ip', 'red', 'email', 'email_prefijo' o 'texto'.
+    """
+    try:
+        return 'ip', str(ipaddress.ip_address(termino))
+    except ValueError:
+        pass
+
+    if '/' in termino:
+        try:
+            return 'red', str(ipaddress.ip_network(termino, strict=False))
+        except ValueError:
+            pass
+
+    if '.' in termino and _PATRON_PREFIJO_IP.match(termino):
+        octetos = [int(octeto) for octeto in termino.rstrip('.').split('.')]
+        if all(octeto <= 255 for octeto in octetos):
+            red = octetos + [0] * (4 - len(octetos))
+            return 'red', f'{".".join(map(str, red))}/{8 * len(octetos)}'
+
+    if '@' in termino:
+        _, _, dominio = termino.partition('@')
+        if '.' in dominio:
+            return 'email', termino
+        return 'email_prefijo', termino
+
+    return 'texto', termino
+
+
+def buscar_logs(queryset, termino, conexion=None):
+    """
+    Filtra los logs por el término. Las búsquedas de texto en PostgreSQL
+    anotan 'rango' con la relevancia de cada log.
+    """
+    tipo, valor = clasificar_termino(termino)
+    postgres = soporta_busqueda(conexion)
+
+    if tipo == 'ip':
+        return queryset.filter(direccion_ip=valor)
+
+    if tipo == 'red':
+        if postgres:
+            return queryset.filter(direccion_ip__en_red=valor)
+        # Sin tipo inet se compara el texto por octetos completos
+        red = ipaddress.ip_network(valor)
+        if red.version == 6:
+            return queryset.filter(direccion_ip=str(red.network_address))
+        octetos = str(red.network_address).split('.')[:red.prefixlen // 8]
+        return queryset.filter(direccion_ip__startswith='.'.join(octetos) + '.')
+
+    if tipo == 'email':
+        return queryset.filter(usuario__email__iexact=valor)
+
+    if tipo == 'email_prefijo':
+        return queryset.filter(usuario__email__istartswith=valor)
+
+    if not postgres:
+        # Aproximación sin tsvector: texto libre, plantillas o parámetros
+        codigos = [codigo for codigo, plantilla in PLANTILLAS.items() if valor.lower() in plantilla.lower()]
+        return queryset.filter(
+            Q(descripcion__icontains=valor) | Q(codigo__in=codigos) | Q(parametros__icontains=valor)
+        )
+
+    consulta = SearchQuery(valor, config=CONFIGURACION, search_type='websearch')
+    return queryset.filter(busqueda=consulta).annotate(
+        rango=SearchRank(F('busqueda'), consulta)
+    )
+
+
+class BusquedaLogsFilter(BaseFilterBackend):
+    """
+    Filtro ?q= para logs de auditoría.
+
+    Acepta una IP, un prefijo o red (192.168.1. o 10.0.0.0/8), un email
+    completo o su prefijo, o texto libre sobre la descripción o el texto
+    renderizado de su plantilla. ?search= (el parámetro de SearchFilter)
+    se acepta como alias.
+    """
+    search_param = 'q'
+    alias_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        termino = (
+            request.query_params.get(self.search_param)
+            or request.query_params.get(self.alias_param, '')
+        ).strip()
+        if not termino:
+            return queryset
+        return buscar_logs(queryset, termino)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': nombre,
+            'required': False,
+            'in': 'query',
+            'description': 'IP, red, email o texto de la descripción',
+            'schema': {'type': 'string'},
+        } for nombre in (self.search_param, self.alias_param)]
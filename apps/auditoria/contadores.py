@@ -0,0 +1,345 @@
+"""
+Contadores de logins fallidos por ventana deslizante.
+
+La ventana se divide en intervalos; cada intervalo guarda el total y los
+fallos por IP y por email. Se alimentan con la señal user_login_failed y
+al primer uso se cargan una vez desde los logs LOGIN_FAILED de la ventana.
+El login JWT los consulta antes de hashear (espera_login) y el endpoint
+de estadísticas lista las IPs y emails con más fallos.
+
+Con una caché compartida (AUDITORIA_FALLIDOS_CACHE, ver core/cache.py)
+los contadores son comunes a todos los procesos (ContadorFallidosCache).
+Si no, cada proceso lleva los suyos en memoria (ContadorLoginFallidos),
+con un resumen Space-Saving de capacidad fija por intervalo, de modo que
+la memoria no depende de la cantidad de atacantes distintos. Los conteos
+de los elementos frecuentes son aproximados (nunca por debajo del real).
+"""
+import hashlib
+import math
+import threading
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from core.cache import es_compartida
+
+from .models import AuditoriaLog, TipoAccion
+
+
+class ResumenFrecuentes:
+    """Resumen Space-Saving: conserva a lo sumo `capacidad` claves"""
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self.conteos = {}
+
+    def agregar(self, clave, cantidad=1):
+        if clave in self.conteos:
+            self.conteos[clave] += cantidad
+        elif len(self.conteos) < self.capacidad:
+            self.conteos[clave] = cantidad
+        else:
+            # La clave nueva hereda el conteo de la menos frecuente
+            minima = min(self.conteos, key=self.conteos.get)
+            self.conteos[clave] = self.conteos.pop(minima) + cantidad
+
+
+class VentanaFrecuentes:
+    """Total y claves más frecuentes dentro de una ventana deslizante"""
+
+    def __init__(self, ventana=timedelta(hours=24), intervalos=24, capacidad=100):
+        self.ventana = ventana
+        self.duracion = ventana / intervalos
+        self.capacidad = capacidad
+        self._intervalos = deque()  # [inicio, total, ResumenFrecuentes]
+
+    def agregar(self, clave, momento):
+        inicio = self._inicio_intervalo(momento)
+        intervalo = self._buscar(inicio)
+        intervalo[1] += 1
+        if clave:
+            intervalo[2].agregar(clave)
+
+    def total(self, ahora):
+        return sum(intervalo[1] for intervalo in self._vigentes(ahora))
+
+    def conteo(self, clave, ahora):
+        return sum(intervalo[2].conteos.get(clave, 0) for intervalo in self._vigentes(ahora))
+
+    def principales(self, cantidad, ahora):
+        acumulado = {}
+        for intervalo in self._vigentes(ahora):
+            for clave, conteo in intervalo[2].conteos.items():
+                acumulado[clave] = acumulado.get(clave, 0) + conteo
+        return sorted(acumulado.items(), key=lambda par: (-par[1], par[0]))[:cantidad]
+
+    def limpiar(self):
+        self._intervalos.clear()
+
+    def _inicio_intervalo(self, momento):
+        return inicio_intervalo(momento, self.duracion)
+
+    def _buscar(self, inicio):
+        # Los eventos llegan casi siempre en orden: se busca desde el final
+        for intervalo in reversed(self._intervalos):
+            if intervalo[0] == inicio:
+                return intervalo
+            if intervalo[0] < inicio:
+                break
+
+        nuevo = [inicio, 0, ResumenFrecuentes(self.capacidad)]
+        self._intervalos.append(nuevo)
+        if len(self._intervalos) > 1 and self._intervalos[-2][0] > inicio:
+            self._intervalos = deque(sorted(self._intervalos, key=lambda intervalo: intervalo[0]))
+        return nuevo
+
+    def _vigentes(self, ahora):
+        limite = ahora.timestamp() - self.ventana.total_seconds()
+        while self._intervalos and self._intervalos[0][0] + self.duracion.total_seconds() <= limite:
+            self._intervalos.popleft()
+        return self._intervalos
+
+
+def inicio_intervalo(momento, duracion):
+    epoca = momento.timestamp()
+    paso = duracion.total_seconds()
+    return epoca - epoca % paso
+
+
+def fallidos_recientes(desde):
+    """(momento, ip, email) de los logs LOGIN_FAILED desde `desde`"""
+    # Una sola lectura acotada por (accion, timestamp)
+    filas = AuditoriaLog.objects.filter(
+        accion=TipoAccion.LOGIN_FAILED,
+        timestamp__gte=desde
+    ).order_by('timestamp').values_list('timestamp', 'direccion_ip', 'parametros', 'datos_nuevos')
+
+    for momento, ip, parametros, datos_nuevos in filas.iterator():
+        email = (parametros or {}).get('email') or (datos_nuevos or {}).get('email_intentado')
+        yield momento, ip, email
+
+
+class ContadorLoginFallidos:
+    """Logins fallidos recientes por IP y por email, en memoria del proceso"""
+
+    def __init__(self, ventana=timedelta(hours=24), intervalos=24, capacidad=100, precargar=True):
+        self.ventana = ventana
+        self.duracion = ventana / intervalos
+        self._ips = VentanaFrecuentes(ventana, intervalos, capacidad)
+        self._emails = VentanaFrecuentes(ventana, intervalos, capacidad)
+        self._lock = threading.Lock()
+        self._cargado = not precargar
+
+    def registrar(self, ip=None, email=None, momento=None):
+        momento = momento or timezone.now()
+        with self._lock:
+            self._cargar()
+            self._agregar(ip, email, momento)
+
+    def total(self):
+        with self._lock:
+            self._cargar()
+            return self._ips.total(timezone.now())
+
+    def intentos_ip(self, ip):
+        """Fallos recientes de una IP (consulta en memoria, sin BD)"""
+        with self._lock:
+            self._cargar()
+            return self._ips.conteo(ip, timezone.now())
+
+    def intentos_email(self, email):
+        with self._lock:
+            self._cargar()
+            return self._emails.conteo(normalizar_email(email), timezone.now())
+
+    def principales_ips(self, cantidad=10):
+        with self._lock:
+            self._cargar()
+            return self._ips.principales(cantidad, timezone.now())
+
+    def principales_emails(self, cantidad=10):
+        with self._lock:
+            self._cargar()
+            return self._emails.principales(cantidad, timezone.now())
+
+    def limpiar(self):
+        with self._lock:
+            self._ips.limpiar()
+            self._emails.limpiar()
+
+    def _agregar(self, ip, email, momento):
+        self._ips.agregar(ip, momento)
+        self._emails.agregar(normalizar_email(email), momento)
+
+    def _cargar(self):
+        if self._cargado:
+            return
+        self._cargado = True
+
+        for momento, ip, email in fallidos_recientes(timezone.now() - self.ventana):
+            self._agregar(ip, email, momento)
+
+
+class ContadorFallidosCache:
+    """
+    Logins fallidos recientes por IP y por email, en una caché compartida.
+
+    Cada intervalo guarda el total y un contador por IP y por email con
+    incr atómico, comunes a todos los procesos, y una lista de a lo sumo
+    `capacidad` candidatos a más frecuentes. La lista se reescribe sin
+    bloqueo: una escritura concurrente puede descartar un candidato, que
+    vuelve a entrar con su siguiente fallo; los conteos por clave son exactos.
+    """
+
+    CLAVE_CARGADO = 'fallidos:cargado'
+
+    def __init__(self, alias='default', ventana=timedelta(hours=24), intervalos=24, capacidad=100,
+                 precargar=True):
+        self.alias = alias
+        self.ventana = ventana
+        self.duracion = ventana / intervalos
+        self.intervalos = intervalos
+        self.capacidad = capacidad
+        # Un intervalo se consulta hasta que su fin sale de la ventana
+        self._ttl = math.ceil((ventana + self.duracion).total_seconds())
+        self._cargado = not precargar
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def registrar(self, ip=None, email=None, momento=None):
+        self._cargar()
+        self._agregar(ip, email, momento or timezone.now())
+
+    def total(self):
+        self._cargar()
+        claves = [f'fallidos:total:{inicio}' for inicio in self._vigentes()]
+        return sum(self._cache.get_many(claves).values())
+
+    def intentos_ip(self, ip):
+        """Fallos recientes de una IP, en todos los procesos"""
+        return self._conteo('ip', ip)
+
+    def intentos_email(self, email):
+        return self._conteo('email', normalizar_email(email))
+
+    def principales_ips(self, cantidad=10):
+        return self._principales('ip', cantidad)
+
+    def principales_emails(self, cantidad=10):
+        return self._principales('email', cantidad)
+
+    def _agregar(self, ip, email, momento):
+        inicio = inicio_intervalo(momento, self.duracion)
+        self._incr(f'fallidos:total:{inicio}')
+        for tipo, clave in (('ip', ip), ('email', normalizar_email(email))):
+            if clave:
+                conteo = self._incr(self._clave(tipo, inicio, clave))
+                self._proponer(tipo, inicio, clave, conteo)
+
+    def _incr(self, clave):
+        try:
+            return self._cache.incr(clave)
+        except ValueError:
+            self._cache.add(clave, 0, self._ttl)
+            return self._cache.incr(clave)
+
+    def _proponer(self, tipo, inicio, clave, conteo):
+        clave_lista = f'fallidos:{tipo}:{inicio}:candidatos'
+        candidatos = self._cache.get(clave_lista) or {}
+        candidatos[clave] = conteo
+        if len(candidatos) > self.capacidad:
+            del candidatos[min(candidatos, key=candidatos.get)]
+        self._cache.set(clave_lista, candidatos, self._ttl)
+
+    def _conteo(self, tipo, clave):
+        self._cargar()
+        if not clave:
+            return 0
+        claves = [self._clave(tipo, inicio, clave) for inicio in self._vigentes()]
+        return sum(self._cache.get_many(claves).values())
+
+    def _principales(self, tipo, cantidad):
+        self._cargar()
+        claves = [f'fallidos:{tipo}:{inicio}:candidatos' for inicio in self._vigentes()]
+        acumulado = {}
+        for candidatos in self._cache.get_many(claves).values():
+            for clave, conteo in candidatos.items():
+                acumulado[clave] = acumulado.get(clave, 0) + conteo
+        return sorted(acumulado.items(), key=lambda par: (-par[1], par[0]))[:cantidad]
+
+    def _vigentes(self):
+        actual = inicio_intervalo(timezone.now(), self.duracion)
+        paso = self.duracion.total_seconds()
+        # El intervalo más antiguo queda parcialmente dentro de la ventana
+        return [actual - paso * atras for atras in range(self.intervalos + 1)]
+
+    @staticmethod
+    def _clave(tipo, inicio, valor):
+        # Los emails intentados son texto libre: la clave usa su hash
+        return f'fallidos:{tipo}:{inicio}:{hashlib.sha256(valor.encode("utf-8")).hexdigest()}'
+
+    def _cargar(self):
+        if self._cargado:
+            return
+        self._cargado = True
+
+        # Solo el primer proceso carga los logs; los demás ya los ven en la caché
+        if not self._cache.add(self.CLAVE_CARGADO, True, None):
+            return
+        for momento, ip, email in fallidos_recientes(timezone.now() - self.ventana):
+            self._agregar(ip, email, momento)
+
+
+def normalizar_email(email):
+    # El email llega del body del login sin validar: puede no ser texto
+    return email.strip().lower() if email and isinstance(email, str) else None
+
+
+_contador = None
+_contador_lock = threading.Lock()
+
+
+def get_contador_fallidos():
+    """Retorna el contador del proceso, creándolo según la configuración"""
+    global _contador
+
+    if _contador is None:
+        with _contador_lock:
+            if _contador is None:
+                opciones = {
+                    'ventana': timedelta(hours=getattr(settings, 'AUDITORIA_FALLIDOS_VENTANA_HORAS', 24)),
+                    'intervalos': getattr(settings, 'AUDITORIA_FALLIDOS_INTERVALOS', 24),
+                    'capacidad': getattr(settings, 'AUDITORIA_FALLIDOS_CAPACIDAD', 100),
+                }
+                alias = getattr(settings, 'AUDITORIA_FALLIDOS_CACHE', 'default')
+                if es_compartida(alias):
+                    _contador = ContadorFallidosCache(alias, **opciones)
+                else:
+                    _contador = ContadorLoginFallidos(**opciones)
+    return _contador
+
+
+def espera_login(ip, email):
+    """
+    Segundos que debe esperar un login cuya IP o email superó los fallos
+    permitidos en la ventana (LOGIN_FALLIDOS_MAX_IP, LOGIN_FALLIDOS_MAX_EMAIL;
+    0 sin límite), o 0 si puede intentarse. El bloqueo se levanta a medida
+    que los intervalos más antiguos salen de la ventana.
+
+    El límite por email viene desactivado: cualquiera que conozca el email
+    puede agotarlo desde otras IPs y bloquear al usuario legítimo.
+    """
+    max_ip = getattr(settings, 'LOGIN_FALLIDOS_MAX_IP', 100)
+    max_email = getattr(settings, 'LOGIN_FALLIDOS_MAX_EMAIL', 0)
+    contador = get_contador_fallidos()
+
+    if (max_ip and ip and contador.intentos_ip(ip) >= max_ip) or (
+        max_email and email and contador.intentos_email(email) >= max_email
+    ):
+        return math.ceil(contador.duracion.total_seconds())
+    return 0
@@ -0,0 +1,127 @@
+"""
+Verificación de credenciales para el login JWT.
+
+El usuario se busca en el hilo del request y solo el hasheo de la
+contraseña se ejecuta en un pool acotado de hilos: los hashers de Django
+liberan el GIL, por lo que varios logins se verifican en paralelo sin que
+un pico de intentos ocupe todos los hilos del servidor. Si el pool y su
+cola están llenos el login se rechaza de inmediato (PoolHashingSaturado).
+
+Con backends de autenticación que no autentican como ModelBackend se usa
+authenticate() tal cual, en el hilo del request.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model, user_login_failed
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.utils.module_loading import import_string
+
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+
+class PoolHashingSaturado(Exception):
+    """No hay lugar en el pool de hasheo para verificar la contraseña"""
+
+
+class PoolHashing:
+    """Pool de hilos con cupo fijo (trabajadores + cola) para hashear contraseñas"""
+
+    def __init__(self, trabajadores=2, cola=16, timeout=10.0):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='login-hash')
+        self._cupos = threading.BoundedSemaphore(trabajadores + cola)
+
+    def ejecutar(self, funcion, *args):
+        """Ejecuta la función en el pool y espera el resultado"""
+        if not self._cupos.acquire(blocking=False):
+            raise PoolHashingSaturado()
+        try:
+            futuro = self._executor.submit(funcion, *args)
+        except BaseException:
+            self._cupos.release()
+            raise
+        # El cupo se libera al terminar el hasheo, aunque el request ya no espere
+        futuro.add_done_callback(lambda _: self._cupos.release())
+
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PoolHashingSaturado()
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool_hashing():
+    """Retorna el pool del proceso, creándolo según la configuración"""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolHashing(
+                    trabajadores=getattr(settings, 'LOGIN_HASH_WORKERS', 2),
+                    cola=getattr(settings, 'LOGIN_HASH_QUEUE', 16),
+                    timeout=getattr(settings, 'LOGIN_HASH_TIMEOUT', 10.0),
+                )
+    return _pool
+
+
+def _verificar_password(password, encoded):
+    """Retorna (válida, nuevo hash si el hasher configurado cambió)"""
+    actualizado = []
+    valida = check_password(password, encoded, setter=lambda raw: actualizado.append(make_password(raw)))
+    return valida, (actualizado[0] if actualizado else None)
+
+
+def _backend_unico():
+    """Ruta del único backend si autentica como ModelBackend, si no None"""
+    backends = list(getattr(settings, 'AUTHENTICATION_BACKENDS', [MODEL_BACKEND]))
+    if len(backends) == 1 and import_string(backends[0]).authenticate is ModelBackend.authenticate:
+        return backends[0]
+    return None
+
+
+def autenticar(request, username, password):
+    """
+    Equivalente a authenticate(request, username, password) con un único
+    hasheo de la contraseña, ejecutado en el pool. Emite user_login_failed
+    igual que authenticate() cuando las credenciales no son válidas.
+    """
+    backend = _backend_unico()
+    if backend is None:
+        return authenticate(request=request, username=username, password=password)
+
+    UserModel = get_user_model()
+    pool = get_pool_hashing()
+    user = None
+
+    if username and password is not None:
+        try:
+            candidato = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Se hashea igual para no revelar por el tiempo si el usuario existe
+            pool.ejecutar(make_password, password)
+        else:
+            valida, nuevo_hash = pool.ejecutar(_verificar_password, password, candidato.password)
+            if valida and getattr(candidato, 'is_active', True):
+                if nuevo_hash:
+                    candidato.password = nuevo_hash
+                    candidato.save(update_fields=['password'])
+                candidato.backend = backend
+                user = candidato
+
+    if user is None:
+        user_login_failed.send(
+            sender=__name__,
+            credentials={'username': username, 'password': '********************'},
+            request=request,
+        )
+    return user
@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import authenticate, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from apps.auditoria.authentication import CustomTokenObtainPairSerializer
+from apps.auditoria.login import autenticar
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide logins por segundo del flujo anterior (authenticate + serializer, '
+        'dos hasheos) y del flujo actual (un hasheo en el pool)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True, help='Usuario existente para el login')
+        parser.add_argument('--password', required=True, help='Contraseña del usuario')
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=20,
+            help='Logins por flujo (default: 20)',
+        )
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=1,
+            help='Logins concurrentes (default: 1)',
+        )
+
+    def handle(self, *args, **options):
+        email, password = options['email'], options['password']
+        if autenticar(None, email, password) is None:
+            raise CommandError(f'Credenciales inválidas para {email}')
+
+        request = APIRequestFactory().post('/api/token/')
+        username_field = get_user_model().USERNAME_FIELD
+
+        def anterior():
+            # Flujo previo de CustomTokenObtainPairView: authenticate() y luego
+            # el serializer de SimpleJWT, que vuelve a autenticar
+            authenticate(request=request, username=email, password=password)
+            serializer = CustomTokenObtainPairSerializer(
+                data={username_field: email, 'password': password},
+                context={'request': request}
+            )
+            serializer.is_valid(raise_exception=True)
+            return serializer.validated_data
+
+        def actual():
+            user = autenticar(request, email, password)
+            refresh = CustomTokenObtainPairSerializer.get_token(user)
+            return str(refresh), str(refresh.access_token)
+
+        for nombre, flujo in (('anterior', anterior), ('actual', actual)):
+            segundos = self.medir(flujo, options['logins'], options['hilos'])
+            self.stdout.write(
+                f'{nombre:<9} {options["logins"]} logins en {segundos:.2f}s: '
+                f'{options["logins"] / segundos:.2f} logins/s'
+            )
+
+    def medir(self, flujo, logins, hilos):
+        def ejecutar(_):
+            try:
+                flujo()
+            finally:
+                if hilos > 1:
+                    connection.close()
+
+        inicio = time.perf_counter()
+        if hilos > 1:
+            with ThreadPoolExecutor(max_workers=hilos) as executor:
+                list(executor.map(ejecutar, range(logins)))
+        else:
+            for i in range(logins):
+                ejecutar(i)
+        return time.perf_counter() - inicio
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from apps.auditoria.particiones import (
+    crear_particiones_futuras,
+    es_particionada,
+    inicio_mes,
+    listar_particiones,
+    retirar_particiones,
+    soporta_particiones,
+    sumar_meses,
+)
+
+
+class Command(BaseCommand):
+    help = 'Gestiona las particiones mensuales de la tabla auditoria_logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses-adelante',
+            type=int,
+            default=3,
+            help='Cantidad de meses futuros a pre-crear (por defecto 3)',
+        )
+        parser.add_argument(
+            '--retener-meses',
+            type=int,
+            default=None,
+            help='Separar las particiones con más de N meses de antigüedad',
+        )
+        parser.add_argument(
+            '--eliminar',
+            action='store_true',
+            help='Eliminar (DROP) las particiones retiradas en lugar de solo separarlas',
+        )
+        parser.add_argument(
+            '--listar',
+            action='store_true',
+            help='Listar las particiones existentes',
+        )
+
+    def handle(self, *args, **options):
+        if not soporta_particiones():
+            raise CommandError('El particionamiento solo está disponible en PostgreSQL')
+
+        with connection.cursor() as cursor:
+            if not es_particionada(cursor):
+                raise CommandError(
+                    'La tabla auditoria_logs no está particionada. Ejecute las migraciones.'
+                )
+
+            self.crear_particiones(cursor, options['meses_adelante'])
+
+            if options['retener_meses'] is not None:
+                self.retirar_particiones(cursor, options['retener_meses'], options['eliminar'])
+
+            if options['listar']:
+                self.listar(cursor)
+
+    def crear_particiones(self, cursor, meses):
+        """Pre-crear las particiones de los próximos meses"""
+        creadas = crear_particiones_futuras(cursor, timezone.now(), meses)
+        for nombre in creadas:
+            self.stdout.write(self.style.SUCCESS(f'Partición creada: {nombre}'))
+        if not creadas:
+            self.stdout.write('Las particiones futuras ya existen')
+
+    def retirar_particiones(self, cursor, meses, eliminar):
+        """Separar o eliminar particiones fuera del periodo de retención"""
+        limite = sumar_meses(inicio_mes(timezone.now()), -meses)
+        retiradas = retirar_particiones(cursor, limite, eliminar=eliminar)
+        accion = 'eliminada' if eliminar else 'separada'
+        for nombre in retiradas:
+            self.stdout.write(self.style.SUCCESS(f'Partición {accion}: {nombre}'))
+        if not retiradas:
+            self.stdout.write('No hay particiones fuera del periodo de retención')
+
+    def listar(self, cursor):
+        """Listar particiones mensuales"""
+        self.stdout.write('\n=== PARTICIONES DE auditoria_logs ===')
+        for nombre, inicio in listar_particiones(cursor):
+            self.stdout.write(f'{nombre}: desde {inicio.date()}')
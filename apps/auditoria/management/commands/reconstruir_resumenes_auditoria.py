@@ -0,0 +1,51 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.auditoria.resumenes import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los resúmenes de auditoría (por hora y por día) desde los logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            type=str,
+            help='Fecha inicial (AAAA-MM-DD, UTC)',
+        )
+        parser.add_argument(
+            '--hasta',
+            type=str,
+            help='Fecha final inclusive (AAAA-MM-DD, UTC). Por defecto hoy',
+        )
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Recalcular los últimos N días (alternativa a --desde)',
+        )
+
+    def handle(self, *args, **options):
+        hasta = self.parsear_fecha(options['hasta']) if options['hasta'] else timezone.now()
+
+        if options['desde']:
+            desde = self.parsear_fecha(options['desde'])
+        elif options['dias'] is not None:
+            desde = hasta - timedelta(days=options['dias'])
+        else:
+            raise CommandError('Debe indicar --desde o --dias')
+
+        if desde > hasta:
+            raise CommandError('La fecha inicial es posterior a la final')
+
+        dias, logs = reconstruir_resumenes(desde, hasta)
+        self.stdout.write(
+            self.style.SUCCESS(f'Resúmenes recalculados: {dias} días, {logs} logs')
+        )
+
+    def parsear_fecha(self, valor):
+        try:
+            fecha = datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Fecha inválida: {valor}. Use el formato AAAA-MM-DD')
+        return datetime.combine(fecha, time.min, tzinfo=dt_timezone.utc)
@@ -0,0 +1,35 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from apps.auditoria.retencion import restaurar_archivo
+
+
+class Command(BaseCommand):
+    help = 'Recarga logs de auditoría desde archivos JSONL comprimidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'rutas',
+            nargs='+',
+            help='Archivos .jsonl.gz o directorios a restaurar',
+        )
+
+    def handle(self, *args, **options):
+        archivos = []
+        for ruta in map(Path, options['rutas']):
+            if ruta.is_dir():
+                archivos.extend(sorted(ruta.rglob('*.jsonl.gz')))
+            elif ruta.exists():
+                archivos.append(ruta)
+            else:
+                raise CommandError(f'No existe: {ruta}')
+
+        total = 0
+        for archivo in archivos:
+            restaurados = restaurar_archivo(archivo)
+            total += restaurados
+            self.stdout.write(f'{archivo}: {restaurados} logs')
+
+        self.stdout.write(self.style.SUCCESS(f'Total restaurado: {total} logs'))
+        self.stdout.write(
+            'Ejecute reconstruir_resumenes_auditoria si necesita recalcular las estadísticas'
+        )
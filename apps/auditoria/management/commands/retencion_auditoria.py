@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.auditoria.models import TipoAccion
+from apps.auditoria.retencion import MotorRetencion
+
+
+class Command(BaseCommand):
+    help = 'Aplica la retención de logs de auditoría por lotes, archivando lo eliminado'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Días de retención por defecto (AUDITORIA_RETENCION_DIAS)',
+        )
+        parser.add_argument(
+            '--accion',
+            action='append',
+            default=[],
+            metavar='ACCION=DIAS',
+            help='Retención específica para una acción, ej: --accion VIEW=30 (repetible)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Tamaño del rango de ids por lote',
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.1,
+            help='Segundos de espera entre lotes',
+        )
+        parser.add_argument(
+            '--archivo-dir',
+            type=str,
+            default=None,
+            help='Directorio de archivo (AUDITORIA_ARCHIVO_DIR)',
+        )
+        parser.add_argument(
+            '--sin-archivar',
+            action='store_true',
+            help='Eliminar sin escribir el archivo JSONL',
+        )
+        parser.add_argument(
+            '--reiniciar',
+            action='store_true',
+            help='Ignorar el progreso guardado de una ejecución anterior',
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo contar lo que se eliminaría',
+        )
+
+    def handle(self, *args, **options):
+        dias = options['dias']
+        if dias is None:
+            dias = getattr(settings, 'AUDITORIA_RETENCION_DIAS', 365)
+        dias_por_accion = dict(getattr(settings, 'AUDITORIA_RETENCION_POR_ACCION', {}))
+        dias_por_accion.update(self.parsear_acciones(options['accion']))
+
+        motor = MotorRetencion(
+            dias_defecto=dias,
+            dias_por_accion=dias_por_accion,
+            lote=options['lote'],
+            pausa=options['pausa'],
+            directorio_archivo=options['archivo_dir'] or settings.AUDITORIA_ARCHIVO_DIR,
+            archivar=not options['sin_archivar'],
+            reanudar=not options['reiniciar'],
+        )
+
+        verbo = 'a eliminar' if options['simular'] else 'eliminados'
+        resultado = motor.ejecutar(simular=options['simular'], notificar=self.notificar)
+        for regla, cantidad in resultado.items():
+            self.stdout.write(self.style.SUCCESS(f'{regla}: {cantidad} logs {verbo}'))
+
+        sesiones = motor.limpiar_sesiones(simular=options['simular'])
+        self.stdout.write(self.style.SUCCESS(f'Sesiones inactivas {verbo}: {sesiones}'))
+
+    def parsear_acciones(self, valores):
+        acciones = {}
+        for valor in valores:
+            accion, _, dias = valor.partition('=')
+            accion = accion.strip().upper()
+            if accion not in TipoAccion.values or not dias.strip().isdigit():
+                raise CommandError(f'Retención por acción inválida: {valor}')
+            acciones[accion] = int(dias)
+        return acciones
+
+    def notificar(self, regla, ultimo_id, eliminadas):
+        if self.verbosity >= 2:
+            self.stdout.write(f'{regla}: hasta id {ultimo_id}, {eliminadas} procesados')
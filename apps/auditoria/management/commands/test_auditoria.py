@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from apps.auditoria.models import AuditoriaLog, SesionUsuario
@@ -24,7 +25,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--limpiar-logs',
             action='store_true',
-            help='Limpiar logs de auditoría antiguos',
+            help='Limpiar logs de auditoría antiguos (equivale a retencion_auditoria --dias)',
         )
         parser.add_argument(
             '--dias',
@@ -135,29 +136,5 @@ class Command(BaseCommand):
             self.stdout.write(f"{email}: {count} acciones")
 
     def limpiar_logs(self, dias):
-        """Limpiar logs de auditoría antiguos"""
-        fecha_limite = timezone.now() - timedelta(days=dias)
-        
-        logs_antiguos = AuditoriaLog.objects.filter(timestamp__lt=fecha_limite)
-        count = logs_antiguos.count()
-        
-        if count > 0:
-            logs_antiguos.delete()
-            self.stdout.write(
-                self.style.SUCCESS(f'Se eliminaron {count} logs de auditoría antiguos')
-            )
-        else:
-            self.stdout.write('No hay logs antiguos para eliminar')
-        
-        # Limpiar sesiones inactivas antiguas
-        sesiones_antiguas = SesionUsuario.objects.filter(
-            fecha_ultimo_acceso__lt=fecha_limite,
-            activa=False
-        )
-        count_sesiones = sesiones_antiguas.count()
-        
-        if count_sesiones > 0:
-            sesiones_antiguas.delete()
-            self.stdout.write(
-                self.style.SUCCESS(f'Se eliminaron {count_sesiones} sesiones antiguas')
-            )
+        """Limpiar logs de auditoría antiguos (usa el motor de retención por lotes)"""
+        call_command('retencion_auditoria', dias=dias, stdout=self.stdout, stderr=self.stderr)
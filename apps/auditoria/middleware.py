@@ -1,6 +1,7 @@
 from django.utils.deprecation import MiddlewareMixin
 from .utils import obtener_datos_request
-from .models import AuditoriaLog, SesionUsuario, TipoAccion
+from .models import AuditoriaLog, TipoAccion
+from .accesos import get_buffer_accesos
 import threading
 
 # Variable local del hilo para almacenar el contexto del request
@@ -19,19 +20,11 @@ class AuditoriaMiddleware(MiddlewareMixin):
         _thread_local.user = getattr(request, 'user', None)
         _thread_local.request = request
         
-        # Actualizar última actividad de la sesión si existe
+        # Anotar la última actividad de la sesión; se escribe en lote
         if hasattr(request, 'user') and request.user.is_authenticated:
             session_key = request.session.session_key
             if session_key:
-                try:
-                    sesion = SesionUsuario.objects.get(
-                        session_key=session_key,
-                        usuario=request.user,
-                        activa=True
-                    )
-                    sesion.save()  # Esto actualizará fecha_ultimo_acceso por auto_now=True
-                except SesionUsuario.DoesNotExist:
-                    pass
+                get_buffer_accesos().registrar(session_key, request.user.pk)
     
     def process_response(self, request, response):
         # Limpiar el contexto del hilo
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+from apps.auditoria.particiones import (
+    desparticionar_tabla,
+    particionar_tabla,
+    soporta_particiones,
+)
+
+
+def particionar(apps, schema_editor):
+    if not soporta_particiones(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        particionar_tabla(cursor)
+
+
+def desparticionar(apps, schema_editor):
+    if not soporta_particiones(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        desparticionar_tabla(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0002_alter_auditorialog_timestamp'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desparticionar),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0 on 2026-10-16 22:35
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0003_particionar_auditoria_logs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenAuditoriaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('accion', models.CharField(choices=[('LOGIN', 'Inicio de sesión'), ('LOGOUT', 'Cierre de sesión'), ('LOGIN_FAILED', 'Intento de login fallido'), ('CREATE', 'Crear'), ('UPDATE', 'Actualizar'), ('DELETE', 'Eliminar'), ('VIEW', 'Visualizar')], max_length=20)),
+                ('exito', models.BooleanField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('dia', models.DateField()),
+                ('usuario', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'auditoria_resumen_dia',
+                'ordering': ['-dia'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenAuditoriaHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('accion', models.CharField(choices=[('LOGIN', 'Inicio de sesión'), ('LOGOUT', 'Cierre de sesión'), ('LOGIN_FAILED', 'Intento de login fallido'), ('CREATE', 'Crear'), ('UPDATE', 'Actualizar'), ('DELETE', 'Eliminar'), ('VIEW', 'Visualizar')], max_length=20)),
+                ('exito', models.BooleanField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('hora', models.DateTimeField()),
+                ('usuario', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'auditoria_resumen_hora',
+                'ordering': ['-hora'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumenauditoriadia',
+            constraint=models.UniqueConstraint(models.F('dia'), models.F('accion'), django.db.models.functions.comparison.Coalesce('usuario', 0), models.F('exito'), name='resumen_dia_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumenauditoriahora',
+            constraint=models.UniqueConstraint(models.F('hora'), models.F('accion'), django.db.models.functions.comparison.Coalesce('usuario', 0), models.F('exito'), name='resumen_hora_unico'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-16 22:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0004_resumenes_auditoria'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditorialog',
+            name='auditoria_l_usuario_adc44e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditorialog',
+            index=models.Index(fields=['timestamp', 'id'], name='auditoria_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditorialog',
+            index=models.Index(fields=['usuario', 'timestamp', 'id'], name='auditoria_usuario_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sesionusuario',
+            index=models.Index(fields=['fecha_inicio', 'id'], name='sesion_inicio_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sesionusuario',
+            index=models.Index(fields=['activa', 'fecha_inicio', 'id'], name='sesion_activa_inicio_id_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0 on 2026-10-16 22:46
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.auditoria.busqueda import crear_busqueda, eliminar_busqueda, soporta_busqueda
+
+
+def crear(apps, schema_editor):
+    if not soporta_busqueda(schema_editor.connection):
+        return
+    tabla_usuarios = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        crear_busqueda(cursor, tabla_usuarios)
+
+
+def eliminar(apps, schema_editor):
+    if not soporta_busqueda(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        eliminar_busqueda(cursor)
+
+
+class Migration(migrations.Migration):
+
+    # El completado de logs existentes se hace por lotes, cada uno en su transacción
+    atomic = False
+
+    dependencies = [
+        ('auditoria', '0005_indices_paginacion_cursor'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditorialog',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='auditorialog',
+            index=models.Index(fields=['direccion_ip', 'timestamp'], name='auditoria_ip_ts_idx'),
+        ),
+        migrations.RunPython(crear, eliminar),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0 on 2026-10-16 22:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0006_busqueda_texto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgenteUsuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=64, unique=True)),
+                ('texto', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Agente de usuario',
+                'verbose_name_plural': 'Agentes de usuario',
+                'db_table': 'auditoria_agentes_usuario',
+            },
+        ),
+        migrations.AddField(
+            model_name='auditorialog',
+            name='agente',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='auditoria.agenteusuario'),
+        ),
+        migrations.AddField(
+            model_name='sesionusuario',
+            name='agente',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='auditoria.agenteusuario'),
+        ),
+    ]
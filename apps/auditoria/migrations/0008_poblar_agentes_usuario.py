@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from django.db import migrations, transaction
+
+from apps.auditoria.agentes import hash_agente, obtener_ids
+
+LOTE = 5000
+MODELOS = ('AuditoriaLog', 'SesionUsuario')
+
+
+def poblar(apps, schema_editor):
+    """Reemplaza el texto de user_agent por la referencia a AgenteUsuario, por lotes"""
+    AgenteUsuario = apps.get_model('auditoria', 'AgenteUsuario')
+
+    for nombre in MODELOS:
+        modelo = apps.get_model('auditoria', nombre)
+        pendientes = modelo.objects.filter(agente__isnull=True).exclude(user_agent='')
+        ultimo_id = 0
+
+        while True:
+            filas = list(
+                pendientes.filter(id__gt=ultimo_id).order_by('id').values_list('id', 'user_agent')[:LOTE]
+            )
+            if not filas:
+                break
+
+            with transaction.atomic():
+                ids = obtener_ids({texto for _, texto in filas}, modelo=AgenteUsuario)
+                por_agente = defaultdict(list)
+                for pk, texto in filas:
+                    por_agente[ids[hash_agente(texto)]].append(pk)
+                for agente_id, pks in por_agente.items():
+                    modelo.objects.filter(id__in=pks).update(agente_id=agente_id)
+
+            ultimo_id = filas[-1][0]
+
+
+def restaurar(apps, schema_editor):
+    """Vuelve a copiar el texto de cada agente en las filas, por lotes"""
+    AgenteUsuario = apps.get_model('auditoria', 'AgenteUsuario')
+
+    for agente in AgenteUsuario.objects.iterator():
+        for nombre in MODELOS:
+            modelo = apps.get_model('auditoria', nombre)
+            while True:
+                with transaction.atomic():
+                    pks = list(
+                        modelo.objects.filter(agente_id=agente.id).values_list('id', flat=True)[:LOTE]
+                    )
+                    if not pks:
+                        break
+                    modelo.objects.filter(id__in=pks).update(user_agent=agente.texto, agente=None)
+
+
+class Migration(migrations.Migration):
+
+    # Cada lote se confirma por separado para no retener bloqueos en tablas grandes
+    atomic = False
+
+    dependencies = [
+        ('auditoria', '0007_agentes_usuario'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar, restaurar),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0 on 2026-10-16 22:49
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0008_poblar_agentes_usuario'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='auditorialog',
+            name='user_agent',
+        ),
+        migrations.RemoveField(
+            model_name='sesionusuario',
+            name='user_agent',
+        ),
+    ]
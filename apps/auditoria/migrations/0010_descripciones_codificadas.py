@@ -0,0 +1,60 @@
+# Generated by Django 5.0 on 2026-10-16 22:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.auditoria.busqueda import crear_busqueda, crear_trigger_plantillas, soporta_busqueda
+from apps.auditoria.plantillas import sincronizar_plantillas
+
+
+def crear_trigger(apps, schema_editor):
+    sincronizar_plantillas(
+        using=schema_editor.connection.alias,
+        modelo=apps.get_model('auditoria', 'PlantillaDescripcion')
+    )
+    if not soporta_busqueda(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        crear_trigger_plantillas(cursor)
+
+
+def restaurar_trigger(apps, schema_editor):
+    if not soporta_busqueda(schema_editor.connection):
+        return
+    tabla_usuarios = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        crear_busqueda(cursor, tabla_usuarios)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0009_eliminar_user_agent_texto'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlantillaDescripcion',
+            fields=[
+                ('codigo', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('plantilla', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Plantilla de descripción',
+                'verbose_name_plural': 'Plantillas de descripción',
+                'db_table': 'auditoria_plantillas',
+            },
+        ),
+        migrations.AddField(
+            model_name='auditorialog',
+            name='codigo',
+            field=models.CharField(blank=True, default='', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='auditorialog',
+            name='parametros',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(crear_trigger, restaurar_trigger),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.postgres.search import SearchVectorField
 
 User = get_user_model()
 
@@ -17,7 +20,67 @@ class TipoAccion(models.TextChoices):
     VIEW = 'VIEW', 'Visualizar'
 
 
-class AuditoriaLog(models.Model):
+class AgenteUsuario(models.Model):
+    """User-Agent único, referenciado por logs y sesiones"""
+    
+    # sha256 del texto: índice único de tamaño fijo aunque el texto sea largo
+    hash = models.CharField(max_length=64, unique=True)
+    texto = models.TextField()
+    
+    class Meta:
+        db_table = 'auditoria_agentes_usuario'
+        verbose_name = 'Agente de usuario'
+        verbose_name_plural = 'Agentes de usuario'
+    
+    def __str__(self):
+        return self.texto
+
+
+class ConAgenteUsuario(models.Model):
+    """
+    Guarda el User-Agent como referencia a AgenteUsuario.
+    
+    `user_agent` se sigue leyendo y asignando como texto (también en el
+    constructor); el id se resuelve al guardar.
+    """
+    
+    agente = models.ForeignKey(
+        AgenteUsuario,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+'
+    )
+    
+    class Meta:
+        abstract = True
+    
+    @property
+    def user_agent(self):
+        if '_user_agent' in self.__dict__:
+            return self.__dict__['_user_agent']
+        return self.agente.texto if self.agente_id else ''
+    
+    @user_agent.setter
+    def user_agent(self, valor):
+        self.__dict__['_user_agent'] = valor or ''
+        self.__dict__['_user_agent_pendiente'] = True
+    
+    def save(self, *args, **kwargs):
+        if self.__dict__.get('_user_agent_pendiente'):
+            from .agentes import resolver_agentes
+            resolver_agentes([self])
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'user_agent' in update_fields:
+            kwargs['update_fields'] = [
+                'agente' if campo == 'user_agent' else campo for campo in update_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class AuditoriaLog(ConAgenteUsuario):
     """Modelo para registrar actividades de auditoría"""
     
     # Usuario que realizó la acción
@@ -29,9 +92,8 @@ class AuditoriaLog(models.Model):
         related_name='logs_auditoria'
     )
     
-    # Datos de la sesión/request
+    # Datos de la sesión/request (user_agent se hereda de ConAgenteUsuario)
     direccion_ip = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True)
     
     # Información de la acción
     accion = models.CharField(
@@ -50,30 +112,49 @@ class AuditoriaLog(models.Model):
     object_id = models.PositiveIntegerField(null=True, blank=True)
     objeto_afectado = GenericForeignKey('content_type', 'object_id')
     
-    # Detalles adicionales
+    # Detalles adicionales. Los logs nuevos guardan un código de plantilla y
+    # sus parámetros; descripcion queda para textos libres y logs anteriores
     descripcion = models.TextField(blank=True)
+    codigo = models.CharField(max_length=30, blank=True, default='')
+    parametros = models.JSONField(null=True, blank=True)
     datos_anteriores = models.JSONField(null=True, blank=True)  # Para updates
     datos_nuevos = models.JSONField(null=True, blank=True)
     
     # Metadata
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Se asigna al crear el log (no al insertarlo) para que el escritor en lote
+    # conserve el momento real del evento
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     exito = models.BooleanField(default=True)  # Si la acción fue exitosa
     
+    # Texto indexado de la descripción; en PostgreSQL lo completa un trigger
+    busqueda = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         db_table = 'auditoria_logs'
         ordering = ['-timestamp']
         indexes = [
-            models.Index(fields=['usuario', 'timestamp']),
+            # Índices compuestos con id para la paginación por cursor
+            models.Index(fields=['timestamp', 'id'], name='auditoria_ts_id_idx'),
+            models.Index(fields=['usuario', 'timestamp', 'id'], name='auditoria_usuario_ts_id_idx'),
             models.Index(fields=['accion', 'timestamp']),
             models.Index(fields=['content_type', 'object_id']),
+            models.Index(fields=['direccion_ip', 'timestamp'], name='auditoria_ip_ts_idx'),
         ]
     
     def __str__(self):
         usuario_str = self.usuario.email if self.usuario else 'Anónimo'
         return f'{usuario_str} - {self.get_accion_display()} - {self.timestamp}'
+    
+    @property
+    def texto_descripcion(self):
+        """Descripción legible, renderizada desde la plantilla si tiene código"""
+        if not self.codigo:
+            return self.descripcion
+        from .plantillas import parametros_log, renderizar
+        return renderizar(self.codigo, parametros_log(self))
 
 
-class SesionUsuario(models.Model):
+class SesionUsuario(ConAgenteUsuario):
     """Modelo para trackear sesiones de usuarios"""
     
     usuario = models.ForeignKey(
@@ -85,7 +166,6 @@ class SesionUsuario(models.Model):
     # Datos de la sesión
     session_key = models.CharField(max_length=40, unique=True)
     direccion_ip = models.GenericIPAddressField()
-    user_agent = models.TextField(blank=True)
     
     # Timestamps
     fecha_inicio = models.DateTimeField(auto_now_add=True)
@@ -98,6 +178,116 @@ class SesionUsuario(models.Model):
     class Meta:
         db_table = 'sesiones_usuario'
         ordering = ['-fecha_inicio']
+        indexes = [
+            models.Index(fields=['fecha_inicio', 'id'], name='sesion_inicio_id_idx'),
+            models.Index(fields=['activa', 'fecha_inicio', 'id'], name='sesion_activa_inicio_id_idx'),
+        ]
     
     def __str__(self):
         return f'{self.usuario.email} - {self.fecha_inicio}'
+
+
+class PlantillaDescripcion(models.Model):
+    """Copia en BD de las plantillas de descripción, usada por el trigger de búsqueda"""
+    
+    codigo = models.CharField(max_length=30, primary_key=True)
+    plantilla = models.TextField()
+    
+    class Meta:
+        db_table = 'auditoria_plantillas'
+        verbose_name = 'Plantilla de descripción'
+        verbose_name_plural = 'Plantillas de descripción'
+    
+    def __str__(self):
+        return self.codigo
+
+
+class TokenRevocado(models.Model):
+    """
+    Token JWT revocado. El jti 'usuario:<id>' revoca todos los tokens del
+    usuario emitidos hasta revocado_en. La fila deja de tener efecto en
+    expira, cuando los tokens que revoca ya vencieron.
+    """
+    
+    jti = models.CharField(max_length=255, unique=True)
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='tokens_revocados'
+    )
+    revocado_en = models.DateTimeField(default=timezone.now)
+    expira = models.DateTimeField(db_index=True)
+    motivo = models.CharField(max_length=100, blank=True, default='')
+    
+    class Meta:
+        db_table = 'auditoria_tokens_revocados'
+        verbose_name = 'Token revocado'
+        verbose_name_plural = 'Tokens revocados'
+    
+    def __str__(self):
+        return self.jti
+
+
+class ResumenAuditoriaBase(models.Model):
+    """Conteo incremental de logs por acción, usuario y resultado"""
+    
+    accion = models.CharField(max_length=20, choices=TipoAccion.choices)
+    # Sin restricción en BD para conservar los conteos de usuarios eliminados
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    exito = models.BooleanField()
+    total = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        abstract = True
+
+
+class ResumenAuditoriaHora(ResumenAuditoriaBase):
+    """Resumen de auditoría por hora (UTC)"""
+    
+    hora = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'auditoria_resumen_hora'
+        ordering = ['-hora']
+        constraints = [
+            # COALESCE permite tratar al usuario anónimo como una sola clave en el upsert
+            models.UniqueConstraint(
+                'hora', 'accion',
+                Coalesce('usuario', 0),
+                'exito',
+                name='resumen_hora_unico'
+            ),
+        ]
+    
+    def __str__(self):
+        return f'{self.hora} - {self.accion}: {self.total}'
+
+
+class ResumenAuditoriaDia(ResumenAuditoriaBase):
+    """Resumen de auditoría por día (UTC)"""
+    
+    dia = models.DateField()
+    
+    class Meta:
+        db_table = 'auditoria_resumen_dia'
+        ordering = ['-dia']
+        constraints = [
+            models.UniqueConstraint(
+                'dia', 'accion',
+                Coalesce('usuario', 0),
+                'exito',
+                name='resumen_dia_unico'
+            ),
+        ]
+    
+    def __str__(self):
+        return f'{self.dia} - {self.accion}: {self.total}'
@@ -0,0 +1,164 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre el par (campo, id).
+
+    Cada página se obtiene con una comparación contra la última fila vista,
+    que el índice compuesto (campo, id) resuelve sin OFFSET ni COUNT(*).
+    El cursor es opaco y sigue siendo válido aunque se inserten filas nuevas.
+    """
+
+    campo = None
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.campo_orden = self.get_campo(queryset)
+        campo = self.campo_orden
+        self.descendente = request.query_params.get(self.ordering_query_param) != campo
+
+        cursor = self.decode_cursor(request, queryset)
+        hacia_atras = cursor is not None and cursor[2]
+
+        # Al retroceder se recorre en sentido contrario y luego se invierte
+        recorrido_desc = self.descendente != hacia_atras
+        if recorrido_desc:
+            queryset = queryset.order_by(f'-{campo}', '-id')
+        else:
+            queryset = queryset.order_by(campo, 'id')
+
+        if cursor is not None:
+            valor, pk, _ = cursor
+            if recorrido_desc:
+                # La cota simple sobre el campo permite un range scan del índice
+                queryset = queryset.filter(**{f'{campo}__lte': valor}).filter(
+                    Q(**{f'{campo}__lt': valor}) | Q(**{campo: valor, 'id__lt': pk})
+                )
+            else:
+                queryset = queryset.filter(**{f'{campo}__gte': valor}).filter(
+                    Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'id__gt': pk})
+                )
+
+        filas = list(queryset[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+
+        if hacia_atras:
+            filas.reverse()
+            self.hay_siguiente = True
+            self.hay_anterior = hay_mas
+        else:
+            self.hay_siguiente = hay_mas
+            self.hay_anterior = cursor is not None
+
+        self.filas = filas
+        return filas
+
+    def get_campo(self, queryset):
+        """Campo de orden de la página; las subclases pueden elegirlo según el queryset"""
+        return self.campo
+
+    def get_page_size(self, request):
+        try:
+            tamanio = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if tamanio <= 0:
+            return self.page_size
+        return min(tamanio, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.hay_siguiente or not self.filas:
+            return None
+        return self.encode_cursor(self.filas[-1], hacia_atras=False)
+
+    def get_previous_link(self):
+        if not self.hay_anterior:
+            return None
+        if not self.filas:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.filas[0], hacia_atras=True)
+
+    def decode_cursor(self, request, queryset):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            valor = self._campo_salida(queryset).to_python(datos['v'])
+            pk = int(datos['id'])
+            hacia_atras = bool(datos.get('a'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        if valor is None:
+            raise NotFound(self.invalid_cursor_message)
+        return valor, pk, hacia_atras
+
+    def _campo_salida(self, queryset):
+        anotacion = queryset.query.annotations.get(self.campo_orden)
+        if anotacion is not None:
+            return anotacion.output_field
+        return queryset.model._meta.get_field(self.campo_orden)
+
+    def encode_cursor(self, fila, hacia_atras):
+        valor = getattr(fila, self.campo_orden)
+        datos = {
+            'v': valor.isoformat() if hasattr(valor, 'isoformat') else valor,
+            'id': fila.pk,
+        }
+        if hacia_atras:
+            datos['a'] = 1
+        cursor = base64.urlsafe_b64encode(json.dumps(datos).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class AuditoriaLogPagination(KeysetPagination):
+    """Paginación de logs por (timestamp, id), o por (rango, id) en búsquedas de texto"""
+    campo = 'timestamp'
+    campo_rango = 'rango'
+
+    def get_campo(self, queryset):
+        if self.campo_rango in queryset.query.annotations:
+            return self.campo_rango
+        return self.campo
+
+
+class SesionUsuarioPagination(KeysetPagination):
+    """Paginación de sesiones por (fecha_inicio, id)"""
+    campo = 'fecha_inicio'
@@ -0,0 +1,227 @@
+"""
+Particionamiento mensual por rango de la tabla auditoria_logs (solo PostgreSQL).
+
+La tabla padre se particiona por `timestamp` y cada mes vive en su propia
+partición `auditoria_logs_pAAAA_MM`. La partición por defecto recibe cualquier
+fila fuera de los rangos creados para que un insert nunca falle. La retención
+se hace separando (DETACH) o eliminando particiones completas.
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+
+TABLA = 'auditoria_logs'
+PARTICION_DEFAULT = f'{TABLA}_default'
+_PATRON_PARTICION = re.compile(rf'^{TABLA}_p(\d{{4}})_(\d{{2}})$')
+
+
+def soporta_particiones(conexion=None):
+    """Indica si la base de datos permite particionamiento nativo"""
+    return (conexion or connection).vendor == 'postgresql'
+
+
+def inicio_mes(fecha):
+    """Retorna el primer instante (UTC) del mes de la fecha dada"""
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(dt_timezone.utc)
+    return datetime(fecha.year, fecha.month, 1, tzinfo=dt_timezone.utc)
+
+
+def sumar_meses(fecha, meses):
+    """Suma (o resta) meses a una fecha de inicio de mes"""
+    indice = fecha.year * 12 + fecha.month - 1 + meses
+    return fecha.replace(year=indice // 12, month=indice % 12 + 1)
+
+
+def nombre_particion(inicio):
+    """Nombre de la partición mensual que empieza en `inicio`"""
+    return f'{TABLA}_p{inicio.year:04d}_{inicio.month:02d}'
+
+
+def es_particionada(cursor):
+    """Indica si auditoria_logs ya es una tabla particionada"""
+    cursor.execute(
+        "SELECT c.relkind FROM pg_class c "
+        "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+        [TABLA]
+    )
+    fila = cursor.fetchone()
+    return bool(fila) and fila[0] == 'p'
+
+
+def listar_particiones(cursor):
+    """Retorna [(nombre, inicio)] de las particiones mensuales, ordenadas"""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = %s",
+        [TABLA]
+    )
+    particiones = []
+    for (nombre,) in cursor.fetchall():
+        coincidencia = _PATRON_PARTICION.match(nombre)
+        if coincidencia:
+            inicio = datetime(int(coincidencia.group(1)), int(coincidencia.group(2)), 1,
+                              tzinfo=dt_timezone.utc)
+            particiones.append((nombre, inicio))
+    return sorted(particiones, key=lambda particion: particion[1])
+
+
+def crear_particion_default(cursor):
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {PARTICION_DEFAULT} PARTITION OF {TABLA} DEFAULT'
+    )
+
+
+def crear_particion(cursor, inicio):
+    """
+    Crea la partición del mes que empieza en `inicio` si no existe.
+
+    Si la partición por defecto ya tiene filas de ese rango, se mueven a la
+    nueva partición dentro de la misma transacción.
+    """
+    inicio = inicio_mes(inicio)
+    fin = sumar_meses(inicio, 1)
+    nombre = nombre_particion(inicio)
+
+    if any(existente == nombre for existente, _ in listar_particiones(cursor)):
+        return False
+
+    cursor.execute(
+        f'SELECT 1 FROM {PARTICION_DEFAULT} WHERE "timestamp" >= %s AND "timestamp" < %s LIMIT 1',
+        [inicio, fin]
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(
+            f'CREATE TABLE {nombre} PARTITION OF {TABLA} FOR VALUES FROM (%s) TO (%s)',
+            [inicio, fin]
+        )
+        return True
+
+    with transaction.atomic(using=cursor.db.alias):
+        cursor.execute(f'ALTER TABLE {TABLA} DETACH PARTITION {PARTICION_DEFAULT}')
+        cursor.execute(
+            f'CREATE TABLE {nombre} PARTITION OF {TABLA} FOR VALUES FROM (%s) TO (%s)',
+            [inicio, fin]
+        )
+        cursor.execute(
+            f'INSERT INTO {TABLA} SELECT * FROM {PARTICION_DEFAULT} '
+            f'WHERE "timestamp" >= %s AND "timestamp" < %s',
+            [inicio, fin]
+        )
+        cursor.execute(
+            f'DELETE FROM {PARTICION_DEFAULT} WHERE "timestamp" >= %s AND "timestamp" < %s',
+            [inicio, fin]
+        )
+        cursor.execute(f'ALTER TABLE {TABLA} ATTACH PARTITION {PARTICION_DEFAULT} DEFAULT')
+    return True
+
+
+def crear_particiones_futuras(cursor, desde, meses):
+    """Crea las particiones desde el mes de `desde` hasta `meses` meses adelante"""
+    inicio = inicio_mes(desde)
+    creadas = []
+    for desplazamiento in range(meses + 1):
+        mes = sumar_meses(inicio, desplazamiento)
+        if crear_particion(cursor, mes):
+            creadas.append(nombre_particion(mes))
+    return creadas
+
+
+def retirar_particiones(cursor, antes_de, eliminar=False):
+    """
+    Separa las particiones cuyo rango termina antes de `antes_de`.
+
+    Las particiones separadas quedan como tablas independientes (para
+    archivarlas) salvo que `eliminar` sea True, en cuyo caso se eliminan.
+    """
+    limite = inicio_mes(antes_de)
+    retiradas = []
+    for nombre, inicio in listar_particiones(cursor):
+        if sumar_meses(inicio, 1) > limite:
+            continue
+        cursor.execute(f'ALTER TABLE {TABLA} DETACH PARTITION {nombre}')
+        if eliminar:
+            cursor.execute(f'DROP TABLE {nombre}')
+        retiradas.append(nombre)
+    return retiradas
+
+
+def _definiciones_tabla(cursor, tabla):
+    """Captura índices y claves foráneas de una tabla (sin la clave primaria)"""
+    cursor.execute(
+        "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+        "JOIN pg_class t ON t.oid = i.indrelid "
+        "WHERE t.relname = %s AND NOT i.indisprimary",
+        [tabla]
+    )
+    indices = [fila[0] for fila in cursor.fetchall()]
+
+    cursor.execute(
+        "SELECT c.conname, pg_get_constraintdef(c.oid) FROM pg_constraint c "
+        "JOIN pg_class t ON t.oid = c.conrelid "
+        "WHERE t.relname = %s AND c.contype = 'f'",
+        [tabla]
+    )
+    foraneas = cursor.fetchall()
+    return indices, foraneas
+
+
+def _reconstruir_tabla(cursor, particionada, meses_adelante=3):
+    """
+    Reconstruye auditoria_logs como tabla particionada o como tabla simple,
+    conservando datos, índices (con los mismos nombres que usa Django),
+    claves foráneas y la secuencia del id.
+    """
+    antigua = f'{TABLA}_old'
+    cursor.execute(f'ALTER TABLE {TABLA} RENAME TO {antigua}')
+    indices, foraneas = _definiciones_tabla(cursor, antigua)
+
+    if particionada:
+        cursor.execute(
+            f'CREATE TABLE {TABLA} (LIKE {antigua} INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        # La clave de partición debe formar parte de la clave primaria
+        cursor.execute(f'ALTER TABLE {TABLA} ADD PRIMARY KEY (id, "timestamp")')
+        crear_particion_default(cursor)
+
+        cursor.execute(f'SELECT MIN("timestamp") FROM {antigua}')
+        desde = cursor.fetchone()[0] or datetime.now(dt_timezone.utc)
+        hasta = inicio_mes(datetime.now(dt_timezone.utc))
+        meses = (hasta.year - desde.year) * 12 + hasta.month - desde.month + meses_adelante
+        crear_particiones_futuras(cursor, desde, meses)
+    else:
+        cursor.execute(f'CREATE TABLE {TABLA} (LIKE {antigua} INCLUDING CONSTRAINTS)')
+        cursor.execute(f'ALTER TABLE {TABLA} ADD PRIMARY KEY (id)')
+
+    cursor.execute(f'INSERT INTO {TABLA} SELECT * FROM {antigua}')
+    cursor.execute(f'DROP TABLE {antigua} CASCADE')
+
+    # Secuencia propia del id (la identidad de la tabla original se elimina con ella)
+    cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {TABLA}_id_seq OWNED BY {TABLA}.id')
+    cursor.execute(
+        f"SELECT setval('{TABLA}_id_seq', COALESCE((SELECT MAX(id) FROM {TABLA}), 0) + 1, false)"
+    )
+    cursor.execute(
+        f"ALTER TABLE {TABLA} ALTER COLUMN id SET DEFAULT nextval('{TABLA}_id_seq')"
+    )
+
+    for definicion in indices:
+        cursor.execute(re.sub(rf'\bON (ONLY )?(\S+\.)?{antigua}\b', f'ON {TABLA}', definicion))
+    for nombre, definicion in foraneas:
+        cursor.execute(f'ALTER TABLE {TABLA} ADD CONSTRAINT {nombre} {definicion}')
+
+
+def particionar_tabla(cursor, meses_adelante=3):
+    """Convierte auditoria_logs en una tabla particionada por mes"""
+    if not es_particionada(cursor):
+        _reconstruir_tabla(cursor, particionada=True, meses_adelante=meses_adelante)
+
+
+def desparticionar_tabla(cursor):
+    """Revierte auditoria_logs a una tabla simple"""
+    if es_particionada(cursor):
+        _reconstruir_tabla(cursor, particionada=False)
@@ -0,0 +1,72 @@
+"""
+Descripciones de auditoría codificadas.
+
+Los logs guardan un código y sus parámetros; el texto se arma al leerlos.
+Los parámetros `modelo` e `id` salen del content_type y object_id del
+propio log, por lo que los logs CRUD no necesitan parámetros propios.
+Las plantillas se copian a la tabla auditoria_plantillas para que el
+trigger de búsqueda de PostgreSQL indexe el texto renderizado.
+"""
+from functools import lru_cache
+from string import Formatter
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS
+
+PLANTILLAS = {
+    'LOGIN': 'Usuario {email} inició sesión exitosamente',
+    'LOGOUT': 'Usuario {email} cerró sesión',
+    'LOGIN_FAILED': 'Intento de login fallido para: {email}',
+    'CREATE': 'Se creó {modelo} con ID {id}',
+    'UPDATE': 'Se actualizó {modelo} con ID {id}',
+    'DELETE': 'Se eliminó {modelo} con ID {id}',
+}
+
+
+@lru_cache(maxsize=None)
+def _compilar(plantilla):
+    """Separa la plantilla en pares (literal, parámetro) una sola vez"""
+    return tuple((literal, campo) for literal, campo, _, _ in Formatter().parse(plantilla))
+
+
+def renderizar(codigo, parametros=None):
+    """
+    Arma el texto de una plantilla. Los parámetros faltantes se dejan
+    como {nombre}, igual que en el trigger de búsqueda.
+    """
+    plantilla = PLANTILLAS.get(codigo)
+    if plantilla is None:
+        return ''
+
+    parametros = parametros or {}
+    partes = []
+    for literal, campo in _compilar(plantilla):
+        partes.append(literal)
+        if campo is not None:
+            valor = parametros.get(campo)
+            partes.append('{%s}' % campo if valor is None else str(valor))
+    return ''.join(partes)
+
+
+def parametros_log(log):
+    """Parámetros de la plantilla de un log, incluidos modelo e id"""
+    parametros = {}
+    if log.content_type_id:
+        parametros['modelo'] = ContentType.objects.get_for_id(log.content_type_id).model
+    if log.object_id is not None:
+        parametros['id'] = log.object_id
+    parametros.update(log.parametros or {})
+    return parametros
+
+
+def sincronizar_plantillas(using=DEFAULT_DB_ALIAS, modelo=None):
+    """Copia PLANTILLAS a la tabla de plantillas (alta o actualización)"""
+    if modelo is None:
+        from .models import PlantillaDescripcion as modelo
+
+    modelo.objects.using(using).bulk_create(
+        [modelo(codigo=codigo, plantilla=plantilla) for codigo, plantilla in PLANTILLAS.items()],
+        update_conflicts=True,
+        unique_fields=['codigo'],
+        update_fields=['plantilla'],
+    )
@@ -0,0 +1,135 @@
+"""
+Registro de modelos auditados.
+
+Cada modelo se declara con los campos a guardar y las acciones a
+registrar. Las señales se conectan solo para esos modelos, de modo que
+guardar o eliminar un modelo no auditado no ejecuta ningún receptor.
+"""
+import functools
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .models import TipoAccion
+
+ACCIONES_MODELO = (TipoAccion.CREATE, TipoAccion.UPDATE, TipoAccion.DELETE)
+
+# Campos que nunca se guardan en los logs, aunque se pidan explícitamente
+CAMPOS_SENSIBLES = frozenset({'password'})
+
+
+class ModeloAuditado:
+    """Configuración de auditoría de un modelo"""
+
+    def __init__(self, modelo, campos=None, excluir=None, acciones=None):
+        self.modelo = modelo
+        acciones = tuple(acciones) if acciones is not None else ACCIONES_MODELO
+
+        invalidas = set(acciones) - set(ACCIONES_MODELO)
+        if invalidas:
+            raise ImproperlyConfigured(
+                f'Acciones no auditables para {modelo._meta.label}: {", ".join(sorted(invalidas))}'
+            )
+        for nombre in list(campos or []) + list(excluir or []):
+            try:
+                modelo._meta.get_field(nombre)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(f'{modelo._meta.label} no tiene el campo "{nombre}"')
+
+        self.acciones = acciones
+        self.campos = list(campos) if campos is not None else None
+        self.excluir = sorted(set(excluir or []) | {
+            campo.name for campo in modelo._meta.get_fields() if campo.name in CAMPOS_SENSIBLES
+        })
+
+        # attname de los campos concretos cuyo valor se captura en post_init
+        self.atributos = frozenset(
+            campo.attname for campo in modelo._meta.concrete_fields
+            if (self.campos is None or campo.name in self.campos) and campo.name not in self.excluir
+        )
+
+    def audita(self, accion):
+        return accion in self.acciones
+
+
+class RegistroAuditoria:
+    """Modelos auditados y conexión de sus señales"""
+
+    def __init__(self):
+        self._modelos = {}
+
+    def registrar(self, modelo, campos=None, excluir=None, acciones=None):
+        """Audita un modelo; si ya estaba registrado se reemplaza su configuración"""
+        from . import signals
+
+        if modelo in self._modelos:
+            self.desregistrar(modelo)
+
+        config = ModeloAuditado(modelo, campos=campos, excluir=excluir, acciones=acciones)
+        self._modelos[modelo] = config
+
+        uid = self._uid(modelo)
+        if config.audita(TipoAccion.UPDATE):
+            post_init.connect(signals.capturar_estado_inicial, sender=modelo, dispatch_uid=uid)
+            self._instalar_refresco(modelo)
+        if config.audita(TipoAccion.CREATE) or config.audita(TipoAccion.UPDATE):
+            post_save.connect(signals.log_modelo_creado_actualizado, sender=modelo, dispatch_uid=uid)
+        if config.audita(TipoAccion.DELETE):
+            post_delete.connect(signals.log_modelo_eliminado, sender=modelo, dispatch_uid=uid)
+        return config
+
+    def desregistrar(self, modelo):
+        self._modelos.pop(modelo, None)
+        uid = self._uid(modelo)
+        for senal in (post_init, post_save, post_delete):
+            senal.disconnect(sender=modelo, dispatch_uid=uid)
+
+    def obtener(self, modelo):
+        return self._modelos.get(modelo)
+
+    def modelos(self):
+        return list(self._modelos)
+
+    def cargar_configuracion(self):
+        """Registra los modelos declarados en AUDITORIA_MODELOS"""
+        declarados = getattr(settings, 'AUDITORIA_MODELOS', None)
+        if declarados is None:
+            declarados = {settings.AUTH_USER_MODEL: {}}
+
+        for etiqueta, opciones in declarados.items():
+            try:
+                modelo = apps.get_model(etiqueta)
+            except (LookupError, ValueError):
+                raise ImproperlyConfigured(f'AUDITORIA_MODELOS: modelo desconocido "{etiqueta}"')
+            self.registrar(modelo, **(opciones or {}))
+
+    @staticmethod
+    def _instalar_refresco(modelo):
+        """
+        refresh_from_db no emite post_init sobre la instancia refrescada: sin
+        este envoltorio el estado capturado seguiría siendo el de la carga
+        original. Queda instalado aunque el modelo se desregistre; sin
+        configuración no hace nada.
+        """
+        from . import signals
+
+        original = modelo.refresh_from_db
+        if getattr(original, 'auditoria_refresco', False):
+            return
+
+        @functools.wraps(original)
+        def refresh_from_db(self, using=None, fields=None, **kwargs):
+            original(self, using=using, fields=fields, **kwargs)
+            signals.capturar_estado_refrescado(self, fields)
+
+        refresh_from_db.auditoria_refresco = True
+        modelo.refresh_from_db = refresh_from_db
+
+    @staticmethod
+    def _uid(modelo):
+        return f'auditoria:{modelo._meta.label_lower}'
+
+
+registro = RegistroAuditoria()
@@ -0,0 +1,189 @@
+"""
+Resúmenes incrementales de auditoría por hora y por día.
+
+Cada lote de logs escrito suma sus conteos en auditoria_resumen_hora y
+auditoria_resumen_dia mediante un upsert, de modo que las estadísticas se
+leen de estas tablas en lugar de agregar la tabla de logs completa.
+Las horas y los días se calculan en UTC.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+
+from .models import AuditoriaLog, ResumenAuditoriaDia, ResumenAuditoriaHora
+
+
+def _truncar_hora(fecha):
+    return fecha.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _inicio_dia(fecha):
+    return datetime.combine(fecha, time.min, tzinfo=dt_timezone.utc)
+
+
+def _upsert(cursor, modelo, campo_periodo, conteos):
+    """Suma los conteos a la tabla de resumen (INSERT ... ON CONFLICT)"""
+    if not conteos:
+        return
+
+    tabla = connection.ops.quote_name(modelo._meta.db_table)
+    periodo = connection.ops.quote_name(campo_periodo)
+    campo = modelo._meta.get_field(campo_periodo)
+    exito = modelo._meta.get_field('exito')
+
+    sql = (
+        f'INSERT INTO {tabla} ({periodo}, accion, usuario_id, exito, total) '
+        f'VALUES (%s, %s, %s, %s, %s) '
+        f'ON CONFLICT ({periodo}, accion, (COALESCE(usuario_id, 0)), exito) '
+        f'DO UPDATE SET total = {tabla}.total + EXCLUDED.total'
+    )
+    # Orden estable para que escritores concurrentes no se bloqueen mutuamente
+    claves = sorted(conteos, key=lambda clave: (clave[0], clave[1], clave[2] or 0, clave[3]))
+    cursor.executemany(sql, [
+        (
+            campo.get_db_prep_value(valor_periodo, connection),
+            accion,
+            usuario_id,
+            exito.get_db_prep_value(es_exitoso, connection),
+            conteos[(valor_periodo, accion, usuario_id, es_exitoso)],
+        )
+        for valor_periodo, accion, usuario_id, es_exitoso in claves
+    ])
+
+
+def acumular_resumenes(logs):
+    """Suma un lote de logs recién insertados a los resúmenes"""
+    horas = Counter()
+    dias = Counter()
+    for log in logs:
+        hora = _truncar_hora(log.timestamp)
+        horas[(hora, log.accion, log.usuario_id, log.exito)] += 1
+        dias[(hora.date(), log.accion, log.usuario_id, log.exito)] += 1
+
+    with connection.cursor() as cursor:
+        _upsert(cursor, ResumenAuditoriaHora, 'hora', horas)
+        _upsert(cursor, ResumenAuditoriaDia, 'dia', dias)
+
+
+def reconstruir_resumenes(desde, hasta):
+    """
+    Recalcula los resúmenes desde los logs crudos, día por día.
+
+    El rango se amplía a días completos (UTC). Retorna la cantidad de días
+    procesados y de logs contabilizados.
+    """
+    dia = desde.astimezone(dt_timezone.utc).date()
+    ultimo = hasta.astimezone(dt_timezone.utc).date()
+    dias_procesados = 0
+    logs_contados = 0
+
+    while dia <= ultimo:
+        inicio = _inicio_dia(dia)
+        fin = inicio + timedelta(days=1)
+
+        filas = (
+            AuditoriaLog.objects
+            .filter(timestamp__gte=inicio, timestamp__lt=fin)
+            .annotate(hora=TruncHour('timestamp', tzinfo=dt_timezone.utc))
+            .values('hora', 'accion', 'usuario', 'exito')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+
+        horas = []
+        dias = Counter()
+        for fila in filas:
+            horas.append(ResumenAuditoriaHora(
+                hora=fila['hora'],
+                accion=fila['accion'],
+                usuario_id=fila['usuario'],
+                exito=fila['exito'],
+                total=fila['total']
+            ))
+            dias[(fila['accion'], fila['usuario'], fila['exito'])] += fila['total']
+
+        with transaction.atomic():
+            ResumenAuditoriaHora.objects.filter(hora__gte=inicio, hora__lt=fin).delete()
+            ResumenAuditoriaDia.objects.filter(dia=dia).delete()
+            ResumenAuditoriaHora.objects.bulk_create(horas, batch_size=1000)
+            ResumenAuditoriaDia.objects.bulk_create([
+                ResumenAuditoriaDia(
+                    dia=dia,
+                    accion=accion,
+                    usuario_id=usuario_id,
+                    exito=exito,
+                    total=total
+                )
+                for (accion, usuario_id, exito), total in dias.items()
+            ], batch_size=1000)
+
+        dias_procesados += 1
+        logs_contados += sum(dias.values())
+        dia += timedelta(days=1)
+
+    return dias_procesados, logs_contados
+
+
+def estadisticas_periodo(fecha_desde, limite_usuarios=10):
+    """
+    Estadísticas de auditoría desde `fecha_desde` leyendo solo los resúmenes.
+
+    El primer día (parcial) se toma del resumen por hora y el resto del
+    resumen por día, por lo que la precisión es de una hora.
+    """
+    inicio_hora = _truncar_hora(fecha_desde)
+    primer_dia = inicio_hora.date()
+    siguiente_dia = _inicio_dia(primer_dia) + timedelta(days=1)
+
+    resumenes = [
+        ResumenAuditoriaHora.objects.filter(hora__gte=inicio_hora, hora__lt=siguiente_dia),
+        ResumenAuditoriaDia.objects.filter(dia__gte=siguiente_dia.date()),
+    ]
+
+    por_accion = Counter()
+    por_usuario = Counter()
+    por_dia = defaultdict(lambda: {'total': 0, 'exitosos': 0, 'fallidos': 0})
+
+    for queryset in resumenes:
+        for fila in queryset.values('accion').annotate(suma=Sum('total')).order_by():
+            por_accion[fila['accion']] += fila['suma']
+
+        for fila in queryset.filter(usuario__isnull=False).values(
+            'usuario__email'
+        ).annotate(suma=Sum('total')).order_by():
+            if fila['usuario__email']:
+                por_usuario[fila['usuario__email']] += fila['suma']
+
+    # Primer día parcial desde el resumen por hora
+    for fila in resumenes[0].values('exito').annotate(suma=Sum('total')).order_by():
+        _sumar_dia(por_dia[primer_dia], fila['exito'], fila['suma'])
+
+    for fila in resumenes[1].values('dia', 'exito').annotate(suma=Sum('total')).order_by():
+        _sumar_dia(por_dia[fila['dia']], fila['exito'], fila['suma'])
+
+    return {
+        'total_eventos': sum(por_accion.values()),
+        'estadisticas_por_accion': [
+            {'accion': accion, 'total': total}
+            for accion, total in por_accion.most_common()
+        ],
+        'usuarios_mas_activos': [
+            {'usuario__email': email, 'total': total}
+            for email, total in por_usuario.most_common(limite_usuarios)
+        ],
+        'actividad_por_dia': [
+            {'dia': dia, **conteos}
+            for dia, conteos in sorted(por_dia.items())
+        ],
+    }
+
+
+def _sumar_dia(conteos, exito, total):
+    conteos['total'] += total
+    if exito:
+        conteos['exitosos'] += total
+    else:
+        conteos['fallidos'] += total
@@ -0,0 +1,213 @@
+"""
+Retención y archivo de logs de auditoría por lotes.
+
+Los logs vencidos se recorren por rangos de id acotados. Cada lote se
+escribe primero en archivos JSONL comprimidos (uno por día) y luego se
+elimina en su propia transacción, de modo que ninguna operación mantiene
+bloqueos ni genera WAL en exceso. El avance se guarda para poder reanudar.
+"""
+import gzip
+import json
+import os
+import time
+from datetime import timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .agentes import resolver_agentes
+from .models import AuditoriaLog, SesionUsuario
+
+ARCHIVO_PROGRESO = 'progreso.json'
+
+# La columna de búsqueda se recalcula al restaurar, no se archiva. El
+# User-Agent se archiva como texto para no depender de AgenteUsuario
+CAMPOS_ARCHIVO = [
+    campo.attname for campo in AuditoriaLog._meta.concrete_fields
+    if campo.name not in ('busqueda', 'agente')
+]
+
+
+class ArchivoAuditoria:
+    """Archivo de logs en JSONL comprimido, particionado por fecha"""
+
+    def __init__(self, directorio):
+        self.directorio = Path(directorio)
+
+    def ruta(self, fecha):
+        return self.directorio / f'{fecha:%Y}' / f'{fecha:%m}' / f'auditoria_logs_{fecha:%Y-%m-%d}.jsonl.gz'
+
+    def escribir(self, filas):
+        """Agrega las filas a los archivos de su día (un miembro gzip por lote)"""
+        por_dia = {}
+        for fila in filas:
+            fecha = fila['timestamp'].astimezone(dt_timezone.utc).date()
+            por_dia.setdefault(fecha, []).append(fila)
+
+        for fecha, filas_dia in por_dia.items():
+            ruta = self.ruta(fecha)
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            with open(ruta, 'ab') as archivo:
+                with gzip.GzipFile(fileobj=archivo, mode='wb') as comprimido:
+                    for fila in filas_dia:
+                        linea = json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False)
+                        comprimido.write(linea.encode('utf-8') + b'\n')
+                archivo.flush()
+                os.fsync(archivo.fileno())
+
+    @staticmethod
+    def leer(ruta):
+        """Itera las filas de un archivo de auditoría"""
+        with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+            for linea in archivo:
+                if linea.strip():
+                    yield json.loads(linea)
+
+
+def restaurar_archivo(ruta, lote=1000):
+    """
+    Recarga un archivo de auditoría en la tabla de logs.
+
+    Los ids se conservan y los que ya existen se ignoran, por lo que
+    restaurar dos veces el mismo archivo es seguro.
+    """
+    campos = set(CAMPOS_ARCHIVO) | {'user_agent'}
+    restaurados = 0
+    pendientes = []
+
+    for fila in ArchivoAuditoria.leer(ruta):
+        pendientes.append(AuditoriaLog(**{k: v for k, v in fila.items() if k in campos}))
+        if len(pendientes) >= lote:
+            restaurados += _insertar_restaurados(pendientes)
+            pendientes = []
+
+    if pendientes:
+        restaurados += _insertar_restaurados(pendientes)
+    return restaurados
+
+
+def _insertar_restaurados(logs):
+    with transaction.atomic():
+        resolver_agentes(logs)
+        AuditoriaLog.objects.bulk_create(logs, ignore_conflicts=True)
+    return len(logs)
+
+
+class MotorRetencion:
+    """Aplica la política de retención por acción en lotes de ids"""
+
+    def __init__(self, dias_defecto, dias_por_accion=None, lote=5000, pausa=0.0,
+                 directorio_archivo=None, archivar=True, reanudar=True):
+        self.dias_defecto = dias_defecto
+        self.dias_por_accion = dias_por_accion or {}
+        self.lote = lote
+        self.pausa = pausa
+        self.archivo = ArchivoAuditoria(directorio_archivo) if archivar else None
+        self.ruta_progreso = Path(directorio_archivo) / ARCHIVO_PROGRESO if directorio_archivo else None
+        self.progreso = self._cargar_progreso() if reanudar else {}
+
+    def reglas(self, ahora=None):
+        """Retorna [(nombre, filtro, fecha_limite)] de cada regla de retención"""
+        ahora = ahora or timezone.now()
+        reglas = [
+            (accion, Q(accion=accion), ahora - timedelta(days=dias))
+            for accion, dias in sorted(self.dias_por_accion.items())
+        ]
+        # La regla por defecto cubre las acciones sin periodo propio
+        reglas.append((
+            'defecto',
+            ~Q(accion__in=list(self.dias_por_accion)),
+            ahora - timedelta(days=self.dias_defecto)
+        ))
+        return reglas
+
+    def ejecutar(self, simular=False, notificar=None):
+        """Aplica todas las reglas. Retorna {regla: filas eliminadas}"""
+        resultado = {}
+        for nombre, filtro, limite in self.reglas():
+            resultado[nombre] = self.aplicar_regla(nombre, filtro, limite, simular, notificar)
+        return resultado
+
+    def aplicar_regla(self, nombre, filtro, limite, simular=False, notificar=None):
+        queryset = AuditoriaLog.objects.filter(filtro, timestamp__lt=limite).order_by()
+
+        # El tope se fija al inicio: los logs que venzan durante la ejecución
+        # quedan para la siguiente corrida
+        ultimo_id = queryset.order_by('-id').values_list('id', flat=True).first()
+        if ultimo_id is None:
+            return 0
+
+        inicio = self._siguiente_id(queryset, self.progreso.get(nombre, 0) + 1)
+        eliminadas = 0
+
+        while inicio is not None and inicio <= ultimo_id:
+            fin = min(inicio + self.lote, ultimo_id + 1)
+
+            with transaction.atomic():
+                lote = queryset.filter(id__gte=inicio, id__lt=fin)
+                if simular:
+                    cantidad = lote.count()
+                else:
+                    filas = list(lote.values(*CAMPOS_ARCHIVO, user_agent=F('agente__texto')))
+                    cantidad = len(filas)
+                    if filas:
+                        if self.archivo:
+                            self.archivo.escribir(filas)
+                        AuditoriaLog.objects.filter(id__in=[fila['id'] for fila in filas]).delete()
+
+            eliminadas += cantidad
+            if not simular:
+                self.progreso[nombre] = fin - 1
+                self._guardar_progreso()
+            if notificar:
+                notificar(nombre, fin - 1, eliminadas)
+
+            inicio = self._siguiente_id(queryset, fin)
+            if self.pausa and inicio is not None:
+                time.sleep(self.pausa)
+
+        if not simular:
+            # Regla completa: la próxima corrida vuelve a empezar desde el principio
+            self.progreso.pop(nombre, None)
+            self._guardar_progreso()
+        return eliminadas
+
+    def limpiar_sesiones(self, simular=False):
+        """Elimina por lotes las sesiones inactivas fuera del periodo por defecto"""
+        limite = timezone.now() - timedelta(days=self.dias_defecto)
+        queryset = SesionUsuario.objects.filter(activa=False, fecha_ultimo_acceso__lt=limite)
+        if simular:
+            return queryset.count()
+
+        eliminadas = 0
+        while True:
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:self.lote])
+            if not ids:
+                return eliminadas
+            with transaction.atomic():
+                SesionUsuario.objects.filter(id__in=ids).delete()
+            eliminadas += len(ids)
+            if self.pausa:
+                time.sleep(self.pausa)
+
+    @staticmethod
+    def _siguiente_id(queryset, desde):
+        return queryset.filter(id__gte=desde).order_by('id').values_list('id', flat=True).first()
+
+    def _cargar_progreso(self):
+        if self.ruta_progreso and self.ruta_progreso.exists():
+            with open(self.ruta_progreso, encoding='utf-8') as archivo:
+                return json.load(archivo)
+        return {}
+
+    def _guardar_progreso(self):
+        if not self.ruta_progreso:
+            return
+        self.ruta_progreso.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta_progreso.with_suffix('.tmp')
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(self.progreso, archivo)
+        os.replace(temporal, self.ruta_progreso)
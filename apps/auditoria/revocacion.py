@@ -0,0 +1,153 @@
+"""
+Revocación de tokens JWT.
+
+Las revocaciones se guardan en TokenRevocado por jti. Revocar a un usuario
+guarda el jti 'usuario:<id>', que invalida sus tokens emitidos hasta ese
+momento. Cada proceso mantiene un filtro de Bloom con los jti vigentes:
+un token que el filtro descarta (el caso normal) se acepta sin consultar
+la base de datos; solo los posibles revocados se confirman con una
+consulta, que también descarta los falsos positivos del filtro.
+
+El claim iat tiene resolución de segundos, así que revocado_en se guarda
+truncado al segundo: revocar a un usuario invalida los tokens emitidos en
+segundos anteriores, y uno emitido en el mismo segundo (un login justo
+después de reactivarlo) sigue siendo válido.
+
+El filtro se reconstruye desde la tabla cada JWT_REVOCACION_INTERVALO
+segundos, por lo que una revocación hecha en otro proceso se aplica como
+máximo en ese tiempo. Las filas vencidas (cada una vence cuando vencen los
+tokens que revoca) se eliminan al revocar, no en la verificación, para que
+autenticar un request no escriba en la tabla.
+"""
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from core.bloom import FiltroBloom
+
+from .models import TokenRevocado
+
+PREFIJO_USUARIO = 'usuario:'
+
+
+def clave_usuario(user_id):
+    return f'{PREFIJO_USUARIO}{user_id}'
+
+
+def _fecha_claim(token, claim):
+    valor = token.get(claim)
+    return datetime.fromtimestamp(valor, tz=dt_timezone.utc) if valor is not None else None
+
+
+class RevocacionTokens:
+    """Tokens revocados con filtro de Bloom en memoria delante de la tabla"""
+
+    def __init__(self, intervalo=30.0, capacidad=10000, tasa_error=0.01):
+        self.intervalo = intervalo
+        self.capacidad = capacidad
+        self.tasa_error = tasa_error
+        self._filtro = None
+        self._proxima_carga = 0.0
+        self._lock = threading.Lock()
+
+    def esta_revocado(self, token):
+        """Indica si el token (access o refresh ya validado) fue revocado"""
+        jti = token.get(api_settings.JTI_CLAIM)
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+
+        filtro = self._filtro_vigente()
+        claves = [jti] if jti else []
+        if user_id is not None:
+            claves.append(clave_usuario(user_id))
+        claves = [clave for clave in claves if clave in filtro]
+        if not claves:
+            return False
+
+        emitido = _fecha_claim(token, 'iat')
+        revocaciones = TokenRevocado.objects.filter(
+            jti__in=claves,
+            expira__gt=timezone.now()
+        ).values_list('jti', 'revocado_en')
+        for clave, revocado_en in revocaciones:
+            if clave == jti or emitido is None or emitido < revocado_en:
+                return True
+        return False
+
+    def revocar_token(self, token, motivo=''):
+        """Revoca un token por su jti hasta su vencimiento"""
+        self._revocar(
+            token[api_settings.JTI_CLAIM],
+            _fecha_claim(token, 'exp'),
+            token.get(api_settings.USER_ID_CLAIM),
+            motivo
+        )
+
+    def revocar_usuario(self, user, motivo=''):
+        """Revoca todos los tokens del usuario emitidos hasta ahora"""
+        vida = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+        self._revocar(clave_usuario(user.pk), timezone.now() + vida, user.pk, motivo)
+
+    def _revocar(self, jti, expira, usuario_id, motivo):
+        self.purgar_vencidos()
+        TokenRevocado.objects.update_or_create(
+            jti=jti,
+            defaults={
+                'usuario_id': usuario_id,
+                'revocado_en': timezone.now().replace(microsecond=0),
+                'expira': expira,
+                'motivo': motivo,
+            }
+        )
+        transaction.on_commit(lambda: self._agregar(jti))
+
+    def purgar_vencidos(self):
+        """Elimina las revocaciones cuyos tokens ya vencieron"""
+        borrados, _ = TokenRevocado.objects.filter(expira__lte=timezone.now()).delete()
+        return borrados
+
+    def _agregar(self, jti):
+        with self._lock:
+            if self._filtro is not None:
+                self._filtro.agregar(jti)
+
+    def recargar(self):
+        """Fuerza la reconstrucción del filtro en la próxima verificación"""
+        with self._lock:
+            self._proxima_carga = 0.0
+
+    def _filtro_vigente(self):
+        if time.monotonic() < self._proxima_carga:
+            return self._filtro
+
+        with self._lock:
+            if time.monotonic() >= self._proxima_carga:
+                self._filtro = self._cargar()
+                self._proxima_carga = time.monotonic() + self.intervalo
+            return self._filtro
+
+    def _cargar(self):
+        jtis = TokenRevocado.objects.filter(expira__gt=timezone.now()).values_list('jti', flat=True)
+        return FiltroBloom.desde(jtis.iterator(), self.capacidad, self.tasa_error)
+
+
+_revocacion = None
+_revocacion_lock = threading.Lock()
+
+
+def get_revocacion_tokens():
+    """Retorna la revocación del proceso, creándola según la configuración"""
+    global _revocacion
+
+    if _revocacion is None:
+        with _revocacion_lock:
+            if _revocacion is None:
+                _revocacion = RevocacionTokens(
+                    intervalo=getattr(settings, 'JWT_REVOCACION_INTERVALO', 30.0),
+                    capacidad=getattr(settings, 'JWT_REVOCACION_CAPACIDAD', 10000),
+                )
+    return _revocacion
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import AuditoriaLog, SesionUsuario
+from .utils import reconstruir_estados
 
 
 class AuditoriaLogSerializer(serializers.ModelSerializer):
@@ -8,6 +9,8 @@ class AuditoriaLogSerializer(serializers.ModelSerializer):
     usuario_email = serializers.CharField(source='usuario.email', read_only=True)
     accion_display = serializers.CharField(source='get_accion_display', read_only=True)
     content_type_name = serializers.CharField(source='content_type.model', read_only=True)
+    # Se arma desde la plantilla al leer; los logs anteriores traen el texto guardado
+    descripcion = serializers.CharField(source='texto_descripcion', read_only=True)
     
     class Meta:
         model = AuditoriaLog
@@ -26,6 +29,33 @@ class AuditoriaLogSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class AuditoriaLogDetalleSerializer(AuditoriaLogSerializer):
+    """Serializer de detalle con el estado completo antes y después del cambio"""
+    
+    datos_anteriores = serializers.SerializerMethodField()
+    datos_nuevos = serializers.SerializerMethodField()
+    
+    class Meta(AuditoriaLogSerializer.Meta):
+        fields = AuditoriaLogSerializer.Meta.fields + [
+            'user_agent',
+            'datos_anteriores',
+            'datos_nuevos'
+        ]
+        read_only_fields = fields
+    
+    def _estados(self, obj):
+        # Los logs en modo diff guardan solo los campos modificados
+        if not hasattr(obj, '_estados_completos'):
+            obj._estados_completos = reconstruir_estados(obj)
+        return obj._estados_completos
+    
+    def get_datos_anteriores(self, obj):
+        return self._estados(obj)[0]
+    
+    def get_datos_nuevos(self, obj):
+        return self._estados(obj)[1]
+
+
 class SesionUsuarioSerializer(serializers.ModelSerializer):
     """Serializer para sesiones de usuario"""
     
@@ -1,30 +1,44 @@
-from django.db.models.signals import post_save, post_delete, pre_save
 from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.utils import timezone
-from .models import AuditoriaLog, SesionUsuario, TipoAccion
-from .utils import obtener_datos_request, serializar_objeto
+from .models import SesionUsuario, TipoAccion
+from .utils import (
+    obtener_datos_request, serializar_objeto, calcular_diff,
+    capturar_valores, serializar_estado_anterior
+)
+from .writer import registrar_log
+from .registro import registro
+from .contadores import get_contador_fallidos
+from .usuarios_jwt import invalidar_usuario
 from .middleware import get_current_user, get_current_ip, get_current_user_agent
 
-User = get_user_model()
 
-
-@receiver(user_logged_in)
-def log_user_login(sender, request, user, **kwargs):
-    """Registra cuando un usuario inicia sesión"""
+def registrar_login(request, user):
+    """
+    Log de login exitoso. Lo usan la señal user_logged_in y el login JWT,
+    que no emite esa señal. Retorna (ip, user_agent) del request.
+    """
     ip, user_agent = obtener_datos_request(request)
-    
-    # Crear log de auditoría
-    AuditoriaLog.objects.create(
+    registrar_log(
         usuario=user,
         direccion_ip=ip,
         user_agent=user_agent,
         accion=TipoAccion.LOGIN,
-        descripcion=f'Usuario {user.email} inició sesión exitosamente',
+        codigo=TipoAccion.LOGIN,
+        parametros={'email': user.email},
         exito=True
     )
+    return ip, user_agent
+
+
+@receiver(user_logged_in)
+def log_user_login(sender, request, user, **kwargs):
+    """Registra cuando un usuario inicia sesión"""
+    ip, user_agent = registrar_login(request, user)
     
     # Crear/actualizar sesión de usuario
     session_key = request.session.session_key
@@ -48,12 +62,13 @@ def log_user_logout(sender, request, user, **kwargs):
         ip, user_agent = obtener_datos_request(request)
         
         # Crear log de auditoría
-        AuditoriaLog.objects.create(
+        registrar_log(
             usuario=user,
             direccion_ip=ip,
             user_agent=user_agent,
             accion=TipoAccion.LOGOUT,
-            descripcion=f'Usuario {user.email} cerró sesión',
+            codigo=TipoAccion.LOGOUT,
+            parametros={'email': user.email},
             exito=True
         )
         
@@ -81,106 +96,168 @@ def log_user_login_failed(sender, credentials, request, **kwargs):
     # Intentar obtener el email de las credenciales
     email = credentials.get('username', 'Desconocido')
     
-    AuditoriaLog.objects.create(
+    # Contadores para las estadísticas y el bloqueo del login (contadores.py)
+    get_contador_fallidos().registrar(ip=ip, email=email)
+    
+    registrar_log(
         usuario=None,  # No hay usuario autenticado
         direccion_ip=ip,
         user_agent=user_agent,
         accion=TipoAccion.LOGIN_FAILED,
-        descripcion=f'Intento de login fallido para: {email}',
+        codigo=TipoAccion.LOGIN_FAILED,
+        parametros={'email': email},
         datos_nuevos={'email_intentado': email},
         exito=False
     )
 
 
-# Variables globales para almacenar el estado anterior de los objetos
-_objetos_anteriores = {}
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidar_usuario_jwt(sender, instance, **kwargs):
+    """Descarta el usuario de la caché del login JWT al confirmar el cambio"""
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidar_usuario(user_id))
 
 
-@receiver(pre_save)
-def capturar_estado_anterior(sender, instance, **kwargs):
-    """Captura el estado anterior del objeto antes de guardar"""
-    # Solo para modelos que queremos auditar
-    modelos_auditados = [User]  # Agregar más modelos según sea necesario
-    
-    if sender in modelos_auditados and instance.pk:
-        try:
-            objeto_anterior = sender.objects.get(pk=instance.pk)
-            _objetos_anteriores[f"{sender.__name__}_{instance.pk}"] = serializar_objeto(objeto_anterior)
-        except sender.DoesNotExist:
-            pass
+# Atributo de instancia con los valores cargados desde la base de datos
+ATRIBUTO_ESTADO = '_auditoria_valores'
+
+
+def _guardar_estado(instance, config):
+    instance.__dict__[ATRIBUTO_ESTADO] = capturar_valores(instance, config.atributos)
+
+
+def _contexto_actual():
+    """Retorna (usuario, ip, user_agent) del request en curso"""
+    usuario = get_current_user()
+    if usuario and not usuario.is_authenticated:
+        usuario = None
+
+    # Sin request (operaciones administrativas) se registra como Sistema
+    ip = get_current_ip() or '127.0.0.1'
+    user_agent = get_current_user_agent() or 'Sistema'
+    return usuario, ip, user_agent
+
+
+# Los receptores de modelos no usan @receiver: registro.py los conecta
+# solo para los modelos declarados en AUDITORIA_MODELOS
+
+def capturar_estado_inicial(sender, instance, **kwargs):
+    """Guarda en la instancia los valores con que fue cargada o creada"""
+    config = registro.obtener(sender)
+    if config:
+        _guardar_estado(instance, config)
+
+
+def capturar_estado_refrescado(instance, fields=None):
+    """Actualiza los valores capturados con los que releyó refresh_from_db"""
+    config = registro.obtener(type(instance))
+    if not config or not config.audita(TipoAccion.UPDATE):
+        return
+
+    valores = capturar_valores(instance, config.atributos)
+    if fields is not None:
+        # Recarga parcial (incluye la de campos diferidos): solo esos campos
+        refrescados = {
+            campo.attname for campo in instance._meta.concrete_fields
+            if campo.name in fields or campo.attname in fields
+        }
+        anteriores = instance.__dict__.get(ATRIBUTO_ESTADO) or {}
+        valores = {
+            **anteriores,
+            **{attname: valor for attname, valor in valores.items() if attname in refrescados}
+        }
+    instance.__dict__[ATRIBUTO_ESTADO] = valores
 
 
-@receiver(post_save)
 def log_modelo_creado_actualizado(sender, instance, created, **kwargs):
     """Registra cuando se crea o actualiza un modelo"""
-    # Solo para modelos que queremos auditar
-    modelos_auditados = [User]  # Agregar más modelos según sea necesario
-    
-    if sender in modelos_auditados:
-        # Obtener el usuario actual del contexto del hilo
-        usuario = get_current_user()
-        if usuario and not usuario.is_authenticated:
-            usuario = None
-            
-        content_type = ContentType.objects.get_for_model(sender)
-        
-        if created:
-            accion = TipoAccion.CREATE
-            descripcion = f'Se creó {content_type.model} con ID {instance.pk}'
-            datos_anteriores = None
-            datos_nuevos = serializar_objeto(instance)
-        else:
-            accion = TipoAccion.UPDATE
-            descripcion = f'Se actualizó {content_type.model} con ID {instance.pk}'
-            
-            # Obtener datos anteriores si están disponibles
-            key = f"{sender.__name__}_{instance.pk}"
-            datos_anteriores = _objetos_anteriores.pop(key, None)
-            datos_nuevos = serializar_objeto(instance)
-        
-        # Solo crear el log si tenemos información del request o es una operación administrativa
-        ip = get_current_ip() or '127.0.0.1'
-        user_agent = get_current_user_agent() or 'Sistema'
-        
-        AuditoriaLog.objects.create(
+    config = registro.obtener(sender)
+    accion = TipoAccion.CREATE if created else TipoAccion.UPDATE
+    if not config or not config.audita(accion):
+        return
+
+    usuario, ip, user_agent = _contexto_actual()
+    content_type = ContentType.objects.get_for_model(sender)
+    datos_nuevos = serializar_objeto(instance, campos=config.campos, excluir=config.excluir)
+
+    if created:
+        datos_anteriores = None
+    else:
+        # El estado anterior sale de los valores capturados en post_init,
+        # sin volver a consultar la base de datos
+        valores = instance.__dict__.get(ATRIBUTO_ESTADO)
+        datos_anteriores = (
+            serializar_estado_anterior(instance, valores, datos_nuevos)
+            if valores is not None else None
+        )
+
+        # Modo diff: guardar solo los campos modificados
+        if getattr(settings, 'AUDITORIA_DIFF_MODE', False) and datos_anteriores is not None:
+            datos_anteriores, datos_nuevos = calcular_diff(datos_anteriores, datos_nuevos)
+
+    registrar_log(
+        usuario=usuario,
+        direccion_ip=ip,
+        user_agent=user_agent,
+        accion=accion,
+        content_type=content_type,
+        object_id=instance.pk,
+        codigo=accion,
+        datos_anteriores=datos_anteriores,
+        datos_nuevos=datos_nuevos,
+        exito=True
+    )
+
+    # Los próximos cambios se comparan contra lo recién guardado
+    if config.audita(TipoAccion.UPDATE):
+        _guardar_estado(instance, config)
+
+
+def log_modelos_creados(modelo, instancias):
+    """
+    Registra el CREATE de instancias guardadas con bulk_create, que no
+    emite post_save. Llamar dentro de la misma transacción; para modelos
+    no auditados no hace nada.
+    """
+    config = registro.obtener(modelo)
+    if not config or not config.audita(TipoAccion.CREATE):
+        return
+
+    usuario, ip, user_agent = _contexto_actual()
+    content_type = ContentType.objects.get_for_model(modelo)
+    for instance in instancias:
+        registrar_log(
             usuario=usuario,
             direccion_ip=ip,
             user_agent=user_agent,
-            accion=accion,
+            accion=TipoAccion.CREATE,
             content_type=content_type,
             object_id=instance.pk,
-            descripcion=descripcion,
-            datos_anteriores=datos_anteriores,
-            datos_nuevos=datos_nuevos,
+            codigo=TipoAccion.CREATE,
+            datos_nuevos=serializar_objeto(instance, campos=config.campos, excluir=config.excluir),
             exito=True
         )
+        if config.audita(TipoAccion.UPDATE):
+            _guardar_estado(instance, config)
 
 
-@receiver(post_delete)
 def log_modelo_eliminado(sender, instance, **kwargs):
     """Registra cuando se elimina un modelo"""
-    # Solo para modelos que queremos auditar
-    modelos_auditados = [User]  # Agregar más modelos según sea necesario
-    
-    if sender in modelos_auditados:
-        usuario = get_current_user()
-        if usuario and not usuario.is_authenticated:
-            usuario = None
-            
-        content_type = ContentType.objects.get_for_model(sender)
-        
-        # Solo crear el log si tenemos información del request o es una operación administrativa
-        ip = get_current_ip() or '127.0.0.1'
-        user_agent = get_current_user_agent() or 'Sistema'
-        
-        AuditoriaLog.objects.create(
-            usuario=usuario,
-            direccion_ip=ip,
-            user_agent=user_agent,
-            accion=TipoAccion.DELETE,
-            content_type=content_type,
-            object_id=instance.pk,
-            descripcion=f'Se eliminó {content_type.model} con ID {instance.pk}',
-            datos_anteriores=serializar_objeto(instance),
-            exito=True
-        )
+    config = registro.obtener(sender)
+    if not config or not config.audita(TipoAccion.DELETE):
+        return
+
+    usuario, ip, user_agent = _contexto_actual()
+    content_type = ContentType.objects.get_for_model(sender)
+
+    registrar_log(
+        usuario=usuario,
+        direccion_ip=ip,
+        user_agent=user_agent,
+        accion=TipoAccion.DELETE,
+        content_type=content_type,
+        object_id=instance.pk,
+        codigo=TipoAccion.DELETE,
+        datos_anteriores=serializar_objeto(instance, campos=config.campos, excluir=config.excluir),
+        exito=True
+    )
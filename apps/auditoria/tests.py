@@ -1 +1,1220 @@
-# Dummy test file
+import shutil
+import tempfile
+import threading
+from unittest import skipIf, skipUnless
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from django.contrib import admin
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, APITestCase
+from apps.inventario.views import MovimientoInventarioViewSet
+from apps.productos.models import Producto
+from apps.productos.views import ProductoViewSet
+from core.bloom import FiltroBloom
+from core.pruebas import CacheCompartidaMixin, ConsultasMixin, cache_de_otro_proceso
+from core.throttling import get_almacen
+from .accesos import BufferAccesos
+from .admin import AuditoriaLogAdmin
+from .authentication import CustomTokenObtainPairSerializer
+from .agentes import CacheAgentes, get_cache_agentes, resolver_agentes
+from .busqueda import clasificar_termino
+from .usuarios_jwt import CachedJWTAuthentication, ClaimsJWTAuthentication, clave_usuario, obtener_usuario
+from .contadores import ContadorFallidosCache, ContadorLoginFallidos, get_contador_fallidos
+from .login import PoolHashing, PoolHashingSaturado
+from .particiones import (
+    crear_particion,
+    crear_particiones_futuras,
+    es_particionada,
+    inicio_mes,
+    listar_particiones,
+    nombre_particion,
+    retirar_particiones,
+    sumar_meses,
+)
+from .models import (
+    AgenteUsuario, AuditoriaLog, PlantillaDescripcion, ResumenAuditoriaDia,
+    ResumenAuditoriaHora, SesionUsuario, TipoAccion, TokenRevocado
+)
+from .plantillas import PLANTILLAS, renderizar
+from .registro import registro
+from .resumenes import reconstruir_resumenes
+from .retencion import MotorRetencion, restaurar_archivo
+from .revocacion import RevocacionTokens, get_revocacion_tokens
+from .utils import reconstruir_estados
+from .writer import AuditoriaWriter, PoliticaDesborde, escribir_logs, registrar_log
+
+User = get_user_model()
+
+
+class AuditoriaWriterTest(TestCase):
+    """Pruebas para el escritor de logs en lote"""
+
+    def _log(self, descripcion='Evento de prueba'):
+        return AuditoriaLog(
+            direccion_ip='127.0.0.1',
+            user_agent='Pruebas',
+            accion=TipoAccion.VIEW,
+            descripcion=descripcion
+        )
+
+    @override_settings(AUDITORIA_WRITER_MODE='sync')
+    def test_modo_sincrono_inserta_inmediatamente(self):
+        """Test: En modo sync el log se inserta dentro del request"""
+        registrar_log(accion=TipoAccion.VIEW, descripcion='sync')
+        self.assertEqual(AuditoriaLog.objects.filter(descripcion='sync').count(), 1)
+
+    @override_settings(AUDITORIA_WRITER_MODE='async')
+    def test_modo_asincrono_espera_commit(self):
+        """Test: En modo async el log se encola recién al confirmar la transacción"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            registrar_log(accion=TipoAccion.VIEW, descripcion='async')
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(AuditoriaLog.objects.filter(descripcion='async').exists())
+
+    def test_flush_inserta_en_lotes(self):
+        """Test: flush vuelca toda la cola respetando batch_size"""
+        writer = AuditoriaWriter(batch_size=3, intervalo=60)
+        writer._asegurar_hilo = lambda: None
+        for i in range(7):
+            writer.encolar(self._log(f'lote {i}'))
+
+        writer.flush()
+
+        self.assertEqual(AuditoriaLog.objects.filter(descripcion__startswith='lote').count(), 7)
+        self.assertEqual(writer.estado()['escritos'], 7)
+
+    def test_politica_descartar_cuenta_descartados(self):
+        """Test: Con la cola llena y política drop se cuentan los descartados"""
+        writer = AuditoriaWriter(batch_size=10, capacidad=2, politica=PoliticaDesborde.DESCARTAR)
+        writer._asegurar_hilo = lambda: None
+        for i in range(5):
+            writer.encolar(self._log())
+
+        self.assertEqual(writer.estado()['pendientes'], 2)
+        self.assertEqual(writer.estado()['descartados'], 3)
+
+    def test_politica_sincrona_escribe_desborde(self):
+        """Test: Con política sync el desborde se escribe en el hilo actual"""
+        writer = AuditoriaWriter(batch_size=10, capacidad=1, politica=PoliticaDesborde.SINCRONO)
+        writer._asegurar_hilo = lambda: None
+        writer.encolar(self._log('encolado'))
+        writer.encolar(self._log('desborde'))
+
+        self.assertTrue(AuditoriaLog.objects.filter(descripcion='desborde').exists())
+        self.assertFalse(AuditoriaLog.objects.filter(descripcion='encolado').exists())
+
+
+class ParticionesTest(TestCase):
+    """Pruebas del particionamiento mensual de auditoria_logs"""
+
+    def test_sumar_meses_cambia_de_anio(self):
+        """Test: Sumar o restar meses cruza el cambio de año"""
+        noviembre = datetime(2024, 11, 1, tzinfo=dt_timezone.utc)
+
+        self.assertEqual(sumar_meses(noviembre, 2), datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(sumar_meses(noviembre, -11), datetime(2023, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(sumar_meses(noviembre, 14), datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(sumar_meses(noviembre, 0), noviembre)
+
+    def test_inicio_mes_en_utc(self):
+        """Test: El inicio de mes se calcula en UTC"""
+        # 1 de marzo 02:00 en UTC+3 es todavía 28 de febrero en UTC
+        fecha = datetime(2024, 3, 1, 2, 0, tzinfo=dt_timezone(timedelta(hours=3)))
+
+        self.assertEqual(inicio_mes(fecha), datetime(2024, 2, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(
+            inicio_mes(datetime(2024, 12, 31, 23, 59, tzinfo=dt_timezone.utc)),
+            datetime(2024, 12, 1, tzinfo=dt_timezone.utc)
+        )
+
+    def test_nombre_particion(self):
+        """Test: El nombre de la partición lleva año y mes con ceros"""
+        self.assertEqual(
+            nombre_particion(datetime(2025, 3, 1, tzinfo=dt_timezone.utc)), 'auditoria_logs_p2025_03'
+        )
+
+    @skipIf(connection.vendor == 'postgresql', 'El comando solo falla fuera de PostgreSQL')
+    def test_comando_sin_postgresql(self):
+        """Test: El comando informa que el particionamiento requiere PostgreSQL"""
+        with self.assertRaisesMessage(CommandError, 'solo está disponible en PostgreSQL'):
+            call_command('particiones_auditoria', stdout=StringIO())
+
+    @skipUnless(connection.vendor == 'postgresql', 'Particionamiento nativo de PostgreSQL')
+    def test_crear_y_retirar_particiones(self):
+        """Test: Se crean las particiones futuras y se separan las antiguas"""
+        desde = datetime(2090, 11, 1, tzinfo=dt_timezone.utc)
+        with connection.cursor() as cursor:
+            if not es_particionada(cursor):
+                self.skipTest('auditoria_logs no está particionada')
+
+            self.assertEqual(
+                crear_particiones_futuras(cursor, desde, 2),
+                ['auditoria_logs_p2090_11', 'auditoria_logs_p2090_12', 'auditoria_logs_p2091_01']
+            )
+            self.assertEqual(crear_particiones_futuras(cursor, desde, 2), [])
+            nombres = [nombre for nombre, _ in listar_particiones(cursor)]
+            self.assertIn('auditoria_logs_p2091_01', nombres)
+
+            retiradas = retirar_particiones(cursor, datetime(2091, 1, 1, tzinfo=dt_timezone.utc), eliminar=True)
+            self.assertIn('auditoria_logs_p2090_12', retiradas)
+            self.assertNotIn('auditoria_logs_p2091_01', retiradas)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Particionamiento nativo de PostgreSQL')
+    def test_filas_del_default_pasan_a_la_particion(self):
+        """Test: Al crear una partición se mueven las filas que había en la default"""
+        momento = datetime(2092, 5, 10, tzinfo=dt_timezone.utc)
+        log = AuditoriaLog.objects.create(accion=TipoAccion.VIEW, codigo=TipoAccion.VIEW)
+        AuditoriaLog.objects.filter(pk=log.pk).update(timestamp=momento)
+
+        with connection.cursor() as cursor:
+            if not es_particionada(cursor):
+                self.skipTest('auditoria_logs no está particionada')
+            self.assertTrue(crear_particion(cursor, momento))
+            cursor.execute('SELECT COUNT(*) FROM auditoria_logs_p2092_05')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        self.assertTrue(AuditoriaLog.objects.filter(pk=log.pk).exists())
+
+
+@override_settings(AUDITORIA_WRITER_MODE='sync')
+class ResumenAuditoriaTest(APITestCase):
+    """Pruebas para los resúmenes incrementales de auditoría"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin',
+            email='admin@ejemplo.com',
+            password='adminpass123',
+            is_staff=True
+        )
+        AuditoriaLog.objects.all().delete()
+        ResumenAuditoriaHora.objects.all().delete()
+        ResumenAuditoriaDia.objects.all().delete()
+
+    def _registrar(self, accion, exito=True, usuario=None, cantidad=1):
+        for _ in range(cantidad):
+            registrar_log(accion=accion, exito=exito, usuario=usuario)
+
+    def test_resumen_se_actualiza_al_escribir(self):
+        """Test: Cada log escrito suma en los resúmenes por hora y por día"""
+        self._registrar(TipoAccion.LOGIN, usuario=self.admin, cantidad=3)
+        self._registrar(TipoAccion.LOGIN_FAILED, exito=False, cantidad=2)
+
+        self.assertEqual(ResumenAuditoriaHora.objects.get(
+            accion=TipoAccion.LOGIN, usuario=self.admin
+        ).total, 3)
+        # El usuario anónimo se acumula en una sola fila
+        self.assertEqual(ResumenAuditoriaDia.objects.get(
+            accion=TipoAccion.LOGIN_FAILED, usuario__isnull=True
+        ).total, 2)
+
+    def test_reconstruir_coincide_con_incremental(self):
+        """Test: La reconstrucción desde los logs produce los mismos conteos"""
+        self._registrar(TipoAccion.CREATE, usuario=self.admin, cantidad=4)
+        self._registrar(TipoAccion.LOGIN_FAILED, exito=False, cantidad=1)
+        esperado = sorted(ResumenAuditoriaDia.objects.values_list('accion', 'usuario', 'exito', 'total'))
+
+        ResumenAuditoriaDia.objects.update(total=0)
+        reconstruir_resumenes(timezone.now() - timedelta(days=1), timezone.now())
+
+        self.assertEqual(
+            sorted(ResumenAuditoriaDia.objects.values_list('accion', 'usuario', 'exito', 'total')),
+            esperado
+        )
+
+    def test_estadisticas_desde_resumenes(self):
+        """Test: El endpoint de estadísticas lee los conteos de los resúmenes"""
+        self._registrar(TipoAccion.UPDATE, usuario=self.admin, cantidad=2)
+        self._registrar(TipoAccion.LOGIN_FAILED, exito=False, cantidad=1)
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(reverse('auditorialog-estadisticas'), {'dias': 7})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_eventos'], 3)
+        self.assertEqual(response.data['usuarios_mas_activos'][0]['total'], 2)
+        self.assertEqual(sum(dia['fallidos'] for dia in response.data['actividad_por_dia']), 1)
+
+
+class KeysetPaginationTest(APITestCase):
+    """Pruebas para la paginación por cursor de logs"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin',
+            email='admin@ejemplo.com',
+            password='adminpass123',
+            is_staff=True
+        )
+        AuditoriaLog.objects.all().delete()
+        # Varios logs con el mismo timestamp para probar el desempate por id
+        ahora = timezone.now()
+        AuditoriaLog.objects.bulk_create([
+            AuditoriaLog(accion=TipoAccion.VIEW, timestamp=ahora - timedelta(minutes=i // 3))
+            for i in range(10)
+        ])
+        self.client.force_authenticate(self.admin)
+
+    def _recorrer(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(log['id'] for log in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_recorrido_completo_sin_repetidos(self):
+        """Test: Recorrer todas las páginas devuelve cada log una sola vez y en orden"""
+        ids = self._recorrer(reverse('auditorialog-list') + '?page_size=3')
+
+        esperado = list(AuditoriaLog.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+
+    def test_cursor_estable_con_inserciones(self):
+        """Test: Los logs nuevos no desplazan las páginas siguientes"""
+        response = self.client.get(reverse('auditorialog-list'), {'page_size': 4})
+        primera = [log['id'] for log in response.data['results']]
+
+        AuditoriaLog.objects.create(accion=TipoAccion.VIEW)
+        restantes = self._recorrer(response.data['next'])
+
+        self.assertEqual(len(primera) + len(restantes), 10)
+        self.assertFalse(set(primera) & set(restantes))
+
+    def test_pagina_anterior(self):
+        """Test: El enlace previous devuelve la página anterior"""
+        primera = self.client.get(reverse('auditorialog-list'), {'page_size': 4})
+        segunda = self.client.get(primera.data['next'])
+        anterior = self.client.get(segunda.data['previous'])
+
+        self.assertEqual(anterior.data['results'], primera.data['results'])
+
+    def test_pagina_sin_count(self):
+        """Test: Obtener una página no ejecuta COUNT(*)"""
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('auditorialog-list'), {'page_size': 5})
+
+        self.assertFalse(any('COUNT(' in consulta['sql'].upper() for consulta in consultas))
+
+
+class MotorRetencionTest(TestCase):
+    """Pruebas para la retención por lotes con archivo"""
+
+    def setUp(self):
+        AuditoriaLog.objects.all().delete()
+        ahora = timezone.now()
+        logs = []
+        for dias in (5, 40, 45, 400):
+            for accion in (TipoAccion.VIEW, TipoAccion.LOGIN):
+                logs.append(AuditoriaLog(accion=accion, timestamp=ahora - timedelta(days=dias)))
+        AuditoriaLog.objects.bulk_create(logs)
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def test_retencion_por_accion(self):
+        """Test: Cada acción usa su propio periodo y el resto el periodo por defecto"""
+        motor = MotorRetencion(
+            dias_defecto=365,
+            dias_por_accion={TipoAccion.VIEW: 30},
+            lote=1,
+            directorio_archivo=self.directorio
+        )
+        resultado = motor.ejecutar()
+
+        self.assertEqual(resultado, {TipoAccion.VIEW: 3, 'defecto': 1})
+        self.assertEqual(AuditoriaLog.objects.filter(accion=TipoAccion.VIEW).count(), 1)
+        self.assertEqual(AuditoriaLog.objects.filter(accion=TipoAccion.LOGIN).count(), 3)
+
+    def test_archivo_y_restauracion(self):
+        """Test: Lo eliminado se archiva por día y puede restaurarse"""
+        motor = MotorRetencion(dias_defecto=30, lote=2, directorio_archivo=self.directorio)
+        motor.ejecutar()
+        self.assertEqual(AuditoriaLog.objects.count(), 2)
+
+        archivos = sorted(Path(self.directorio).rglob('*.jsonl.gz'))
+        self.assertEqual(len(archivos), 3)
+
+        for archivo in archivos:
+            restaurar_archivo(archivo)
+            # Restaurar dos veces no duplica
+            restaurar_archivo(archivo)
+        self.assertEqual(AuditoriaLog.objects.count(), 8)
+
+    def test_simular_no_elimina(self):
+        """Test: En modo simulación solo se cuenta"""
+        motor = MotorRetencion(dias_defecto=30, directorio_archivo=self.directorio)
+        self.assertEqual(motor.ejecutar(simular=True), {'defecto': 6})
+        self.assertEqual(AuditoriaLog.objects.count(), 8)
+
+
+@override_settings(AUDITORIA_WRITER_MODE='sync', AUDITORIA_DIFF_MODE=True)
+class DiffAuditoriaTest(TestCase):
+    """Pruebas para el almacenamiento de diffs en los UPDATE"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(
+            username='diffuser',
+            email='diff@ejemplo.com',
+            password='diffpass123',
+            first_name='Ana'
+        )
+
+    def _ultimo_update(self):
+        return AuditoriaLog.objects.filter(
+            accion=TipoAccion.UPDATE, object_id=self.usuario.pk
+        ).order_by('-timestamp', '-id').first()
+
+    def test_update_guarda_solo_cambios(self):
+        """Test: El UPDATE guarda solo los campos modificados"""
+        self.usuario.first_name = 'Ana Maria'
+        self.usuario.save()
+
+        log = self._ultimo_update()
+        self.assertEqual(log.datos_anteriores, {'first_name': 'Ana'})
+        self.assertEqual(log.datos_nuevos, {'first_name': 'Ana Maria'})
+
+    def test_reconstruir_estados_completos(self):
+        """Test: El estado completo se reconstruye desde el historial"""
+        self.usuario.first_name = 'Ana Maria'
+        self.usuario.save()
+        self.usuario.last_name = 'Torres'
+        self.usuario.save()
+
+        anterior, nuevo = reconstruir_estados(self._ultimo_update())
+
+        self.assertEqual(anterior['first_name'], 'Ana Maria')
+        self.assertEqual(anterior['last_name'], '')
+        self.assertEqual(nuevo['last_name'], 'Torres')
+        self.assertEqual(nuevo['email'], 'diff@ejemplo.com')
+
+    def test_admin_reconstruye_una_vez(self):
+        """Test: El admin reconstruye los estados con una sola consulta por log"""
+        self.usuario.first_name = 'Ana Maria'
+        self.usuario.save()
+        log = self._ultimo_update()
+        model_admin = AuditoriaLogAdmin(AuditoriaLog, admin.site)
+
+        with self.assertNumQueries(1):
+            anterior = model_admin.estado_anterior(log)
+            nuevo = model_admin.estado_nuevo(log)
+
+        self.assertEqual(anterior['first_name'], 'Ana')
+        self.assertEqual(nuevo['first_name'], 'Ana Maria')
+
+
+@override_settings(AUDITORIA_WRITER_MODE='sync')
+class EstadoAnteriorTest(TestCase):
+    """Pruebas para la captura del estado anterior sin consultas"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(
+            username='trackuser',
+            email='track@ejemplo.com',
+            password='trackpass123',
+            first_name='Luis'
+        )
+
+    def test_update_no_consulta_estado_anterior(self):
+        """Test: Guardar no vuelve a leer el objeto de la base de datos"""
+        usuario = User.objects.get(pk=self.usuario.pk)
+        usuario.first_name = 'Luis Alberto'
+
+        with CaptureQueriesContext(connection) as contexto:
+            usuario.save()
+
+        tabla = f'FROM "{User._meta.db_table}"'
+        lecturas = [
+            consulta['sql'] for consulta in contexto.captured_queries
+            if consulta['sql'].startswith('SELECT') and tabla in consulta['sql']
+        ]
+        self.assertEqual(lecturas, [])
+
+        log = AuditoriaLog.objects.filter(accion=TipoAccion.UPDATE).latest('id')
+        self.assertEqual(log.datos_anteriores['first_name'], 'Luis')
+        self.assertEqual(log.datos_nuevos['first_name'], 'Luis Alberto')
+
+    def test_guardados_sucesivos_comparan_contra_ultimo(self):
+        """Test: Cada UPDATE parte del estado guardado anteriormente"""
+        self.usuario.first_name = 'Luis Alberto'
+        self.usuario.save()
+        self.usuario.first_name = 'Alberto'
+        self.usuario.save()
+
+        log = AuditoriaLog.objects.filter(accion=TipoAccion.UPDATE).latest('id')
+        self.assertEqual(log.datos_anteriores['first_name'], 'Luis Alberto')
+        self.assertEqual(log.datos_nuevos['first_name'], 'Alberto')
+
+    def test_refresh_from_db_actualiza_estado(self):
+        """Test: Tras refresh_from_db el UPDATE parte de los valores releídos"""
+        User.objects.filter(pk=self.usuario.pk).update(first_name='Luis Alberto', last_name='Paz')
+        self.usuario.refresh_from_db()
+        self.usuario.first_name = 'Alberto'
+        self.usuario.save()
+
+        log = AuditoriaLog.objects.filter(accion=TipoAccion.UPDATE).latest('id')
+        self.assertEqual(log.datos_anteriores['first_name'], 'Luis Alberto')
+        self.assertEqual(log.datos_anteriores['last_name'], 'Paz')
+
+    def test_refresh_parcial_actualiza_solo_esos_campos(self):
+        """Test: refresh_from_db(fields=...) solo reemplaza los campos releídos"""
+        User.objects.filter(pk=self.usuario.pk).update(first_name='Luis Alberto')
+        self.usuario.refresh_from_db(fields=['first_name'])
+        self.usuario.first_name = 'Alberto'
+        self.usuario.save()
+
+        log = AuditoriaLog.objects.filter(accion=TipoAccion.UPDATE).latest('id')
+        self.assertEqual(log.datos_anteriores['first_name'], 'Luis Alberto')
+        self.assertEqual(log.datos_anteriores['email'], 'track@ejemplo.com')
+
+
+@override_settings(AUDITORIA_WRITER_MODE='sync')
+class RegistroAuditoriaTest(TestCase):
+    """Pruebas para el registro de modelos auditados"""
+
+    def setUp(self):
+        self.addCleanup(registro.desregistrar, Producto)
+
+    def test_password_nunca_se_guarda(self):
+        """Test: El hash de la contraseña no aparece en los logs"""
+        usuario = User.objects.create_user(
+            username='registro', email='registro@ejemplo.com', password='registro123'
+        )
+        usuario.set_password('otra-clave-456')
+        usuario.save()
+
+        for log in AuditoriaLog.objects.filter(object_id=usuario.pk):
+            self.assertNotIn('password', log.datos_nuevos or {})
+            self.assertNotIn('password', log.datos_anteriores or {})
+
+    def test_modelo_no_auditado_no_registra(self):
+        """Test: Guardar un modelo no registrado no genera logs"""
+        Producto.objects.create(nombre='Maíz', precio='12.50', unidad_medida='KG')
+        self.assertFalse(AuditoriaLog.objects.filter(accion=TipoAccion.CREATE).exists())
+
+    def test_registrar_modelo_con_campos_y_acciones(self):
+        """Test: Un modelo registrado audita solo los campos y acciones indicados"""
+        registro.registrar(Producto, campos=['nombre', 'precio'], acciones=['CREATE'])
+
+        producto = Producto.objects.create(nombre='Trigo', precio='8.00', unidad_medida='KG')
+        producto.stock = 10
+        producto.save()
+        producto.delete()
+
+        logs = AuditoriaLog.objects.all()
+        self.assertEqual([log.accion for log in logs], [TipoAccion.CREATE])
+        self.assertEqual(set(logs[0].datos_nuevos), {'nombre', 'precio'})
+
+    def test_campo_desconocido(self):
+        """Test: Declarar un campo inexistente es un error de configuración"""
+        with self.assertRaises(ImproperlyConfigured):
+            registro.registrar(Producto, excluir=['no_existe'])
+
+
+class BufferAccesosTest(TestCase):
+    """Pruebas para la escritura en lote del último acceso de sesiones"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(
+            username='sesion', email='sesion@ejemplo.com', password='sesion123'
+        )
+        self.sesiones = [
+            SesionUsuario.objects.create(
+                usuario=self.usuario,
+                session_key=f'clave{i}',
+                direccion_ip='127.0.0.1'
+            )
+            for i in range(3)
+        ]
+        self.buffer = BufferAccesos(intervalo=3600)
+        self.addCleanup(self.buffer.detener)
+
+    def test_volcado_periodico_sin_requests(self):
+        """Test: El hilo del buffer vuelca lo pendiente aunque no lleguen más requests"""
+        buffer = BufferAccesos(intervalo=0.01)
+        volcado = threading.Event()
+        buffer.flush = volcado.set
+        self.addCleanup(buffer.detener)
+
+        buffer.registrar('clave0', self.usuario.pk)
+
+        self.assertTrue(volcado.wait(5))
+
+    def test_registrar_no_consulta(self):
+        """Test: Los accesos dentro del intervalo no tocan la base de datos"""
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                for sesion in self.sesiones:
+                    self.buffer.registrar(sesion.session_key, self.usuario.pk)
+        self.assertEqual(self.buffer.pendientes(), 3)
+
+    def test_flush_un_update_por_lote(self):
+        """Test: El volcado actualiza todas las sesiones con una sola consulta"""
+        momento = timezone.now() + timedelta(minutes=5)
+        for sesion in self.sesiones:
+            self.buffer.registrar(sesion.session_key, self.usuario.pk, momento)
+
+        with CaptureQueriesContext(connection) as contexto:
+            self.assertEqual(self.buffer.flush(), 3)
+
+        updates = [q for q in contexto.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        for sesion in self.sesiones:
+            sesion.refresh_from_db()
+            self.assertEqual(sesion.fecha_ultimo_acceso, momento)
+
+    def test_sesion_cerrada_no_se_actualiza(self):
+        """Test: Un acceso pendiente no modifica sesiones ya cerradas"""
+        sesion = self.sesiones[0]
+        SesionUsuario.objects.filter(pk=sesion.pk).update(activa=False)
+        anterior = SesionUsuario.objects.get(pk=sesion.pk).fecha_ultimo_acceso
+
+        self.buffer.registrar(sesion.session_key, self.usuario.pk, timezone.now() + timedelta(hours=1))
+        self.buffer.flush()
+
+        sesion.refresh_from_db()
+        self.assertEqual(sesion.fecha_ultimo_acceso, anterior)
+
+
+@override_settings(AUDITORIA_WRITER_MODE='sync')
+class BusquedaLogsTest(APITestCase):
+    """Pruebas para la búsqueda ?q= (o ?search=) de logs"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='buscador', email='buscador@ejemplo.com', password='buscador123'
+        )
+        self.client.force_authenticate(user=self.admin)
+        AuditoriaLog.objects.all().delete()
+
+        for ip, descripcion in [
+            ('192.168.1.10', 'Actualización de inventario de productos'),
+            ('192.168.2.20', 'Intento de login fallido'),
+            ('10.0.0.5', 'Registro de aporte mensual'),
+        ]:
+            AuditoriaLog.objects.create(
+                usuario=self.admin,
+                direccion_ip=ip,
+                accion=TipoAccion.VIEW,
+                descripcion=descripcion
+            )
+        self.url = reverse('auditorialog-list')
+
+    def _buscar(self, termino, **params):
+        response = self.client.get(self.url, {'q': termino, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [log['direccion_ip'] for log in response.data['results']]
+
+    def test_clasificar_termino(self):
+        """Test: Cada término se busca por el índice que le corresponde"""
+        self.assertEqual(clasificar_termino('10.0.0.5'), ('ip', '10.0.0.5'))
+        self.assertEqual(clasificar_termino('192.168.'), ('red', '192.168.0.0/16'))
+        self.assertEqual(clasificar_termino('10.0.0.0/8'), ('red', '10.0.0.0/8'))
+        self.assertEqual(clasificar_termino('ana@coop.com'), ('email', 'ana@coop.com'))
+        self.assertEqual(clasificar_termino('ana@'), ('email_prefijo', 'ana@'))
+        self.assertEqual(clasificar_termino('login 10'), ('texto', 'login 10'))
+
+    def test_buscar_por_ip_y_prefijo(self):
+        """Test: La búsqueda por IP es exacta y por prefijo de red"""
+        self.assertEqual(self._buscar('10.0.0.5'), ['10.0.0.5'])
+        self.assertCountEqual(self._buscar('192.168.'), ['192.168.1.10', '192.168.2.20'])
+        self.assertEqual(self._buscar('192.168.2.0/24'), ['192.168.2.20'])
+
+    def test_buscar_por_email(self):
+        """Test: La búsqueda por email acepta el email completo o su prefijo"""
+        self.assertEqual(len(self._buscar('BUSCADOR@ejemplo.com')), 3)
+        self.assertEqual(len(self._buscar('busc@')), 0)
+        self.assertEqual(len(self._buscar('buscador@ejem')), 3)
+
+    def test_buscar_texto_con_filtros(self):
+        """Test: La búsqueda de texto respeta los demás filtros"""
+        self.assertEqual(self._buscar('login'), ['192.168.2.20'])
+        self.assertEqual(self._buscar('login', accion=TipoAccion.DELETE), [])
+
+    def test_search_encuentra_log_con_plantilla(self):
+        """Test: ?search= encuentra un log nuevo por el texto de su plantilla"""
+        nuevo = User.objects.create_user(
+            username='recien', email='recien@ejemplo.com', password='recien123'
+        )
+
+        response = self.client.get(self.url, {'search': 'creó'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        resultados = response.data['results']
+        self.assertEqual([log['object_id'] for log in resultados], [nuevo.pk])
+        self.assertEqual(resultados[0]['descripcion'], f'Se creó user con ID {nuevo.pk}')
+
+    def test_admin_busca_texto_renderizado(self):
+        """Test: El buscador del admin usa la misma búsqueda que la API"""
+        nuevo = User.objects.create_user(
+            username='recien', email='recien@ejemplo.com', password='recien123'
+        )
+        model_admin = AuditoriaLogAdmin(AuditoriaLog, admin.site)
+
+        logs, _ = model_admin.get_search_results(None, AuditoriaLog.objects.all(), 'creó')
+
+        self.assertEqual([log.object_id for log in logs], [nuevo.pk])
+
+
+class AgenteUsuarioTest(TestCase):
+    """Pruebas para la tabla de User-Agents deduplicados"""
+
+    def _log(self, user_agent):
+        return AuditoriaLog(
+            direccion_ip='127.0.0.1',
+            user_agent=user_agent,
+            accion=TipoAccion.VIEW,
+            descripcion='Consulta'
+        )
+
+    def test_agentes_se_deduplican(self):
+        """Test: Los logs con el mismo User-Agent comparten una fila"""
+        escribir_logs([self._log('Mozilla/5.0 (Android)') for _ in range(5)] + [self._log('okhttp/4.9')])
+
+        self.assertEqual(AgenteUsuario.objects.count(), 2)
+        self.assertEqual(
+            AuditoriaLog.objects.filter(agente__texto='Mozilla/5.0 (Android)').count(), 5
+        )
+        self.assertEqual(AuditoriaLog.objects.latest('id').user_agent, 'okhttp/4.9')
+
+    def test_cache_evita_consultas(self):
+        """Test: Un User-Agent en caché se resuelve sin consultar la base de datos"""
+        escribir_logs([self._log('Mozilla/5.0 (iPhone)')])
+        agente = AgenteUsuario.objects.get()
+        cache = get_cache_agentes()
+        self.addCleanup(cache.limpiar)
+        cache.guardar({agente.hash: agente.id})
+
+        log = self._log('Mozilla/5.0 (iPhone)')
+        with self.assertNumQueries(0):
+            resolver_agentes([log])
+        self.assertEqual(log.agente_id, agente.id)
+
+    def test_cache_lru_descarta_el_menos_usado(self):
+        """Test: La caché conserva solo los agentes usados más recientemente"""
+        cache = CacheAgentes(capacidad=2)
+        cache.guardar({'a': 1, 'b': 2})
+        cache.obtener('a')
+        cache.guardar({'c': 3})
+
+        self.assertEqual(cache.obtener('a'), 1)
+        self.assertIsNone(cache.obtener('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_sesion_guarda_agente(self):
+        """Test: La sesión se crea con user_agent y lo muestra como texto"""
+        usuario = User.objects.create_user(username='agente', email='agente@ejemplo.com', password='x')
+        SesionUsuario.objects.update_or_create(
+            session_key='claveagente',
+            defaults={'usuario': usuario, 'direccion_ip': '127.0.0.1', 'user_agent': 'Mozilla/5.0'}
+        )
+
+        sesion = SesionUsuario.objects.get(session_key='claveagente')
+        self.assertEqual(sesion.user_agent, 'Mozilla/5.0')
+        self.assertIsNotNone(sesion.agente_id)
+
+
+@override_settings(AUDITORIA_WRITER_MODE='sync')
+class DescripcionCodificadaTest(APITestCase):
+    """Pruebas para las descripciones guardadas como código y parámetros"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='plantillas', email='plantillas@ejemplo.com', password='plantillas123'
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def test_log_guarda_codigo_y_no_texto(self):
+        """Test: Los logs CRUD guardan solo el código de la plantilla"""
+        log = AuditoriaLog.objects.filter(accion=TipoAccion.CREATE, object_id=self.admin.pk).get()
+
+        self.assertEqual(log.codigo, TipoAccion.CREATE)
+        self.assertEqual(log.descripcion, '')
+        self.assertIsNone(log.parametros)
+        self.assertEqual(log.texto_descripcion, f'Se creó user con ID {self.admin.pk}')
+
+    def test_renderizar_parametros(self):
+        """Test: La plantilla se completa con los parámetros guardados"""
+        self.assertEqual(
+            renderizar(TipoAccion.LOGIN_FAILED, {'email': 'x@ejemplo.com'}),
+            'Intento de login fallido para: x@ejemplo.com'
+        )
+        self.assertEqual(renderizar(TipoAccion.LOGOUT), 'Usuario {email} cerró sesión')
+        self.assertEqual(renderizar('NO_EXISTE'), '')
+
+    def test_api_muestra_descripcion_renderizada(self):
+        """Test: La API devuelve el texto armado en el campo descripcion"""
+        registrar_log(
+            usuario=self.admin,
+            direccion_ip='127.0.0.1',
+            accion=TipoAccion.LOGIN,
+            codigo=TipoAccion.LOGIN,
+            parametros={'email': self.admin.email}
+        )
+
+        response = self.client.get(reverse('auditorialog-list'), {'accion': TipoAccion.LOGIN})
+        self.assertEqual(
+            response.data['results'][0]['descripcion'],
+            'Usuario plantillas@ejemplo.com inició sesión exitosamente'
+        )
+
+    def test_plantillas_sincronizadas(self):
+        """Test: La tabla de plantillas refleja las plantillas del código"""
+        self.assertEqual(
+            dict(PlantillaDescripcion.objects.values_list('codigo', 'plantilla')),
+            PLANTILLAS
+        )
+
+
+class ContadorLoginFallidosTest(TestCase):
+    """Pruebas para los contadores de logins fallidos en memoria"""
+
+    def setUp(self):
+        self.contador = ContadorLoginFallidos(
+            ventana=timedelta(hours=1), intervalos=6, capacidad=3, precargar=False
+        )
+
+    def test_principales_ips_y_emails(self):
+        """Test: Se obtienen las IPs y emails con más fallos"""
+        for _ in range(5):
+            self.contador.registrar(ip='10.0.0.1', email='Ana@Ejemplo.com')
+        for _ in range(2):
+            self.contador.registrar(ip='10.0.0.2', email='luis@ejemplo.com')
+
+        self.assertEqual(self.contador.principales_ips(1), [('10.0.0.1', 5)])
+        self.assertEqual(self.contador.intentos_email('ana@ejemplo.com'), 5)
+        self.assertEqual(self.contador.total(), 7)
+
+    def test_memoria_acotada(self):
+        """Test: El resumen conserva las claves frecuentes con capacidad fija"""
+        contador = ContadorLoginFallidos(intervalos=1, capacidad=10, precargar=False)
+        for _ in range(10):
+            contador.registrar(ip='10.0.0.1')
+        for i in range(50):
+            contador.registrar(ip=f'172.16.0.{i}')
+
+        self.assertEqual(contador.principales_ips(1), [('10.0.0.1', 10)])
+        self.assertEqual(len(contador.principales_ips(100)), 10)
+
+    def test_ventana_descarta_fallos_antiguos(self):
+        """Test: Los fallos fuera de la ventana dejan de contarse"""
+        self.contador.registrar(ip='10.0.0.1', momento=timezone.now() - timedelta(hours=2))
+        self.contador.registrar(ip='10.0.0.1')
+
+        self.assertEqual(self.contador.intentos_ip('10.0.0.1'), 1)
+
+    def test_consultas_sin_base_de_datos(self):
+        """Test: Registrar y consultar no ejecuta consultas"""
+        with self.assertNumQueries(0):
+            self.contador.registrar(ip='10.0.0.1', email='x@ejemplo.com')
+            self.contador.intentos_ip('10.0.0.1')
+            self.contador.principales_emails()
+
+    def test_precarga_desde_logs(self):
+        """Test: Un contador nuevo arranca con los fallos ya registrados"""
+        AuditoriaLog.objects.create(
+            direccion_ip='10.0.0.9',
+            accion=TipoAccion.LOGIN_FAILED,
+            codigo=TipoAccion.LOGIN_FAILED,
+            parametros={'email': 'x@ejemplo.com'},
+            exito=False
+        )
+        contador = ContadorLoginFallidos()
+
+        self.assertEqual(contador.intentos_ip('10.0.0.9'), 1)
+        self.assertEqual(contador.intentos_email('x@ejemplo.com'), 1)
+
+
+class ContadorFallidosCacheTest(CacheCompartidaMixin, TestCase):
+    """Pruebas para los contadores de logins fallidos en caché compartida"""
+
+    def contador(self, **opciones):
+        opciones = {'ventana': timedelta(hours=1), 'intervalos': 6, 'capacidad': 3, 'precargar': False, **opciones}
+        return ContadorFallidosCache(**opciones)
+
+    def test_conteos_comunes_a_todos_los_procesos(self):
+        """Test: Los fallos registrados en un proceso se ven desde otro"""
+        uno, otro = self.contador(), self.contador()
+        for _ in range(5):
+            uno.registrar(ip='10.0.0.1', email='Ana@Ejemplo.com')
+        for _ in range(2):
+            otro.registrar(ip='10.0.0.2', email='luis@ejemplo.com')
+
+        for contador in (uno, otro):
+            self.assertEqual(contador.intentos_ip('10.0.0.1'), 5)
+            self.assertEqual(contador.intentos_email('ana@ejemplo.com'), 5)
+            self.assertEqual(contador.principales_ips(1), [('10.0.0.1', 5)])
+            self.assertEqual(contador.total(), 7)
+
+    def test_candidatos_acotados(self):
+        """Test: La lista de más frecuentes conserva a lo sumo `capacidad` claves"""
+        contador = self.contador(intervalos=1)
+        for _ in range(10):
+            contador.registrar(ip='10.0.0.1')
+        for i in range(20):
+            contador.registrar(ip=f'172.16.0.{i}')
+
+        self.assertEqual(contador.principales_ips(1), [('10.0.0.1', 10)])
+        self.assertEqual(len(contador.principales_ips(100)), 3)
+        self.assertEqual(contador.intentos_ip('172.16.0.0'), 1)
+
+    def test_ventana_descarta_fallos_antiguos(self):
+        """Test: Los fallos fuera de la ventana dejan de contarse"""
+        contador = self.contador()
+        contador.registrar(ip='10.0.0.1', momento=timezone.now() - timedelta(hours=2))
+        contador.registrar(ip='10.0.0.1')
+
+        self.assertEqual(contador.intentos_ip('10.0.0.1'), 1)
+
+    def test_precarga_una_sola_vez(self):
+        """Test: Los logs se cargan en la caché una vez, aunque arranquen varios procesos"""
+        AuditoriaLog.objects.create(
+            direccion_ip='10.0.0.9',
+            accion=TipoAccion.LOGIN_FAILED,
+            codigo=TipoAccion.LOGIN_FAILED,
+            parametros={'email': 'x@ejemplo.com'},
+            exito=False
+        )
+        uno, otro = self.contador(precargar=True), self.contador(precargar=True)
+
+        self.assertEqual(uno.intentos_ip('10.0.0.9'), 1)
+        self.assertEqual(otro.intentos_email('x@ejemplo.com'), 1)
+
+
+class HasherContador(MD5PasswordHasher):
+    """Hasher rápido que cuenta las verificaciones de contraseña"""
+    verificaciones = 0
+
+    def verify(self, password, encoded):
+        HasherContador.verificaciones += 1
+        return super().verify(password, encoded)
+
+
+@override_settings(
+    AUDITORIA_WRITER_MODE='sync',
+    PASSWORD_HASHERS=['apps.auditoria.tests.HasherContador']
+)
+class LoginJWTTest(ConsultasMixin, APITestCase):
+    """Pruebas para el login JWT con un único hasheo"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ana@ejemplo.com', email='ana@ejemplo.com', password='clave-segura'
+        )
+        self.url = reverse('token_obtain_pair')
+        HasherContador.verificaciones = 0
+        get_almacen().limpiar()
+        get_contador_fallidos().limpiar()
+
+    def test_login_hashea_una_vez(self):
+        """Test: Un login exitoso verifica la contraseña una sola vez"""
+        response = self.client.post(
+            self.url, {'email': 'ana@ejemplo.com', 'password': 'clave-segura'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+        self.assertIn('refresh', response.data)
+        self.assertEqual(response.data['user']['id'], self.user.id)
+        self.assertEqual(HasherContador.verificaciones, 1)
+
+    def test_login_registra_auditoria(self):
+        """Test: El login JWT registra el log LOGIN"""
+        self.client.post(
+            self.url, {'email': 'ana@ejemplo.com', 'password': 'clave-segura'}, format='json'
+        )
+
+        log = AuditoriaLog.objects.get(accion=TipoAccion.LOGIN)
+        self.assertEqual(log.usuario, self.user)
+        self.assertEqual(log.parametros, {'email': 'ana@ejemplo.com'})
+
+    def test_login_fallido(self):
+        """Test: Credenciales inválidas retornan 401 y registran LOGIN_FAILED"""
+        response = self.client.post(
+            self.url, {'email': 'ana@ejemplo.com', 'password': 'otra'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(AuditoriaLog.objects.filter(accion=TipoAccion.LOGIN_FAILED).exists())
+        self.assertFalse(AuditoriaLog.objects.filter(accion=TipoAccion.LOGIN).exists())
+
+    def test_usuario_inactivo(self):
+        """Test: Un usuario inactivo no obtiene tokens"""
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.post(
+            self.url, {'email': 'ana@ejemplo.com', 'password': 'clave-segura'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(THROTTLE_CUBOS={'login': {'capacidad': 2, 'recarga': '1/min', 'clave': 'ip'}})
+    def test_login_limitado_no_hashea(self):
+        """Test: Los logins rechazados por el throttle no llegan al hasher"""
+        datos = {'email': 'ana@ejemplo.com', 'password': 'otra'}
+        for _ in range(2):
+            self.client.post(self.url, datos, format='json')
+        self.assertEqual(HasherContador.verificaciones, 2)
+
+        with self.assertNumConsultas(0):
+            response = self.client.post(self.url, datos, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(HasherContador.verificaciones, 2)
+
+    @override_settings(LOGIN_FALLIDOS_MAX_EMAIL=2)
+    def test_email_bloqueado_no_hashea(self):
+        """Test: Superados los fallos del email el login responde 429 sin hashear"""
+        for _ in range(2):
+            self.client.post(self.url, {'email': 'ana@ejemplo.com', 'password': 'otra'}, format='json')
+        self.assertEqual(HasherContador.verificaciones, 2)
+
+        response = self.client.post(
+            self.url, {'email': 'ANA@ejemplo.com', 'password': 'clave-segura'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '3600')
+        self.assertEqual(HasherContador.verificaciones, 2)
+
+    @override_settings(LOGIN_FALLIDOS_MAX_EMAIL=2)
+    def test_email_no_texto(self):
+        """Test: Un email que no es texto se rechaza con 401 y no se cuenta"""
+        for email in (5, ['a'], {'a': 1}):
+            response = self.client.post(self.url, {'email': email, 'password': 'otra'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(get_contador_fallidos().principales_emails(), [])
+
+    def test_email_sin_limite_por_defecto(self):
+        """Test: Sin LOGIN_FALLIDOS_MAX_EMAIL los fallos de un email no bloquean su login"""
+        for n in range(25):
+            self.client.post(
+                self.url, {'email': 'ana@ejemplo.com', 'password': 'otra'}, format='json',
+                REMOTE_ADDR=f'10.0.0.{n}'
+            )
+
+        response = self.client.post(
+            self.url, {'email': 'ana@ejemplo.com', 'password': 'clave-segura'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(LOGIN_FALLIDOS_MAX_IP=2)
+    def test_ip_bloqueada_aunque_cambie_x_forwarded_for(self):
+        """Test: Los fallos se cuentan por REMOTE_ADDR, no por el X-Forwarded-For del cliente"""
+        for n in range(2):
+            self.client.post(
+                self.url, {'email': f'otro{n}@ejemplo.com', 'password': 'otra'}, format='json',
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{n}'
+            )
+
+        response = self.client.post(
+            self.url, {'email': 'ana@ejemplo.com', 'password': 'clave-segura'}, format='json',
+            HTTP_X_FORWARDED_FOR='10.0.0.9'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(
+            set(AuditoriaLog.objects.filter(accion=TipoAccion.LOGIN_FAILED).values_list('direccion_ip', flat=True)),
+            {'127.0.0.1'}
+        )
+
+    def test_pool_saturado(self):
+        """Test: Sin cupo en el pool el hasheo se rechaza sin esperar"""
+        iniciado, liberar = threading.Event(), threading.Event()
+
+        def hashear_lento():
+            iniciado.set()
+            liberar.wait()
+
+        pool = PoolHashing(trabajadores=1, cola=0, timeout=5)
+        hilo = threading.Thread(target=pool.ejecutar, args=(hashear_lento,))
+        hilo.start()
+        try:
+            iniciado.wait()
+            with self.assertRaises(PoolHashingSaturado):
+                pool.ejecutar(lambda: None)
+        finally:
+            liberar.set()
+            hilo.join()
+            pool.cerrar()
+
+
+@override_settings(AUDITORIA_WRITER_MODE='sync')
+class CacheUsuariosJWTTest(CacheCompartidaMixin, APITestCase):
+    """Pruebas para la resolución de usuarios JWT desde caché y claims"""
+
+    def setUp(self):
+        super().setUp()
+        # Los on_commit ejecutados en los tests también llenan la caché de agentes
+        self.addCleanup(get_cache_agentes().limpiar)
+        self.user = User.objects.create_user(
+            username='ana@ejemplo.com', email='ana@ejemplo.com', password='clave-segura',
+            is_staff=True
+        )
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.url = reverse('auditorialog-mis-logs')
+
+    def consultas_usuario(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q['sql'] for q in consultas if 'FROM "auth_user"' in q['sql']]
+
+    def test_usuario_desde_cache(self):
+        """Test: El segundo request con el token no lee el usuario"""
+        self.assertEqual(len(self.consultas_usuario()), 1)
+        self.assertEqual(self.consultas_usuario(), [])
+
+    def test_invalidacion_al_guardar(self):
+        """Test: Guardar el usuario lo descarta de la caché"""
+        self.consultas_usuario()
+        self.assertIsNotNone(obtener_usuario(self.user.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertIsNone(obtener_usuario(self.user.pk))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_desactivacion_visible_en_otro_proceso(self):
+        """Test: Desactivar el usuario lo descarta de la caché que ven los demás procesos"""
+        self.consultas_usuario()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertIsNone(cache_de_otro_proceso().get(clave_usuario(self.user.pk)))
+
+    def test_sin_cache_compartida_lee_cada_request(self):
+        """Test: Con una caché de cada proceso el usuario se lee en cada request"""
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual(len(self.consultas_usuario()), 1)
+            self.assertEqual(len(self.consultas_usuario()), 1)
+            self.assertIsNone(obtener_usuario(self.user.pk))
+
+            # Un cambio cuya invalidación no llega a este proceso
+            with self.captureOnCommitCallbacks(execute=False):
+                User.objects.filter(pk=self.user.pk).update(is_active=False)
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(JWT_STATELESS_LECTURA=True)
+    def test_modo_stateless_sin_consultas(self):
+        """Test: En modo stateless los GET arman el usuario desde los claims"""
+        self.assertEqual(self.consultas_usuario(), [])
+        self.assertIsNone(obtener_usuario(self.user.pk))
+
+    def test_claims_solo_en_lectura(self):
+        """Test: Los ViewSets de escritura usan los claims solo en GET/HEAD/OPTIONS"""
+        fabrica = APIRequestFactory()
+        for viewset in (ProductoViewSet, MovimientoInventarioViewSet):
+            for metodo, esperada in (('get', ClaimsJWTAuthentication), ('options', ClaimsJWTAuthentication),
+                                     ('post', CachedJWTAuthentication), ('delete', CachedJWTAuthentication)):
+                vista = viewset()
+                vista.request = getattr(fabrica, metodo)('/')
+                self.assertEqual(
+                    [type(autenticador) for autenticador in vista.get_authenticators()], [esperada]
+                )
+
+
+class RevocacionTokensTest(APITestCase):
+    """Pruebas para la revocación de tokens con filtro de Bloom"""
+
+    def setUp(self):
+        self.addCleanup(get_cache_agentes().limpiar)
+        self.user = User.objects.create_user(
+            username='ana@ejemplo.com', email='ana@ejemplo.com', password='clave-segura',
+            is_staff=True
+        )
+        self.refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.access = self.refresh.access_token
+        self.revocacion = RevocacionTokens(intervalo=3600)
+
+    def test_filtro_bloom_sin_falsos_negativos(self):
+        """Test: El filtro contiene todas las claves agregadas"""
+        filtro = FiltroBloom.desde((f'jti-{i}' for i in range(1000)), capacidad=1000)
+        self.assertTrue(all(f'jti-{i}' in filtro for i in range(1000)))
+        falsos = sum(f'otro-{i}' in filtro for i in range(1000))
+        self.assertLess(falsos, 50)
+
+    def test_token_vigente_sin_consultas(self):
+        """Test: Un token no revocado se verifica en memoria"""
+        self.assertFalse(self.revocacion.esta_revocado(self.access))
+        with self.assertNumQueries(0):
+            self.assertFalse(self.revocacion.esta_revocado(self.access))
+
+    def test_revocar_token(self):
+        """Test: Un token revocado se rechaza hasta su vencimiento"""
+        self.revocacion.esta_revocado(self.access)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.revocacion.revocar_token(self.access)
+
+        self.assertTrue(self.revocacion.esta_revocado(self.access))
+        self.assertFalse(self.revocacion.esta_revocado(self.refresh))
+        revocado = TokenRevocado.objects.get()
+        self.assertEqual(revocado.expira.timestamp(), self.access['exp'])
+
+    def test_revocar_usuario(self):
+        """Test: Revocar al usuario invalida solo los tokens ya emitidos"""
+        # iat tiene resolución de segundos: el token es de un segundo anterior
+        self.refresh['iat'] -= 1
+        with self.captureOnCommitCallbacks(execute=True):
+            self.revocacion.revocar_usuario(self.user)
+        self.assertTrue(self.revocacion.esta_revocado(self.refresh))
+
+        TokenRevocado.objects.update(revocado_en=timezone.now() - timedelta(minutes=1))
+        nuevo = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.assertFalse(self.revocacion.esta_revocado(nuevo))
+
+    def test_token_del_mismo_segundo_vigente(self):
+        """Test: Un token emitido en el segundo de la revocación del usuario sigue vigente"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.revocacion.revocar_usuario(self.user)
+        revocado_en = TokenRevocado.objects.get().revocado_en
+        self.assertEqual(revocado_en.microsecond, 0)
+
+        nuevo = CustomTokenObtainPairSerializer.get_token(self.user)
+        nuevo['iat'] = int(revocado_en.timestamp())
+        self.assertFalse(self.revocacion.esta_revocado(nuevo))
+
+    def test_vencidos_se_eliminan(self):
+        """Test: Las revocaciones vencidas se eliminan al revocar, no al verificar"""
+        TokenRevocado.objects.create(jti='viejo', expira=timezone.now() - timedelta(seconds=1))
+        with self.assertNumQueries(1):
+            self.revocacion.esta_revocado(self.access)
+        self.assertTrue(TokenRevocado.objects.filter(jti='viejo').exists())
+
+        self.revocacion.revocar_token(self.access)
+        self.assertEqual(list(TokenRevocado.objects.values_list('jti', flat=True)), [self.access['jti']])
+
+    def test_logout_revoca_tokens(self):
+        """Test: Tras el logout el access y el refresh token se rechazan"""
+        get_revocacion_tokens().recargar()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('token_revoke'), {'refresh': str(self.refresh)}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.get(reverse('auditorialog-mis-logs'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials()
+        response = self.client.post(
+            reverse('token_refresh'), {'refresh': str(self.refresh)}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
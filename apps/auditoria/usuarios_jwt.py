@@ -0,0 +1,147 @@
+"""
+Resolución del usuario de los requests autenticados por JWT.
+
+CachedJWTAuthentication guarda el usuario de cada token por user_id con
+un TTL (JWT_USUARIO_CACHE_TTL), en lugar de leer la fila en cada request.
+Guardar o eliminar el usuario invalida la entrada (ver signals.py); los
+cambios hechos con queryset.update() se ven al vencer el TTL. Como la
+invalidación debe llegar a todos los procesos, sin una caché compartida
+(LocMemCache) el usuario se lee de la base de datos en cada request.
+
+Este módulo no importa vistas: DRF lo carga desde
+DEFAULT_AUTHENTICATION_CLASSES mientras se importan las vistas.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.cache import es_compartida
+
+from .revocacion import get_revocacion_tokens
+
+PREFIJO = 'jwt:usuario:'
+
+
+def _alias():
+    return getattr(settings, 'JWT_USUARIO_CACHE', 'default')
+
+
+def _cache():
+    return caches[_alias()]
+
+
+def cache_activa():
+    """Los usuarios se cachean solo con TTL y en una caché compartida"""
+    return bool(getattr(settings, 'JWT_USUARIO_CACHE_TTL', 300)) and es_compartida(_alias())
+
+
+def clave_usuario(user_id):
+    return f'{PREFIJO}{user_id}'
+
+
+def obtener_usuario(user_id):
+    return _cache().get(clave_usuario(user_id))
+
+
+def guardar_usuario(user):
+    _cache().set(clave_usuario(user.pk), user, getattr(settings, 'JWT_USUARIO_CACHE_TTL', 300))
+
+
+def invalidar_usuario(user_id):
+    _cache().delete(clave_usuario(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que toma el usuario de la caché por user_id
+    y solo lee la base de datos al no encontrarlo. Rechaza los tokens
+    revocados (ver revocacion.py).
+    """
+    
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if get_revocacion_tokens().esta_revocado(token):
+            raise InvalidToken('Token revocado')
+        return token
+    
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('El token no contiene la identificación del usuario')
+        
+        if not cache_activa():
+            return super().get_user(validated_token)
+        
+        user = obtener_usuario(user_id)
+        if user is None:
+            # Usuario inexistente o inactivo: super() rechaza sin cachear
+            user = super().get_user(validated_token)
+            guardar_usuario(user)
+            return user
+        
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('Usuario inactivo', code='user_inactive')
+        
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed('La contraseña del usuario cambió', code='password_changed')
+        
+        return user
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """
+    Autenticación para endpoints de lectura.
+
+    Con JWT_STATELESS_LECTURA activo, los requests GET/HEAD/OPTIONS usan un
+    usuario liviano armado con los claims del token (id, email, is_staff)
+    sin consultar la base de datos ni la caché. Los cambios en el usuario
+    (desactivación, is_staff) se aplican recién al renovar el token. Los
+    demás métodos resuelven el usuario como CachedJWTAuthentication.
+    """
+    
+    def authenticate(self, request):
+        self.desde_claims = (
+            getattr(settings, 'JWT_STATELESS_LECTURA', False)
+            and request.method in SAFE_METHODS
+        )
+        return super().authenticate(request)
+    
+    def get_user(self, validated_token):
+        if not self.desde_claims:
+            return super().get_user(validated_token)
+        
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('El token no contiene la identificación del usuario')
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+
+class AutenticacionLecturaMixin:
+    """
+    Mixin de ViewSet de lectura y escritura: los requests GET/HEAD/OPTIONS
+    se autentican con ClaimsJWTAuthentication y los demás con
+    DEFAULT_AUTHENTICATION_CLASSES, de modo que las escrituras nunca usan
+    el usuario armado con los claims.
+    """
+
+    def get_authenticators(self):
+        # Se llama antes de asignar self.action; self.request es el HttpRequest
+        if self.request.method in SAFE_METHODS:
+            return [ClaimsJWTAuthentication()]
+        return super().get_authenticators()
+
+
+class TokenRefreshRevocableSerializer(TokenRefreshSerializer):
+    """No emite access tokens a partir de un refresh token revocado"""
+    
+    def validate(self, attrs):
+        if get_revocacion_tokens().esta_revocado(self.token_class(attrs['refresh'])):
+            raise InvalidToken('Token revocado')
+        return super().validate(attrs)
@@ -1,16 +1,21 @@
 from django.core.serializers import serialize
+from django.db.models import Q
 from django.forms.models import model_to_dict
+from rest_framework.settings import api_settings
+import copy
 import json
 
 
 def obtener_datos_request(request):
     """Extrae la IP y User-Agent del request"""
-    # Obtener IP (considerando proxies)
+    # X-Forwarded-For lo arma el cliente: solo se usa la entrada que agregó
+    # el primero de los NUM_PROXIES proxies de confianza (como el throttling)
+    ip = request.META.get('REMOTE_ADDR', '')
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0].strip()
-    else:
-        ip = request.META.get('REMOTE_ADDR', '')
+    num_proxies = api_settings.NUM_PROXIES
+    if x_forwarded_for and num_proxies:
+        direcciones = x_forwarded_for.split(',')
+        ip = direcciones[-min(num_proxies, len(direcciones))].strip()
     
     # Obtener User-Agent
     user_agent = request.META.get('HTTP_USER_AGENT', '')
@@ -18,24 +23,122 @@ def obtener_datos_request(request):
     return ip, user_agent
 
 
-def serializar_objeto(instance):
+def _valor_serializable(value):
+    """Convierte un valor de campo a un tipo serializable en JSON"""
+    if hasattr(value, 'isoformat'):  # DateTime objects
+        return value.isoformat()
+    if hasattr(value, '__str__') and not isinstance(value, (str, int, float, bool, type(None))):
+        return str(value)
+    return value
+
+
+def serializar_objeto(instance, campos=None, excluir=None):
     """Serializa un objeto de modelo a diccionario JSON"""
     try:
         # Convertir modelo a diccionario
-        data = model_to_dict(instance)
+        data = model_to_dict(instance, fields=campos, exclude=excluir)
         
         # Convertir valores no serializables
         for key, value in data.items():
-            if hasattr(value, 'isoformat'):  # DateTime objects
-                data[key] = value.isoformat()
-            elif hasattr(value, '__str__') and not isinstance(value, (str, int, float, bool, type(None))):
-                data[key] = str(value)
+            data[key] = _valor_serializable(value)
         
         return data
     except Exception as e:
         return {'error': f'No se pudo serializar: {str(e)}'}
 
 
+def capturar_valores(instance, atributos=None):
+    """
+    Copia los valores de los campos concretos cargados en la instancia.
+
+    Si se indica atributos, solo se copian esos attname. Los campos
+    diferidos (only/defer) no se leen para no disparar consultas.
+    """
+    valores = {}
+    for campo in instance._meta.concrete_fields:
+        if atributos is not None and campo.attname not in atributos:
+            continue
+        if campo.attname in instance.__dict__:
+            valor = instance.__dict__[campo.attname]
+            # Los JSON mutables se copian para no ver modificaciones en sitio
+            valores[campo.attname] = copy.deepcopy(valor) if isinstance(valor, (dict, list)) else valor
+    return valores
+
+
+def serializar_estado_anterior(instance, valores, datos_nuevos):
+    """
+    Construye el snapshot anterior a partir de los valores capturados.
+
+    Parte de datos_nuevos (mismo formato que serializar_objeto) y reemplaza
+    los campos concretos por su valor capturado. Los campos sin valor
+    capturado (diferidos) y las relaciones muchos a muchos, que save() no
+    modifica, conservan el valor actual.
+    """
+    if 'error' in datos_nuevos:
+        return None
+
+    datos = dict(datos_nuevos)
+    for campo in instance._meta.concrete_fields:
+        if campo.name in datos and campo.attname in valores:
+            datos[campo.name] = _valor_serializable(valores[campo.attname])
+    return datos
+
+
+def calcular_diff(anteriores, nuevos):
+    """
+    Reduce dos snapshots a los campos que cambiaron.
+
+    Retorna (anteriores, nuevos) con solo esos campos, en el mismo formato
+    que datos_anteriores / datos_nuevos.
+    """
+    campos = [
+        campo for campo in nuevos
+        if campo not in anteriores or anteriores[campo] != nuevos[campo]
+    ]
+    return (
+        {campo: anteriores.get(campo) for campo in campos},
+        {campo: nuevos[campo] for campo in campos},
+    )
+
+
+def reconstruir_estados(log):
+    """
+    Reconstruye el estado completo antes y después de un log de auditoría.
+
+    Funciona tanto con snapshots completos como con diffs: recorre el
+    historial del objeto hasta el log y va aplicando cada cambio. Los campos
+    que no aparecen en el historial disponible quedan fuera del resultado.
+    """
+    from .models import AuditoriaLog, TipoAccion
+
+    if not log.content_type_id or log.object_id is None:
+        return log.datos_anteriores, log.datos_nuevos
+
+    historial = AuditoriaLog.objects.filter(
+        content_type_id=log.content_type_id,
+        object_id=log.object_id,
+        accion__in=[TipoAccion.CREATE, TipoAccion.UPDATE],
+        timestamp__lte=log.timestamp,
+    ).filter(
+        Q(timestamp__lt=log.timestamp) | Q(id__lt=log.pk)
+    ).order_by('timestamp', 'id').values_list('accion', 'datos_nuevos')
+
+    estado = {}
+    for accion, datos_nuevos in historial:
+        if accion == TipoAccion.CREATE:
+            estado = {}
+        estado.update(datos_nuevos or {})
+
+    if log.accion == TipoAccion.CREATE:
+        return None, dict(log.datos_nuevos or {})
+
+    anterior = {**estado, **(log.datos_anteriores or {})}
+    if log.accion == TipoAccion.DELETE:
+        return anterior, None
+
+    return anterior, {**anterior, **(log.datos_nuevos or {})}
+
+
 def obtener_usuario_actual():
     """Obtiene el usuario actual del contexto (si está disponible)"""
     # Esta función puede ser mejorada usando threading.local()
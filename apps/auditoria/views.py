@@ -2,26 +2,37 @@ from rest_framework import viewsets, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
+from .usuarios_jwt import ClaimsJWTAuthentication
+from .busqueda import BusquedaLogsFilter
+from .contadores import get_contador_fallidos
 from .models import AuditoriaLog, SesionUsuario
-from .serializers import AuditoriaLogSerializer, SesionUsuarioSerializer
+from .pagination import AuditoriaLogPagination, SesionUsuarioPagination
+from .resumenes import estadisticas_periodo
+from .serializers import AuditoriaLogSerializer, AuditoriaLogDetalleSerializer, SesionUsuarioSerializer
 
 
 class AuditoriaLogViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para consultar logs de auditoría"""
     
-    queryset = AuditoriaLog.objects.all().select_related('usuario', 'content_type')
+    queryset = AuditoriaLog.objects.all().select_related('usuario', 'content_type', 'agente')
     serializer_class = AuditoriaLogSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = AuditoriaLogPagination
     
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    # ?q= y ?search= buscan también en el texto renderizado de las plantillas
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BusquedaLogsFilter]
     filterset_fields = ['accion', 'exito', 'content_type']
-    search_fields = ['usuario__email', 'descripcion', 'direccion_ip']
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
     
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return AuditoriaLogDetalleSerializer
+        return AuditoriaLogSerializer
+    
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
         """Endpoint para obtener estadísticas de auditoría"""
@@ -30,44 +41,28 @@ class AuditoriaLogViewSet(viewsets.ReadOnlyModelViewSet):
         dias = int(request.query_params.get('dias', 30))
         fecha_desde = timezone.now() - timedelta(days=dias)
         
-        queryset = self.get_queryset().filter(timestamp__gte=fecha_desde)
-        
-        # Estadísticas por acción
-        stats_accion = queryset.values('accion').annotate(
-            total=Count('id')
-        ).order_by('-total')
-        
-        # Estadísticas por usuario
-        stats_usuario = queryset.exclude(usuario__isnull=True).values(
-            'usuario__email'
-        ).annotate(
-            total=Count('id')
-        ).order_by('-total')[:10]
+        # Conteos desde las tablas de resumen (sin recorrer los logs)
+        estadisticas = estadisticas_periodo(fecha_desde)
         
-        # Estadísticas por día
-        stats_por_dia = queryset.extra(
-            select={'dia': 'date(timestamp)'}
-        ).values('dia').annotate(
-            total=Count('id'),
-            exitosos=Count('id', filter=Q(exito=True)),
-            fallidos=Count('id', filter=Q(exito=False))
-        ).order_by('dia')
-        
-        # Intentos de login fallidos recientes
-        login_fallidos = queryset.filter(
-            accion='LOGIN_FAILED',
-            timestamp__gte=timezone.now() - timedelta(hours=24)
-        ).values('direccion_ip').annotate(
-            intentos=Count('id')
-        ).order_by('-intentos')[:10]
+        # Intentos de login fallidos recientes, desde los contadores (sin recorrer los logs)
+        contador = get_contador_fallidos()
+        login_fallidos = [
+            {'direccion_ip': ip, 'intentos': intentos}
+            for ip, intentos in contador.principales_ips(10)
+        ]
+        emails_fallidos = [
+            {'email': email, 'intentos': intentos}
+            for email, intentos in contador.principales_emails(10)
+        ]
         
         return Response({
             'periodo_dias': dias,
-            'total_eventos': queryset.count(),
-            'estadisticas_por_accion': stats_accion,
-            'usuarios_mas_activos': stats_usuario,
-            'actividad_por_dia': list(stats_por_dia),
-            'intentos_login_fallidos_24h': list(login_fallidos)
+            'total_eventos': estadisticas['total_eventos'],
+            'estadisticas_por_accion': estadisticas['estadisticas_por_accion'],
+            'usuarios_mas_activos': estadisticas['usuarios_mas_activos'],
+            'actividad_por_dia': estadisticas['actividad_por_dia'],
+            'intentos_login_fallidos_24h': login_fallidos,
+            'emails_login_fallidos_24h': emails_fallidos
         })
     
     @action(detail=False, methods=['get'])
@@ -76,7 +71,7 @@ class AuditoriaLogViewSet(viewsets.ReadOnlyModelViewSet):
         self.permission_classes = [permissions.IsAuthenticated]
         self.check_permissions(request)
         
-        queryset = self.get_queryset().filter(usuario=request.user)
+        queryset = self.get_queryset().filter(usuario_id=request.user.pk)
         page = self.paginate_queryset(queryset)
         
         if page is not None:
@@ -92,22 +87,23 @@ class SesionUsuarioViewSet(viewsets.ReadOnlyModelViewSet):
     
     queryset = SesionUsuario.objects.all().select_related('usuario')
     serializer_class = SesionUsuarioSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = SesionUsuarioPagination
     
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['activa', 'usuario']
-    ordering_fields = ['fecha_inicio', 'fecha_ultimo_acceso']
+    # KeysetPagination solo recorre por fecha_inicio (ascendente o descendente)
+    ordering_fields = ['fecha_inicio']
     ordering = ['-fecha_inicio']
     
     @action(detail=False, methods=['get'])
     def activas(self, request):
         """Endpoint para obtener sesiones activas"""
         sesiones_activas = self.get_queryset().filter(activa=True)
-        serializer = self.get_serializer(sesiones_activas, many=True)
-        return Response({
-            'total': sesiones_activas.count(),
-            'sesiones': serializer.data
-        })
+        page = self.paginate_queryset(sesiones_activas)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def mis_sesiones(self, request):
@@ -115,7 +111,7 @@ class SesionUsuarioViewSet(viewsets.ReadOnlyModelViewSet):
         self.permission_classes = [permissions.IsAuthenticated]
         self.check_permissions(request)
         
-        queryset = self.get_queryset().filter(usuario=request.user)
+        queryset = self.get_queryset().filter(usuario_id=request.user.pk)
         page = self.paginate_queryset(queryset)
         
         if page is not None:
@@ -0,0 +1,211 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .agentes import resolver_agentes
+from .models import AuditoriaLog
+from .resumenes import acumular_resumenes
+
+logger = logging.getLogger(__name__)
+
+
+class ModoEscritura:
+    """Modos de escritura de logs de auditoría"""
+    SINCRONO = 'sync'
+    ASINCRONO = 'async'
+
+
+class PoliticaDesborde:
+    """Qué hacer cuando la cola del escritor está llena"""
+    BLOQUEAR = 'block'
+    DESCARTAR = 'drop'
+    SINCRONO = 'sync'
+
+
+class AuditoriaWriter:
+    """
+    Escritor de logs de auditoría con buffer en memoria.
+
+    Los logs se encolan al confirmarse la transacción y un hilo en segundo
+    plano los inserta con bulk_create en lotes. El volcado se dispara al
+    alcanzar batch_size, al vencer el intervalo o al detener el proceso.
+    """
+
+    def __init__(self, batch_size=200, intervalo=2.0, capacidad=10000,
+                 politica=PoliticaDesborde.BLOQUEAR, timeout_bloqueo=5.0):
+        self.batch_size = batch_size
+        self.intervalo = intervalo
+        self.politica = politica
+        self.timeout_bloqueo = timeout_bloqueo
+
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self._lock_volcado = threading.Lock()
+        self._hilo = None
+        self._pid = None
+
+        # Contadores para monitoreo
+        self.escritos = 0
+        self.descartados = 0
+        self.fallidos = 0
+
+    def encolar(self, log):
+        """Agrega un log a la cola aplicando la política de desborde"""
+        self._asegurar_hilo()
+
+        try:
+            if self.politica == PoliticaDesborde.BLOQUEAR:
+                self._cola.put(log, timeout=self.timeout_bloqueo)
+            else:
+                self._cola.put_nowait(log)
+        except queue.Full:
+            if self.politica == PoliticaDesborde.SINCRONO:
+                self._persistir([log])
+            else:
+                with self._lock:
+                    self.descartados += 1
+                logger.warning('Cola de auditoría llena, log descartado: %s', log.accion)
+            return
+
+        if self._cola.qsize() >= self.batch_size:
+            self._despertar.set()
+
+    def notificar_commit(self):
+        """Despierta al hilo para volcar lo encolado por una transacción"""
+        self._despertar.set()
+
+    def flush(self):
+        """Vuelca todos los logs pendientes en el hilo actual"""
+        with self._lock_volcado:
+            while True:
+                lote = self._extraer_lote()
+                if not lote:
+                    break
+                self._persistir(lote)
+
+    def detener(self, timeout=10.0):
+        """Detiene el hilo y vuelca los logs pendientes"""
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo and self._hilo.is_alive():
+            self._hilo.join(timeout)
+        self.flush()
+
+    def estado(self):
+        """Retorna contadores del escritor"""
+        return {
+            'pendientes': self._cola.qsize(),
+            'escritos': self.escritos,
+            'descartados': self.descartados,
+            'fallidos': self.fallidos,
+        }
+
+    def _asegurar_hilo(self):
+        # Tras un fork (gunicorn --preload) el hilo del padre no existe en el hijo
+        if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+            return
+
+        with self._lock:
+            if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(
+                target=self._ejecutar,
+                name='auditoria-writer',
+                daemon=True
+            )
+            self._hilo.start()
+
+    def _ejecutar(self):
+        try:
+            while not self._detener.is_set():
+                self._despertar.wait(self.intervalo)
+                self._despertar.clear()
+                close_old_connections()
+                self.flush()
+        finally:
+            connection.close()
+
+    def _extraer_lote(self):
+        lote = []
+        while len(lote) < self.batch_size:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _persistir(self, lote):
+        try:
+            escribir_logs(lote, batch_size=self.batch_size)
+        except Exception:
+            with self._lock:
+                self.fallidos += len(lote)
+            logger.exception('Error al escribir %d logs de auditoría', len(lote))
+            return
+
+        with self._lock:
+            self.escritos += len(lote)
+
+
+def escribir_logs(logs, batch_size=None):
+    """Inserta los logs y actualiza los resúmenes en una misma transacción"""
+    with transaction.atomic():
+        resolver_agentes(logs)
+        AuditoriaLog.objects.bulk_create(logs, batch_size=batch_size)
+        acumular_resumenes(logs)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Retorna el escritor del proceso, creándolo según la configuración"""
+    global _writer
+
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditoriaWriter(
+                    batch_size=getattr(settings, 'AUDITORIA_WRITER_BATCH_SIZE', 200),
+                    intervalo=getattr(settings, 'AUDITORIA_WRITER_FLUSH_INTERVAL', 2.0),
+                    capacidad=getattr(settings, 'AUDITORIA_WRITER_QUEUE_SIZE', 10000),
+                    politica=getattr(settings, 'AUDITORIA_WRITER_OVERFLOW', PoliticaDesborde.BLOQUEAR),
+                    timeout_bloqueo=getattr(settings, 'AUDITORIA_WRITER_BLOCK_TIMEOUT', 5.0),
+                )
+                atexit.register(_writer.detener)
+    return _writer
+
+
+def registrar_log(**campos):
+    """
+    Registra un log de auditoría.
+
+    En modo síncrono se inserta de inmediato, como antes. En modo asíncrono
+    el log se encola cuando la transacción actual se confirma, de modo que
+    los logs de un request revertido tampoco se escriben.
+    """
+    log = AuditoriaLog(**campos)
+
+    modo = getattr(settings, 'AUDITORIA_WRITER_MODE', ModoEscritura.SINCRONO)
+    if modo != ModoEscritura.ASINCRONO:
+        escribir_logs([log])
+        return log
+
+    writer = get_writer()
+
+    def _encolar():
+        writer.encolar(log)
+        writer.notificar_commit()
+
+    transaction.on_commit(_encolar)
+    return log
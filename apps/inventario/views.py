@@ -4,8 +4,9 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import MovimientoInventario
 from .serializers import MovimientoInventarioSerializer
+from apps.auditoria.usuarios_jwt import AutenticacionLecturaMixin
 
-class MovimientoInventarioViewSet(viewsets.ModelViewSet):
+class MovimientoInventarioViewSet(AutenticacionLecturaMixin, viewsets.ModelViewSet):
     queryset = MovimientoInventario.objects.all()
     serializer_class = MovimientoInventarioSerializer
     permission_classes = [permissions.IsAuthenticated]
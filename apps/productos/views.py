@@ -2,8 +2,9 @@ from rest_framework import viewsets, permissions
 from rest_framework.filters import SearchFilter, OrderingFilter
 from .models import Producto
 from .serializers import ProductoSerializer
+from apps.auditoria.usuarios_jwt import AutenticacionLecturaMixin
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(AutenticacionLecturaMixin, viewsets.ModelViewSet):
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -1,7 +1,7 @@
 # admin.py
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Socio, Aporte
+from .models import Socio, Aporte, CorreoPendiente
 
 @admin.register(Socio)
 class SocioAdmin(admin.ModelAdmin):
@@ -68,4 +68,13 @@ class AporteAdmin(admin.ModelAdmin):
         if len(obj.descripcion) > 50:
             return f"{obj.descripcion[:50]}..."
         return obj.descripcion
-    descripcion_corta.short_description = 'Descripción'
\ No newline at end of file
+    descripcion_corta.short_description = 'Descripción'
+
+
+@admin.register(CorreoPendiente)
+class CorreoPendienteAdmin(admin.ModelAdmin):
+    list_display = ['id', 'asunto', 'destinatarios', 'intentos', 'proximo_intento', 'enviado_en']
+    list_filter = ['enviado_en', 'creado_en']
+    search_fields = ['asunto', 'ultimo_error']
+    readonly_fields = ['creado_en', 'enviado_en', 'ultimo_error']
+    list_per_page = 20
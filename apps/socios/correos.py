@@ -0,0 +1,115 @@
+"""
+Envío asíncrono de correos por bandeja de salida (CorreoPendiente).
+
+Las altas solo insertan el correo en su propia transacción: si se
+revierten, el correo no existe, y un SMTP lento no demora el request. El
+comando despachar_correos los envía por lotes:
+1. reserva hasta `lote` correos vencidos adelantando su próximo intento
+   CORREOS_RESERVA segundos (con SKIP LOCKED donde la base lo soporta),
+   para que otro despachador no los tome mientras se envían;
+2. los envía por una única conexión SMTP reutilizada;
+3. marca los enviados y reprograma los fallidos con espera exponencial
+   (CORREOS_REINTENTO_BASE * 2^intentos), hasta CORREOS_MAX_INTENTOS.
+
+Un despachador que termina de forma abrupta deja sus reservas vencer y
+otro las retoma.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .models import CorreoPendiente
+
+
+def correo_pendiente(asunto, mensaje, remitente, destinatarios):
+    """Instancia sin guardar, para create() o bulk_create()"""
+    return CorreoPendiente(
+        asunto=asunto, mensaje=mensaje, remitente=remitente, destinatarios=list(destinatarios)
+    )
+
+
+def encolar_correo(asunto, mensaje, remitente, destinatarios):
+    """Guarda el correo en la bandeja de salida, en la transacción actual"""
+    correo = correo_pendiente(asunto, mensaje, remitente, destinatarios)
+    correo.save()
+    return correo
+
+
+def _espera(intentos):
+    base = getattr(settings, 'CORREOS_REINTENTO_BASE', 60)
+    return timedelta(seconds=min(base * 2 ** (intentos - 1), 6 * 3600))
+
+
+def reservar_correos(lote):
+    """Reserva y retorna hasta `lote` correos listos para enviar"""
+    ahora = timezone.now()
+    max_intentos = getattr(settings, 'CORREOS_MAX_INTENTOS', 5)
+    reserva = timedelta(seconds=getattr(settings, 'CORREOS_RESERVA', 300))
+
+    with transaction.atomic():
+        pendientes = CorreoPendiente.objects.filter(
+            enviado_en__isnull=True,
+            intentos__lt=max_intentos,
+            proximo_intento__lte=ahora
+        ).order_by('proximo_intento')
+        if db_connection.features.has_select_for_update_skip_locked:
+            pendientes = pendientes.select_for_update(skip_locked=True)
+        correos = list(pendientes[:lote])
+        CorreoPendiente.objects.filter(pk__in=[c.pk for c in correos]).update(
+            proximo_intento=ahora + reserva
+        )
+    return correos
+
+
+def despachar_correos(lote=None):
+    """Envía un lote de correos pendientes. Retorna (enviados, fallidos)"""
+    correos = reservar_correos(lote or getattr(settings, 'CORREOS_LOTE', 100))
+    if not correos:
+        return 0, 0
+
+    enviados, fallidos = [], []
+    conexion = get_connection(fail_silently=False)
+    try:
+        conexion.open()
+        for correo in correos:
+            mensaje = EmailMessage(
+                correo.asunto, correo.mensaje, correo.remitente, correo.destinatarios,
+                connection=conexion
+            )
+            try:
+                mensaje.send()
+            except Exception as error:
+                correo.ultimo_error = f'{type(error).__name__}: {error}'
+                fallidos.append(correo)
+                # La conexión puede haber quedado inutilizable: se abre otra
+                conexion.close()
+                conexion.open()
+            else:
+                enviados.append(correo.pk)
+    except Exception as error:
+        # Sin conexión al servidor: los no enviados se reintentan más tarde
+        procesados = set(enviados) | {correo.pk for correo in fallidos}
+        for correo in correos:
+            if correo.pk not in procesados:
+                correo.ultimo_error = f'{type(error).__name__}: {error}'
+                fallidos.append(correo)
+    finally:
+        conexion.close()
+
+    ahora = timezone.now()
+    CorreoPendiente.objects.filter(pk__in=enviados).update(enviado_en=ahora, ultimo_error='')
+    for correo in fallidos:
+        correo.intentos += 1
+        correo.proximo_intento = ahora + _espera(correo.intentos)
+    CorreoPendiente.objects.bulk_update(fallidos, ['intentos', 'proximo_intento', 'ultimo_error'])
+    return len(enviados), len(fallidos)
+
+
+def purgar_enviados(dias):
+    """Elimina los correos enviados hace más de `dias` días"""
+    limite = timezone.now() - timedelta(days=dias)
+    borrados, _ = CorreoPendiente.objects.filter(enviado_en__lt=limite).delete()
+    return borrados
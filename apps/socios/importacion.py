@@ -0,0 +1,252 @@
+"""
+Alta masiva de socios desde CSV o NDJSON.
+
+Cada fila lleva los campos de SocioCreateSerializer. El proceso:
+1. valida formato de cada fila (serializer, documento y usuario) sin consultas;
+2. descarta duplicados dentro del archivo y contra la base con una consulta
+   IN por campo (email, username, documento, dni) y lote;
+3. hashea las contraseñas en un pool de procesos (core/hasheo.py);
+4. inserta documentos, usuarios, socios y sus correos de bienvenida
+   (bandeja de salida, ver correos.py) con bulk_create, en una
+   transacción por lote de IMPORTACION_LOTE filas. bulk_create no emite
+   post_save: los logs CREATE de los modelos auditados se registran
+   explícitamente en la misma transacción.
+
+Un conflicto de unicidad en la inserción (alta concurrente) revierte solo
+su lote. El resultado es un reporte por fila.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from rest_framework.validators import UniqueValidator
+
+from apps.auditoria.signals import log_modelos_creados
+from apps.usuarios.disponibilidad import clave_documento, get_filtros_disponibilidad
+from apps.usuarios.document_models import DocumentoIdentidad
+from apps.usuarios.models import User
+from core.hasheo import hashear_passwords
+
+from .correos import correo_pendiente
+from .models import CorreoPendiente, Socio
+from .serializers import SocioCreateSerializer
+from .signals import mensaje_bienvenida
+
+FORMATOS = ('csv', 'ndjson')
+
+
+def leer_filas(archivo, formato):
+    """Filas (dict) de un archivo CSV o NDJSON, de texto o binario"""
+    contenido = archivo.read()
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8-sig')
+    lineas = contenido.splitlines()
+
+    if formato == 'csv':
+        return list(csv.DictReader(lineas))
+    if formato == 'ndjson':
+        filas = []
+        for numero, linea in enumerate(lineas, start=1):
+            if not linea.strip():
+                continue
+            try:
+                filas.append(json.loads(linea))
+            except json.JSONDecodeError as error:
+                raise ValueError(f'Línea {numero}: JSON inválido ({error.msg})')
+        return filas
+    raise ValueError(f'Formato no soportado: {formato}. Use {", ".join(FORMATOS)}')
+
+
+class SocioImportacionSerializer(SocioCreateSerializer):
+    """SocioCreateSerializer sin consultas: la unicidad se valida por lote"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for field in fields.values():
+            field.validators = [v for v in field.validators if not isinstance(v, UniqueValidator)]
+        return fields
+
+    def validate(self, attrs):
+        return self.completar_datos(attrs)
+
+
+class FilaImportacion:
+    """Fila válida con sus instancias aún sin guardar"""
+
+    def __init__(self, numero, datos):
+        datos = dict(datos)
+        self.numero = numero
+        self.password = datos.pop('password')
+        self.documento = DocumentoIdentidad(
+            tipo_documento=datos.pop('tipo_documento'),
+            numero_documento=datos.pop('numero_documento'),
+            extension=datos.pop('extension_documento', None) or None
+        )
+        self.usuario = User(
+            username=datos.pop('username'),
+            first_name=datos.pop('first_name'),
+            last_name=datos.pop('last_name'),
+            email=User.objects.normalize_email(datos.pop('email'))
+        )
+        self.socio = Socio(**datos)
+
+    def validar(self):
+        """Formato de documento y usuario, sin las consultas de unicidad"""
+        self.documento.validacion_completa = False
+        self.documento.clean()
+        self.usuario.clean_fields(exclude=['password', 'documento_identidad'])
+        if not self.socio.dni:
+            self.socio.dni = self.documento.documento_completo
+
+    @property
+    def clave_documento(self):
+        return clave_documento(self.documento.tipo_documento, self.documento.numero_documento, self.documento.extension)
+
+
+class ImportacionSocios:
+    """Importa filas de socios y retorna un reporte por fila"""
+
+    def __init__(self, tamano_lote=None, procesos=None):
+        self.tamano_lote = tamano_lote or getattr(settings, 'IMPORTACION_LOTE', 500)
+        self.procesos = procesos if procesos is not None else getattr(settings, 'IMPORTACION_PROCESOS', 0)
+
+    def importar(self, filas):
+        resultados = [{'fila': numero, 'estado': 'pendiente'} for numero in range(1, len(filas) + 1)]
+
+        validas = self._validar(filas, resultados)
+        validas = self._descartar_duplicados(validas, resultados)
+
+        for fila, hash_password in zip(validas, hashear_passwords([fila.password for fila in validas], self.procesos)):
+            fila.usuario.password = hash_password
+
+        for inicio in range(0, len(validas), self.tamano_lote):
+            self._insertar(validas[inicio:inicio + self.tamano_lote], resultados)
+
+        creados = sum(1 for resultado in resultados if resultado['estado'] == 'creado')
+        return {
+            'total': len(resultados),
+            'creados': creados,
+            'errores': len(resultados) - creados,
+            'filas': resultados,
+        }
+
+    def _validar(self, filas, resultados):
+        validas = []
+        for numero, datos in enumerate(filas, start=1):
+            serializer = SocioImportacionSerializer(data=datos)
+            if not serializer.is_valid():
+                self._error(resultados, numero, serializer.errors)
+                continue
+
+            fila = FilaImportacion(numero, serializer.validated_data)
+            try:
+                fila.validar()
+            except ValidationError as error:
+                self._error(resultados, numero, error.message_dict)
+                continue
+            validas.append(fila)
+        return validas
+
+    def _descartar_duplicados(self, validas, resultados):
+        campos = {
+            'email': (lambda fila: fila.usuario.email, self._emails_existentes),
+            'username': (lambda fila: fila.usuario.username, self._usernames_existentes),
+            'numero_documento': (lambda fila: fila.clave_documento, self._documentos_existentes),
+            'dni': (lambda fila: fila.socio.dni, self._dnis_existentes),
+        }
+        existentes = {
+            campo: buscar(validas) for campo, (valor, buscar) in campos.items()
+        }
+
+        vistos = {campo: {} for campo in campos}
+        sin_duplicados = []
+        for fila in validas:
+            errores = {}
+            for campo, (valor, _) in campos.items():
+                clave = valor(fila)
+                if clave in existentes[campo]:
+                    errores[campo] = ['Ya registrado']
+                elif clave in vistos[campo]:
+                    errores[campo] = [f'Duplicado de la fila {vistos[campo][clave]}']
+                else:
+                    vistos[campo][clave] = fila.numero
+            if errores:
+                self._error(resultados, fila.numero, errores)
+            else:
+                sin_duplicados.append(fila)
+        return sin_duplicados
+
+    def _por_lotes(self, valores):
+        valores = list(set(valores))
+        for inicio in range(0, len(valores), self.tamano_lote):
+            yield valores[inicio:inicio + self.tamano_lote]
+
+    def _emails_existentes(self, filas):
+        existentes = set()
+        for lote in self._por_lotes(fila.usuario.email for fila in filas):
+            existentes.update(User.objects.filter(email__in=lote).values_list('email', flat=True))
+        return existentes
+
+    def _usernames_existentes(self, filas):
+        existentes = set()
+        for lote in self._por_lotes(fila.usuario.username for fila in filas):
+            existentes.update(User.objects.filter(username__in=lote).values_list('username', flat=True))
+        return existentes
+
+    def _documentos_existentes(self, filas):
+        # IN por número y cruce por clave completa (tipo, número, extensión) en memoria
+        existentes = set()
+        for lote in self._por_lotes(fila.documento.numero_documento for fila in filas):
+            documentos = DocumentoIdentidad.objects.filter(
+                activo=True, numero_documento__in=lote
+            ).values_list('tipo_documento', 'numero_documento', 'extension')
+            existentes.update(clave_documento(*documento) for documento in documentos)
+        return existentes
+
+    def _dnis_existentes(self, filas):
+        existentes = set()
+        for lote in self._por_lotes(fila.socio.dni for fila in filas):
+            existentes.update(Socio.objects.filter(dni__in=lote).values_list('dni', flat=True))
+        return existentes
+
+    def _insertar(self, lote, resultados):
+        try:
+            with transaction.atomic():
+                documentos = DocumentoIdentidad.objects.bulk_create([fila.documento for fila in lote])
+                for fila in lote:
+                    fila.usuario.documento_identidad = fila.documento
+                usuarios = User.objects.bulk_create([fila.usuario for fila in lote])
+                for fila in lote:
+                    fila.socio.usuario = fila.usuario
+                socios = Socio.objects.bulk_create([fila.socio for fila in lote])
+                for modelo, instancias in (
+                    (DocumentoIdentidad, documentos), (User, usuarios), (Socio, socios)
+                ):
+                    log_modelos_creados(modelo, instancias)
+                CorreoPendiente.objects.bulk_create([
+                    correo_pendiente(*mensaje_bienvenida(fila.socio)) for fila in lote
+                ])
+                transaction.on_commit(lambda: self._al_confirmar(lote))
+        except IntegrityError:
+            for fila in lote:
+                self._error(resultados, fila.numero, {
+                    'non_field_errors': ['Conflicto con un alta simultánea; reintente el lote']
+                })
+            return
+
+        for fila in lote:
+            resultados[fila.numero - 1].update(estado='creado', socio_id=fila.socio.pk)
+
+    def _al_confirmar(self, lote):
+        # bulk_create no emite post_save: los filtros de disponibilidad se actualizan aquí
+        filtros = get_filtros_disponibilidad()
+        for fila in lote:
+            filtros.agregar_email(fila.usuario.email)
+            filtros.agregar_documento(
+                fila.documento.tipo_documento, fila.documento.numero_documento, fila.documento.extension
+            )
+
+    def _error(self, resultados, numero, errores):
+        resultados[numero - 1].update(estado='error', errores=errores)
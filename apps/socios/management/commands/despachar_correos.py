@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.socios.correos import despachar_correos, purgar_enviados
+
+
+class Command(BaseCommand):
+    help = (
+        'Envía los correos de la bandeja de salida por una conexión SMTP reutilizada. '
+        'Para probar en local: EMAIL_HOST=localhost EMAIL_PORT=1025 y '
+        '"python -m aiosmtpd -n -l localhost:1025"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            help='Correos por conexión (default: CORREOS_LOTE)',
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Seguir despachando cada CORREOS_INTERVALO segundos',
+        )
+
+    def handle(self, *args, **options):
+        intervalo = getattr(settings, 'CORREOS_INTERVALO', 5.0)
+        retencion = getattr(settings, 'CORREOS_RETENCION_DIAS', 7)
+
+        while True:
+            # Vaciar lo pendiente antes de esperar: los fallidos quedan
+            # reprogramados a futuro, así que el ciclo termina
+            enviados, fallidos = despachar_correos(options['lote'])
+            while enviados or fallidos:
+                self.stdout.write(f'{enviados} enviados, {fallidos} fallidos')
+                enviados, fallidos = despachar_correos(options['lote'])
+
+            purgados = purgar_enviados(retencion)
+            if purgados:
+                self.stdout.write(f'{purgados} correos enviados purgados')
+
+            if not options['continuo']:
+                break
+            time.sleep(intervalo)
+
+        self.stdout.write(self.style.SUCCESS('Bandeja de salida despachada'))
@@ -0,0 +1,60 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.socios.importacion import FORMATOS, ImportacionSocios, leer_filas
+
+
+class Command(BaseCommand):
+    help = 'Alta masiva de socios desde un archivo CSV o NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Archivo .csv o .ndjson')
+        parser.add_argument(
+            '--formato',
+            choices=FORMATOS,
+            help='Formato del archivo (por defecto, según la extensión)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            help='Filas por transacción (default: IMPORTACION_LOTE)',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            help='Procesos para hashear contraseñas (default: IMPORTACION_PROCESOS, 0 = uno por núcleo)',
+        )
+        parser.add_argument(
+            '--reporte',
+            help='Guardar el reporte por fila en este archivo JSON',
+        )
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        if not ruta.exists():
+            raise CommandError(f'No existe: {ruta}')
+
+        formato = options['formato'] or ruta.suffix.lstrip('.').lower()
+        if formato not in FORMATOS:
+            raise CommandError(f'Formato no soportado: {formato}. Use --formato')
+
+        with ruta.open('rb') as archivo:
+            try:
+                filas = leer_filas(archivo, formato)
+            except (ValueError, UnicodeDecodeError) as error:
+                raise CommandError(str(error))
+
+        reporte = ImportacionSocios(options['lote'], options['procesos']).importar(filas)
+
+        for fila in reporte['filas']:
+            if fila['estado'] == 'error':
+                self.stdout.write(self.style.WARNING(f'Fila {fila["fila"]}: {json.dumps(fila["errores"], ensure_ascii=False)}'))
+
+        if options['reporte']:
+            Path(options['reporte']).write_text(json.dumps(reporte, ensure_ascii=False, indent=2), encoding='utf-8')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{reporte["creados"]} socios creados, {reporte["errores"]} filas con errores de {reporte["total"]}'
+        ))
@@ -1,11 +1,13 @@
 # models.py
 from django.db import models
+from django.utils import timezone
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from apps.usuarios.models import User
 from apps.usuarios.document_models import DocumentoIdentidad, TipoDocumento
+from core.validacion import ValidacionPorRestriccionesMixin
 
-class Socio(models.Model):
+class Socio(ValidacionPorRestriccionesMixin, models.Model):
     TIPO_SOCIO_CHOICES = [
         ('PRODUCTOR', 'Productor'),
         ('CONSUMIDOR', 'Consumidor'),
@@ -60,12 +62,18 @@ class Socio(models.Model):
         super().clean()
         
         # Validar que el usuario asociado tenga documento de identidad
-        if self.usuario and not self.usuario.documento_identidad:
+        if self.usuario and not self.usuario.documento_identidad_id:
             raise ValidationError({
                 'usuario': 'El usuario debe tener un documento de identidad asociado'
             })
         
         # Validar que no haya duplicados de documento entre socios activos
+        if self.validacion_completa:
+            self.validar_unicidad()
+    
+    def validar_unicidad(self):
+        # Un documento activo pertenece a un único usuario y un usuario a un
+        # único socio, por lo que las restricciones únicas ya cubren esta consulta
         if self.usuario and self.usuario.documento_identidad and self.activo:
             documento = self.usuario.documento_identidad
             
@@ -83,9 +91,13 @@ class Socio(models.Model):
                              f'{documento.get_tipo_documento_display()}: {documento.documento_completo}'
                 })
     
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+    def errores_integridad(self):
+        return [
+            (('socios_socio_usuario', 'socios_socio.usuario_id'),
+             {'usuario': 'El usuario ya tiene un perfil de socio'}),
+            (('socios_socio_dni', 'socios_socio.dni'),
+             {'dni': 'Ya existe un socio con este DNI'}),
+        ]
 
     def __str__(self):
         return f"{self.usuario.get_full_name()} - {self.get_tipo_socio_display()}"
@@ -138,4 +150,33 @@ class Aporte(models.Model):
         ]
 
     def __str__(self):
-        return f"Aporte de {self.socio.usuario.get_full_name()} - {self.get_tipo_aporte_display()}"
\ No newline at end of file
+        return f"Aporte de {self.socio.usuario.get_full_name()} - {self.get_tipo_aporte_display()}"
+
+
+class CorreoPendiente(models.Model):
+    """
+    Bandeja de salida: el correo se guarda en la misma transacción que lo
+    origina y lo envía el comando despachar_correos (ver correos.py).
+    """
+    asunto = models.CharField(max_length=255)
+    mensaje = models.TextField()
+    remitente = models.CharField(max_length=255)
+    destinatarios = models.JSONField()
+    creado_en = models.DateTimeField(auto_now_add=True)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    enviado_en = models.DateTimeField(null=True, blank=True)
+    ultimo_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Correo pendiente'
+        verbose_name_plural = 'Correos pendientes'
+        indexes = [
+            models.Index(
+                fields=['proximo_intento'], name='correo_pendiente_idx',
+                condition=models.Q(enviado_en__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.asunto} -> {', '.join(self.destinatarios)}"
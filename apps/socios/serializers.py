@@ -1,9 +1,11 @@
 # serializers.py
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
 from .models import Socio, Aporte
 from apps.usuarios.models import User
+from apps.usuarios.disponibilidad import registros_existentes
 from apps.usuarios.document_models import DocumentoIdentidad, TipoDocumento
 from apps.usuarios.validation_serializers import DocumentoIdentidadSerializer, UserExtendedSerializer
 
@@ -64,54 +66,58 @@ class SocioCreateSerializer(serializers.ModelSerializer):
             'tipo_socio', 'dni', 'direccion', 'telefono', 'notas'
         ]
     
-    def validate_email(self, value):
-        """Validar email único"""
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Este email ya está registrado")
-        return value
+    def completar_datos(self, attrs):
+        """Normaliza el documento y genera el username si falta, sin consultas"""
+        if attrs.get('numero_documento'):
+            attrs['numero_documento'] = DocumentoIdentidad.normalizar_numero(attrs['numero_documento'])
+        
+        # Generar username si no se proporciona
+        if not attrs.get('username'):
+            email = attrs.get('email', '')
+            attrs['username'] = email.split('@')[0] if email else f"user_{attrs.get('numero_documento')}"
+        
+        return attrs
     
     def validate(self, attrs):
-        """Validaciones cruzadas"""
-        # Validar documento único
+        """Validaciones cruzadas, con una sola consulta de duplicados"""
+        attrs = self.completar_datos(attrs)
         tipo_documento = attrs.get('tipo_documento')
         numero_documento = attrs.get('numero_documento')
         extension_documento = attrs.get('extension_documento') or None
         
-        if numero_documento:
-            numero_normalizado = DocumentoIdentidad.normalizar_numero(numero_documento)
-            attrs['numero_documento'] = numero_normalizado
-            
-            if DocumentoIdentidad.existe_documento(
-                tipo_documento=tipo_documento,
-                numero_documento=numero_normalizado,
-                extension=extension_documento
-            ):
-                documento_completo = numero_normalizado
-                if extension_documento:
-                    documento_completo += f"-{extension_documento}"
-                
-                raise serializers.ValidationError({
-                    'numero_documento': f'Ya existe un {TipoDocumento(tipo_documento).label} '
-                                      f'con número {documento_completo}'
-                })
-        
-        # Generar username si no se proporciona
-        if not attrs.get('username'):
-            email = attrs.get('email', '')
-            attrs['username'] = email.split('@')[0] if email else f"user_{numero_documento}"
+        # Email, username y documento únicos
+        existentes = registros_existentes(
+            email=attrs.get('email'),
+            username=attrs['username'],
+            documento=(tipo_documento, numero_documento, extension_documento) if numero_documento else None
+        )
         
-        # Validar username único
-        username = attrs.get('username')
-        if User.objects.filter(username=username).exists():
-            raise serializers.ValidationError({
-                'username': "Este username ya está en uso"
-            })
+        errores = {}
+        if 'email' in existentes:
+            errores['email'] = "Este email ya está registrado"
+        if 'username' in existentes:
+            errores['username'] = "Este username ya está en uso"
+        if 'documento' in existentes:
+            documento_completo = numero_documento
+            if extension_documento:
+                documento_completo += f"-{extension_documento}"
+            errores['numero_documento'] = (
+                f'Ya existe un {TipoDocumento(tipo_documento).label} con número {documento_completo}'
+            )
+        if errores:
+            raise serializers.ValidationError(errores)
         
         return attrs
 
     @transaction.atomic
     def create(self, validated_data):
-        """Crear socio con usuario y documento de identidad"""
+        """
+        Crear socio con usuario y documento de identidad: un INSERT por
+        modelo en orden de dependencia. La unicidad ya se validó en
+        validate(), así que save() no repite sus consultas (validar=False);
+        si otro request se adelanta, la restricción de la BD lo detecta y
+        se descarta el alta completa.
+        """
         # Extraer datos del documento
         tipo_documento = validated_data.pop('tipo_documento')
         numero_documento = validated_data.pop('numero_documento')
@@ -122,28 +128,36 @@ class SocioCreateSerializer(serializers.ModelSerializer):
             'username': validated_data.pop('username'),
             'first_name': validated_data.pop('first_name'),
             'last_name': validated_data.pop('last_name'),
-            'email': validated_data.pop('email')
+            'email': User.objects.normalize_email(validated_data.pop('email'))
         }
         password = validated_data.pop('password')
         
-        # Crear documento de identidad
-        documento = DocumentoIdentidad.objects.create(
-            tipo_documento=tipo_documento,
-            numero_documento=numero_documento,
-            extension=extension_documento
-        )
-        
-        # Crear usuario
-        user = User.objects.create_user(password=password, **user_data)
-        user.documento_identidad = documento
-        user.save()
-        
-        # Migrar DNI si se proporciona (compatibilidad)
-        if not validated_data.get('dni'):
-            validated_data['dni'] = documento.documento_completo
+        try:
+            # Crear documento de identidad
+            documento = DocumentoIdentidad(
+                tipo_documento=tipo_documento,
+                numero_documento=numero_documento,
+                extension=extension_documento
+            )
+            documento.save(validar=False, savepoint=False)
+            
+            # Crear usuario ya asociado al documento
+            user = User(documento_identidad=documento, **user_data)
+            user.set_password(password)
+            user.save(validar=False, savepoint=False)
+            
+            # Migrar DNI si se proporciona (compatibilidad)
+            if not validated_data.get('dni'):
+                validated_data['dni'] = documento.documento_completo
+            
+            # Crear socio
+            socio = Socio(usuario=user, **validated_data)
+            socio.save(validar=False, savepoint=False)
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(
+                error.message_dict if hasattr(error, 'error_dict') else error.messages
+            )
         
-        # Crear socio
-        socio = Socio.objects.create(usuario=user, **validated_data)
         return socio
 
 
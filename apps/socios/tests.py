@@ -1,11 +1,32 @@
 # tests.py
-from django.test import TestCase, Client
+import json
+import tempfile
+from io import StringIO
+from smtplib import SMTPRecipientsRefused
+
+from django.test import TestCase, Client, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.urls import reverse
+from django.contrib.contenttypes.models import ContentType
+from django.urls import resolve, reverse
+from django.core import mail
 from django.core.exceptions import ValidationError
 from rest_framework import status
 from rest_framework.test import APITestCase
-from .models import Socio, Aporte
+from apps.auditoria.agentes import get_cache_agentes
+from apps.auditoria.authentication import CustomTokenObtainPairSerializer
+from apps.auditoria.models import AuditoriaLog, TipoAccion
+from apps.auditoria.registro import registro
+from apps.usuarios.disponibilidad import get_filtros_disponibilidad
+from core.pruebas import ConsultasMixin
+from apps.usuarios.document_models import DocumentoIdentidad
+from apps.usuarios.models import User as Usuario
+from .importacion import ImportacionSocios
+from .correos import despachar_correos, encolar_correo
+from .models import Socio, Aporte, CorreoPendiente
 from .serializers import SocioSerializer, AporteSerializer
 
 User = get_user_model()
@@ -332,4 +353,363 @@ class AporteAPITest(APITestCase):
         self.assertEqual(response.data['total_monto'], 600.00)
 
 # Comando para ejecutar las pruebas: 
-# python manage.py test apps.socios --verbosity=2
\ No newline at end of file
+# python manage.py test apps.socios --verbosity=2
+
+
+class AltaSocioConsultasTest(ConsultasMixin, APITestCase):
+    """Pruebas del presupuesto de consultas del alta de socios"""
+
+    # Consulta de duplicados + INSERT de documento, usuario, socio y correo de
+    # bienvenida (sin contar savepoints de ATOMIC_REQUESTS ni de create())
+    PRESUPUESTO = 5
+
+    def setUp(self):
+        self.client.force_authenticate(user=Usuario(id=0, email='admin@ejemplo.com'))
+        self.url = reverse('socios:socio-list')
+        self.datos = {
+            'password': 'clave-segura-123',
+            'first_name': 'Juan',
+            'last_name': 'Pérez',
+            'email': 'juan@ejemplo.com',
+            'numero_documento': '1234567',
+            'tipo_socio': 'PRODUCTOR',
+            'direccion': 'Calle Test 123',
+            'telefono': '70000000',
+        }
+        # Filtros de disponibilidad construidos antes de medir
+        get_filtros_disponibilidad().recargar()
+        get_filtros_disponibilidad().email_puede_existir('x@ejemplo.com')
+
+    def test_alta_con_presupuesto_fijo(self):
+        """Test: El alta completa no supera el presupuesto de consultas"""
+        with self.assertNumConsultas(self.PRESUPUESTO):
+            response = self.client.post(self.url, self.datos, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        socio = Socio.objects.select_related('usuario__documento_identidad').get()
+        self.assertEqual(socio.usuario.username, 'juan')
+        self.assertEqual(socio.usuario.documento_identidad.numero_documento, '1234567')
+        self.assertTrue(socio.usuario.check_password('clave-segura-123'))
+
+    def test_bienvenida_en_bandeja_de_salida(self):
+        """Test: El email de bienvenida se encola en la transacción del alta"""
+        self.client.post(self.url, self.datos, format='json')
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(CorreoPendiente.objects.get().destinatarios, ['juan@ejemplo.com'])
+
+    def test_duplicados_en_una_consulta(self):
+        """Test: Email, username y documento duplicados se informan juntos"""
+        self.client.post(self.url, self.datos, format='json')
+
+        with self.assertNumConsultas(1):
+            response = self.client.post(self.url, self.datos, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'email', 'username', 'numero_documento'})
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportacionSociosTest(APITestCase):
+    """Pruebas del alta masiva de socios"""
+
+    def setUp(self):
+        get_filtros_disponibilidad().recargar()
+
+    def fila(self, numero, **extra):
+        datos = {
+            'password': 'clave-segura-123',
+            'first_name': f'Socio{numero}',
+            'last_name': 'Pérez',
+            'email': f'socio{numero}@ejemplo.com',
+            'numero_documento': f'{1000000 + numero}',
+            'tipo_socio': 'PRODUCTOR',
+            'direccion': 'Calle Test 123',
+            'telefono': '70000000',
+        }
+        datos.update(extra)
+        return datos
+
+    def csv(self, filas):
+        campos = list(filas[0])
+        lineas = [','.join(campos)] + [','.join(str(fila[c]) for c in campos) for fila in filas]
+        return '\n'.join(lineas).encode('utf-8')
+
+    def test_consultas_independientes_de_las_filas(self):
+        """Test: La cantidad de consultas no crece con las filas del lote"""
+        # 4 IN de duplicados + SAVEPOINT/RELEASE + 4 bulk_create
+        with self.assertNumQueries(10):
+            reporte = ImportacionSocios(procesos=1).importar([self.fila(n) for n in range(20)])
+
+        self.assertEqual(reporte['creados'], 20)
+        socio = Socio.objects.select_related('usuario__documento_identidad').get(dni='1000003')
+        self.assertEqual(socio.usuario.documento_identidad.numero_documento, '1000003')
+        self.assertTrue(socio.usuario.check_password('clave-segura-123'))
+
+    def test_reporte_por_fila(self):
+        """Test: Los errores se informan por fila y no impiden el resto"""
+        ImportacionSocios(procesos=1).importar([self.fila(1)])
+
+        reporte = ImportacionSocios(procesos=1).importar([
+            self.fila(2),
+            self.fila(3, email='socio1@ejemplo.com'),
+            self.fila(4, numero_documento='1000002'),
+            self.fila(5, telefono='abc'),
+            self.fila(6, numero_documento='12'),
+        ])
+
+        self.assertEqual([f['estado'] for f in reporte['filas']], ['creado', 'error', 'error', 'error', 'error'])
+        self.assertEqual(reporte['filas'][1]['errores']['email'], ['Ya registrado'])
+        self.assertEqual(reporte['filas'][2]['errores']['numero_documento'], ['Duplicado de la fila 1'])
+        self.assertIn('telefono', reporte['filas'][3]['errores'])
+        self.assertIn('numero_documento', reporte['filas'][4]['errores'])
+
+    def test_hasheo_en_procesos(self):
+        """Test: Las contraseñas se hashean en un pool de procesos"""
+        reporte = ImportacionSocios(procesos=2).importar([self.fila(n) for n in range(3)])
+
+        self.assertEqual(reporte['creados'], 3)
+        self.assertTrue(Usuario.objects.get(email='socio2@ejemplo.com').check_password('clave-segura-123'))
+
+    def test_endpoint_csv(self):
+        """Test: El endpoint importa un CSV y responde con el reporte"""
+        self.client.force_authenticate(user=Usuario(id=0, email='admin@ejemplo.com', is_staff=True))
+        archivo = SimpleUploadedFile('socios.csv', self.csv([self.fila(1), self.fila(2)]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('socios:socio-importar'), {'archivo': archivo}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['creados'], 2)
+        self.assertEqual(CorreoPendiente.objects.count(), 2)
+        self.assertTrue(get_filtros_disponibilidad().email_puede_existir('socio1@ejemplo.com'))
+
+    def test_endpoint_fuera_de_atomic_requests(self):
+        """Test: El endpoint no corre dentro de la transacción del request"""
+        vista = resolve(reverse('socios:socio-importar')).func
+
+        self.assertIn('default', getattr(vista, '_non_atomic_requests', set()))
+        self.assertFalse(getattr(resolve(reverse('socios:socio-list')).func, '_non_atomic_requests', set()))
+
+    @override_settings(IMPORTACION_API_MAX_FILAS=2)
+    def test_endpoint_rechaza_archivos_grandes(self):
+        """Test: El endpoint rechaza archivos sobre el límite sin importar nada"""
+        self.client.force_authenticate(user=Usuario(id=0, email='admin@ejemplo.com', is_staff=True))
+        archivo = SimpleUploadedFile('socios.csv', self.csv([self.fila(n) for n in range(3)]))
+
+        response = self.client.post(reverse('socios:socio-importar'), {'archivo': archivo}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertIn('importar_socios', response.data['error'])
+        self.assertFalse(Socio.objects.exists())
+
+        with override_settings(IMPORTACION_API_MAX_BYTES=10):
+            archivo = SimpleUploadedFile('socios.csv', self.csv([self.fila(1)]))
+            response = self.client.post(reverse('socios:socio-importar'), {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    @override_settings(AUDITORIA_WRITER_MODE='sync')
+    def test_logs_create_de_modelos_auditados(self):
+        """Test: Las filas importadas registran su CREATE aunque bulk_create no emita post_save"""
+        registro.registrar(Socio, campos=['dni', 'tipo_socio'])
+        self.addCleanup(registro.desregistrar, Socio)
+
+        reporte = ImportacionSocios(procesos=1).importar([self.fila(n) for n in range(3)])
+
+        logs = AuditoriaLog.objects.filter(
+            accion=TipoAccion.CREATE, content_type=ContentType.objects.get_for_model(Socio)
+        )
+        self.assertCountEqual(
+            [log.object_id for log in logs], [fila['socio_id'] for fila in reporte['filas']]
+        )
+        self.assertEqual(logs[0].datos_nuevos['tipo_socio'], 'PRODUCTOR')
+        self.assertFalse(AuditoriaLog.objects.filter(
+            content_type=ContentType.objects.get_for_model(Usuario)
+        ).exists())
+
+    def test_comando_ndjson(self):
+        """Test: El comando importa un archivo NDJSON"""
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', encoding='utf-8') as archivo:
+            archivo.write('\n'.join(json.dumps(self.fila(n)) for n in range(2)))
+            archivo.flush()
+            salida = StringIO()
+            call_command('importar_socios', archivo.name, '--procesos', '1', stdout=salida)
+
+        self.assertIn('2 socios creados', salida.getvalue())
+        self.assertEqual(Socio.objects.count(), 2)
+
+
+class BackendRechazos(EmailBackend):
+    """Backend locmem que rechaza los destinatarios rechazado@..."""
+
+    conexiones = 0
+
+    def open(self):
+        BackendRechazos.conexiones += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(d.startswith('rechazado@') for d in message.recipients()):
+                raise SMTPRecipientsRefused({d: (550, b'Rechazado') for d in message.recipients()})
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='apps.socios.tests.BackendRechazos',
+    CORREOS_MAX_INTENTOS=2,
+    CORREOS_REINTENTO_BASE=60
+)
+class BandejaSalidaTest(TestCase):
+    """Pruebas del despacho de la bandeja de salida"""
+
+    def setUp(self):
+        BackendRechazos.conexiones = 0
+
+    def encolar(self, destinatario):
+        return encolar_correo('Asunto', 'Mensaje', 'cooperativa@ejemplo.com', [destinatario])
+
+    def test_lote_por_una_conexion(self):
+        """Test: Un lote se envía por una única conexión y queda marcado"""
+        for n in range(3):
+            self.encolar(f'socio{n}@ejemplo.com')
+
+        self.assertEqual(despachar_correos(), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(BackendRechazos.conexiones, 1)
+        self.assertFalse(CorreoPendiente.objects.filter(enviado_en__isnull=True).exists())
+        self.assertEqual(despachar_correos(), (0, 0))
+
+    def test_reintento_con_espera(self):
+        """Test: Un fallo se reprograma con espera y no frena al resto del lote"""
+        correo = self.encolar('rechazado@ejemplo.com')
+        self.encolar('socio@ejemplo.com')
+
+        self.assertEqual(despachar_correos(), (1, 1))
+        correo.refresh_from_db()
+        self.assertEqual(correo.intentos, 1)
+        self.assertIn('SMTPRecipientsRefused', correo.ultimo_error)
+        self.assertGreater(correo.proximo_intento, timezone.now())
+        self.assertEqual(despachar_correos(), (0, 0))
+
+    def test_maximo_de_intentos(self):
+        """Test: Agotados los intentos el correo deja de reintentarse"""
+        correo = self.encolar('rechazado@ejemplo.com')
+        for _ in range(3):
+            CorreoPendiente.objects.filter(pk=correo.pk).update(proximo_intento=timezone.now())
+            despachar_correos()
+
+        correo.refresh_from_db()
+        self.assertEqual(correo.intentos, 2)
+        self.assertIsNone(correo.enviado_en)
+
+
+class ConsultasListadosTest(ConsultasMixin, APITestCase):
+    """Pruebas de consultas constantes en los listados de socios y aportes"""
+
+    def setUp(self):
+        self.client.force_authenticate(user=Usuario(id=0, email='admin@ejemplo.com'))
+
+    def crear_socios(self, cantidad):
+        for n in range(Socio.objects.count(), Socio.objects.count() + cantidad):
+            documento = DocumentoIdentidad.objects.create(numero_documento=f'{2000000 + n}')
+            usuario = Usuario.objects.create_user(
+                email=f'socio{n}@ejemplo.com', username=f'socio{n}', password='clave',
+                first_name='Socio', last_name=str(n), documento_identidad=documento
+            )
+            socio = Socio.objects.create(
+                usuario=usuario, tipo_socio='PRODUCTOR', direccion='Calle 1', telefono='70000000'
+            )
+            Aporte.objects.create(
+                socio=socio, tipo_aporte='ECONOMICO', monto=10, descripcion='Cuota', fecha_aporte='2024-01-01'
+            )
+            Aporte.objects.create(
+                socio=socio, tipo_aporte='TRABAJO', descripcion='Cosecha', fecha_aporte='2024-02-01'
+            )
+        return socio
+
+    def assertConsultasConstantes(self, consultas, url, **params):
+        """La misma cantidad de consultas con 2 y con 6 socios"""
+        self.crear_socios(2)
+        with self.assertNumConsultas(consultas):
+            self.assertEqual(self.client.get(url, params).status_code, status.HTTP_200_OK)
+        self.crear_socios(4)
+        with self.assertNumConsultas(consultas):
+            response = self.client.get(url, params)
+        return response
+
+    def test_listado_socios(self):
+        """Test: El listado de socios no consulta por socio"""
+        response = self.assertConsultasConstantes(1, reverse('socios:socio-list'))
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(response.data[0]['documento_info']['numero_documento'], response.data[0]['documento_numero'])
+
+    def test_busqueda_socios(self):
+        """Test: La búsqueda de socios no consulta por socio"""
+        response = self.assertConsultasConstantes(1, reverse('socios:socio-search'), q='Socio')
+        self.assertEqual(len(response.data), 6)
+
+    def test_listado_aportes(self):
+        """Test: El listado de aportes no consulta por aporte"""
+        response = self.assertConsultasConstantes(1, reverse('socios:aporte-list'))
+        self.assertEqual(len(response.data), 12)
+        self.assertTrue(response.data[0]['socio_nombre'].startswith('Socio'))
+
+    def test_aportes_de_un_socio(self):
+        """Test: Detalle del socio y sus aportes en consultas fijas"""
+        socio = self.crear_socios(1)
+        url = reverse('socios:socio-aportes', args=[socio.pk])
+
+        with self.assertNumConsultas(1):
+            self.client.get(reverse('socios:socio-detail', args=[socio.pk]))
+        with self.assertNumConsultas(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 2)
+
+
+@override_settings(AUDITORIA_WRITER_MODE='sync')
+class DesactivarSocioTest(APITestCase):
+    """Pruebas para la revocación de tokens al desactivar un socio"""
+
+    def setUp(self):
+        self.addCleanup(get_cache_agentes().limpiar)
+        self.admin = User.objects.create_user(
+            username='admin@ejemplo.com', email='admin@ejemplo.com', password='clave-admin', is_staff=True
+        )
+        documento = DocumentoIdentidad.objects.create(numero_documento='3000001')
+        usuario = Usuario.objects.create_user(
+            email='socio@ejemplo.com', username='socio', password='clave',
+            first_name='Socio', last_name='Activo', documento_identidad=documento
+        )
+        self.socio = Socio.objects.create(
+            usuario=usuario, tipo_socio='PRODUCTOR', direccion='Calle 1', telefono='70000000'
+        )
+        # Cuenta de login del socio: su id es el que llevan los tokens
+        self.cuenta = User.objects.create_user(
+            username='socio@ejemplo.com', email='socio@ejemplo.com', password='clave-segura'
+        )
+        self.url = reverse('socios:socio-list')
+
+    def token(self, user):
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        # iat tiene resolución de segundos: el token es de un segundo anterior
+        token['iat'] -= 1
+        return token
+
+    def get_con_token(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return self.client.get(self.url)
+
+    def test_token_del_socio_rechazado(self):
+        """Test: Desactivar un socio revoca los tokens de su cuenta de login"""
+        token_socio, token_admin = self.token(self.cuenta), self.token(self.admin)
+        self.assertEqual(self.get_con_token(token_socio).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('socios:socio-toggle-activo', args=[self.socio.pk]))
+        self.client.force_authenticate(user=None)
+        self.assertFalse(response.data['activo'])
+
+        self.assertEqual(self.get_con_token(token_socio).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get_con_token(token_admin).status_code, status.HTTP_200_OK)
@@ -3,16 +3,35 @@ from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import Q, Count, Sum
+from django.utils.decorators import method_decorator
 from django.utils import timezone
+from apps.auditoria.revocacion import get_revocacion_tokens
+from .importacion import FORMATOS, ImportacionSocios, leer_filas
 from .models import Socio, Aporte
 from .serializers import (
     SocioSerializer, SocioCreateSerializer, 
     SocioUpdateSerializer, AporteSerializer
 )
 
+def cuenta_login(usuario):
+    """
+    Usuario de AUTH_USER_MODEL con el que inicia sesión `usuario`: el login
+    JWT lo busca por su USERNAME_FIELD con el email, y es su id el que
+    llevan los tokens.
+    """
+    UserModel = get_user_model()
+    if isinstance(usuario, UserModel):
+        return usuario
+    return UserModel._default_manager.filter(**{UserModel.USERNAME_FIELD: usuario.email}).first()
+
+
 class SocioViewSet(viewsets.ModelViewSet):
-    queryset = Socio.objects.all()
+    # SocioSerializer lee usuario y su documento: se traen en el mismo JOIN
+    queryset = Socio.objects.select_related('usuario__documento_identidad')
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['tipo_socio', 'activo']
@@ -34,7 +53,7 @@ class SocioViewSet(viewsets.ModelViewSet):
         return SocioSerializer
 
     def get_queryset(self):
-        queryset = Socio.objects.all()
+        queryset = super().get_queryset()
         
         # Filtrar por estado activo/inactivo
         estado = self.request.query_params.get('estado', None)
@@ -49,6 +68,7 @@ class SocioViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def aportes(self, request, pk=None):
         socio = self.get_object()
+        # El related manager asigna este mismo socio (con su usuario) a cada aporte
         aportes = socio.aportes.all()
         serializer = AporteSerializer(aportes, many=True)
         return Response(serializer.data)
@@ -59,6 +79,12 @@ class SocioViewSet(viewsets.ModelViewSet):
         socio.activo = not socio.activo
         socio.save()
         
+        if not socio.activo:
+            # Los tokens emitidos antes de la desactivación dejan de servir
+            cuenta = cuenta_login(socio.usuario)
+            if cuenta is not None:
+                get_revocacion_tokens().revocar_usuario(cuenta, motivo='Socio desactivado')
+        
         return Response({
             'message': f'Socio {"activado" if socio.activo else "desactivado"} correctamente',
             'activo': socio.activo
@@ -84,13 +110,65 @@ class SocioViewSet(viewsets.ModelViewSet):
             'por_tipo_socio': por_tipo
         })
 
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        # Django lee non_atomic_requests de la vista de la URL, no del método
+        # de la acción: se traslada a la vista de cada ruta que lo declare
+        for nombre in (actions or {}).values():
+            no_atomicas = getattr(getattr(cls, nombre), '_non_atomic_requests', set())
+            for alias in no_atomicas:
+                view = transaction.non_atomic_requests(using=alias)(view)
+        return view
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    @method_decorator(transaction.non_atomic_requests)
+    def importar(self, request):
+        """
+        Alta masiva desde un archivo CSV o NDJSON (campo 'archivo').
+
+        Corre fuera de ATOMIC_REQUESTS para que cada lote confirme su propia
+        transacción. Los archivos de más de IMPORTACION_API_MAX_BYTES bytes o
+        IMPORTACION_API_MAX_FILAS filas se rechazan: van por el comando
+        importar_socios, que no ocupa un worker web.
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({'error': 'El archivo es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        max_bytes = getattr(settings, 'IMPORTACION_API_MAX_BYTES', 1024 * 1024)
+        if archivo.size > max_bytes:
+            return Response({
+                'error': f'El archivo supera {max_bytes} bytes. Use el comando importar_socios'
+            }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        
+        formato = request.data.get('formato') or archivo.name.rsplit('.', 1)[-1].lower()
+        if formato not in FORMATOS:
+            return Response({
+                'error': f'Formato no soportado. Use {", ".join(FORMATOS)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            filas = leer_filas(archivo, formato)
+        except (ValueError, UnicodeDecodeError) as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        max_filas = getattr(settings, 'IMPORTACION_API_MAX_FILAS', 1000)
+        if len(filas) > max_filas:
+            return Response({
+                'error': f'El archivo supera {max_filas} filas. Use el comando importar_socios'
+            }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        
+        # Sin pool de procesos dentro del worker web: el límite de filas acota el hasheo
+        return Response(ImportacionSocios(procesos=1).importar(filas))
+
     @action(detail=False, methods=['get'])
     def search(self, request):
         query = request.query_params.get('q', '')
         if not query:
             return Response({'error': 'Parámetro de búsqueda requerido'}, status=400)
         
-        socios = Socio.objects.filter(
+        socios = self.queryset.filter(
             Q(usuario__first_name__icontains=query) |
             Q(usuario__last_name__icontains=query) |
             Q(dni__icontains=query) |
@@ -102,7 +180,8 @@ class SocioViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 class AporteViewSet(viewsets.ModelViewSet):
-    queryset = Aporte.objects.all()
+    # AporteSerializer muestra el socio por su usuario
+    queryset = Aporte.objects.select_related('socio__usuario')
     serializer_class = AporteSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
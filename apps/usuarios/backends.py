@@ -0,0 +1,123 @@
+"""
+Backend de autenticación con permisos cacheados entre requests.
+
+ModelBackend calcula los permisos del usuario y de sus grupos con una
+consulta cada uno, y los guarda solo en la instancia: cada request vuelve
+a consultarlos. PermisosCacheBackend los guarda además en la caché de
+Django por usuario (PERMISOS_CACHE_TTL).
+
+La entrada de cada usuario lleva el modelo en la clave (auth.User y
+usuarios.User pueden compartir pk) y guarda la versión de la caché con la
+que se calculó; la versión se lee junto con la entrada, en una sola
+lectura. Los cambios de grupos o permisos de un usuario invalidan su
+entrada; los cambios en los permisos de un grupo cambian la versión, lo
+que invalida a todos los usuarios (ver signals.py).
+
+Las invalidaciones deben llegar a todos los procesos: con una caché que
+no es compartida (LocMemCache) los permisos no se cachean entre requests
+y el backend se comporta como ModelBackend.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+from core.cache import es_compartida
+
+CLAVE_VERSION = 'permisos:version'
+
+
+def _alias():
+    return getattr(settings, 'PERMISOS_CACHE', 'default')
+
+
+def _cache():
+    return caches[_alias()]
+
+
+def cache_activa():
+    """Los permisos se cachean solo con TTL y en una caché compartida"""
+    return bool(getattr(settings, 'PERMISOS_CACHE_TTL', 3600)) and es_compartida(_alias())
+
+
+def _version_nueva():
+    # Si la clave de versión se pierde (desalojo), la nueva no coincide con
+    # la de ninguna entrada guardada antes
+    return time.time_ns()
+
+
+def clave_permisos(modelo, user_id):
+    """Clave de los permisos del usuario; `modelo` es su label_lower"""
+    return f'permisos:{modelo}:{user_id}'
+
+
+def obtener_permisos(user_obj):
+    """
+    (version, permisos) del usuario con una lectura de la caché; permisos es
+    None si no están o se calcularon con otra versión.
+    """
+    cache = _cache()
+    clave = clave_permisos(user_obj._meta.label_lower, user_obj.pk)
+    valores = cache.get_many([CLAVE_VERSION, clave])
+    version = valores.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, _version_nueva(), None)
+        return cache.get(CLAVE_VERSION), None
+
+    entrada = valores.get(clave)
+    if entrada is not None and entrada[0] == version:
+        return version, entrada[1]
+    return version, None
+
+
+def guardar_permisos(user_obj, version, permisos):
+    _cache().set(
+        clave_permisos(user_obj._meta.label_lower, user_obj.pk),
+        (version, permisos),
+        getattr(settings, 'PERMISOS_CACHE_TTL', 3600)
+    )
+
+
+def invalidar_permisos(modelo, user_id):
+    _cache().delete(clave_permisos(modelo, user_id))
+
+
+def invalidar_todos():
+    """Descarta los permisos de todos los usuarios cambiando la versión"""
+    try:
+        _cache().incr(CLAVE_VERSION)
+    except ValueError:
+        _cache().set(CLAVE_VERSION, _version_nueva(), None)
+
+
+class PermisosCacheBackend(ModelBackend):
+    """ModelBackend que reutiliza los permisos calculados en otros requests"""
+
+    def get_user_permissions(self, user_obj, obj=None):
+        if not cache_activa():
+            return super().get_user_permissions(user_obj, obj)
+        return self._permisos_cacheados(user_obj, obj, 'user')
+
+    def get_group_permissions(self, user_obj, obj=None):
+        if not cache_activa():
+            return super().get_group_permissions(user_obj, obj)
+        return self._permisos_cacheados(user_obj, obj, 'group')
+
+    def _permisos_cacheados(self, user_obj, obj, origen):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+
+        # Mismo atributo que usa ModelBackend para la caché de la instancia
+        atributo = f'_{origen}_perm_cache'
+        if not hasattr(user_obj, atributo):
+            version, permisos = obtener_permisos(user_obj)
+            if permisos is None:
+                permisos = {
+                    'user': self._get_permissions(user_obj, None, 'user'),
+                    'group': self._get_permissions(user_obj, None, 'group'),
+                }
+                guardar_permisos(user_obj, version, permisos)
+            user_obj._user_perm_cache = permisos['user']
+            user_obj._group_perm_cache = permisos['group']
+        return getattr(user_obj, atributo)
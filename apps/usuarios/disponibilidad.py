@@ -0,0 +1,205 @@
+"""
+Consultas de disponibilidad de emails y documentos con filtros de Bloom.
+
+La mayoría de las verificaciones que hace el frontend mientras el usuario
+escribe son de valores que no existen. Cada proceso mantiene un filtro
+de Bloom con los emails normalizados y otro con las claves
+(tipo_documento, numero_documento, extension): si el filtro descarta el
+valor está disponible sin consultar la base de datos; solo las posibles
+coincidencias se confirman con una consulta.
+
+Los filtros se construyen en el primer uso y se actualizan:
+- con las señales post_save de User y DocumentoIdentidad del proceso;
+- cada DISPONIBILIDAD_INTERVALO segundos, leyendo las filas creadas o
+  modificadas por fecha_actualizacion (altas y cambios de email o
+  documento hechos en otros procesos);
+- por completo cada DISPONIBILIDAD_RECONSTRUCCION segundos, o al superar
+  su capacidad (cambios hechos con queryset.update(), que no actualizan
+  fecha_actualizacion).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import CharField, Value
+from django.utils import timezone
+
+from core.bloom import FiltroBloom
+
+from .document_models import DocumentoIdentidad
+from .models import User
+
+
+def normalizar_email(email):
+    return (email or '').strip().lower()
+
+
+def clave_documento(tipo_documento, numero_documento, extension=None):
+    return f'{tipo_documento}|{DocumentoIdentidad.normalizar_numero(numero_documento)}|{extension or ""}'
+
+
+def filtrar_documento(queryset, tipo_documento, numero_documento, extension=None):
+    """Mismo criterio que DocumentoIdentidad.existe_documento"""
+    queryset = queryset.filter(tipo_documento=tipo_documento, numero_documento=numero_documento)
+    if extension:
+        return queryset.filter(extension=extension)
+    return queryset.filter(extension__isnull=True)
+
+
+class FiltroTabla:
+    """Filtro de Bloom sobre una columna (o clave derivada) de un modelo"""
+
+    campo_cambio = 'fecha_actualizacion'
+
+    def __init__(self, queryset, clave, campos, capacidad=100000):
+        self.queryset = queryset
+        self.clave = clave
+        self.campos = campos
+        self.capacidad = capacidad
+        self.filtro = None
+        self.marca = None
+        self.marca_previa = None
+
+    def reconstruir(self):
+        self.marca = self.marca_previa = timezone.now()
+        self.filtro = FiltroBloom.desde(
+            (self.clave(*fila) for fila in self.queryset.values_list(*self.campos)), self.capacidad
+        )
+
+    def actualizar(self):
+        """Agrega las filas creadas o modificadas desde la lectura anterior"""
+        # Se relee desde la marca de la sincronización previa: una fila
+        # guardada antes de una lectura puede confirmarse después de ella
+        desde, self.marca_previa, self.marca = self.marca_previa, self.marca, timezone.now()
+        cambiadas = self.queryset.filter(**{f'{self.campo_cambio}__gte': desde})
+        for fila in cambiadas.values_list(*self.campos):
+            self.filtro.agregar(self.clave(*fila))
+
+    def agregar(self, *valores):
+        if self.filtro is not None:
+            self.filtro.agregar(self.clave(*valores))
+
+    def excedido(self):
+        # Pasada la capacidad prevista crece la tasa de falsos positivos
+        return len(self.filtro) > self.filtro.capacidad
+
+
+class FiltrosDisponibilidad:
+    """Filtros de emails y documentos registrados del proceso"""
+
+    def __init__(self, intervalo=5.0, reconstruccion=3600.0, capacidad=100000):
+        self.intervalo = intervalo
+        self.reconstruccion = reconstruccion
+        self.emails = FiltroTabla(
+            User.objects.all(), normalizar_email, ['email'], capacidad
+        )
+        self.documentos = FiltroTabla(
+            DocumentoIdentidad.objects.all(), clave_documento,
+            ['tipo_documento', 'numero_documento', 'extension'], capacidad
+        )
+        self._lock = threading.Lock()
+        self._proxima_actualizacion = 0.0
+        self._proxima_reconstruccion = 0.0
+
+    def email_puede_existir(self, email):
+        self._sincronizar()
+        return normalizar_email(email) in self.emails.filtro
+
+    def documento_puede_existir(self, tipo_documento, numero_documento, extension=None):
+        self._sincronizar()
+        return clave_documento(tipo_documento, numero_documento, extension) in self.documentos.filtro
+
+    def agregar_email(self, email):
+        with self._lock:
+            self.emails.agregar(email)
+
+    def agregar_documento(self, tipo_documento, numero_documento, extension=None):
+        with self._lock:
+            self.documentos.agregar(tipo_documento, numero_documento, extension)
+
+    def recargar(self):
+        """Fuerza la reconstrucción de los filtros en la próxima consulta"""
+        with self._lock:
+            self._proxima_actualizacion = self._proxima_reconstruccion = 0.0
+
+    def _sincronizar(self):
+        ahora = time.monotonic()
+        if ahora < self._proxima_actualizacion:
+            return
+
+        with self._lock:
+            if ahora < self._proxima_actualizacion:
+                return
+            for tabla in (self.emails, self.documentos):
+                if tabla.filtro is None or ahora >= self._proxima_reconstruccion or tabla.excedido():
+                    tabla.reconstruir()
+                else:
+                    tabla.actualizar()
+            if ahora >= self._proxima_reconstruccion:
+                self._proxima_reconstruccion = ahora + self.reconstruccion
+            self._proxima_actualizacion = ahora + self.intervalo
+
+
+_filtros = None
+_filtros_lock = threading.Lock()
+
+
+def get_filtros_disponibilidad():
+    """Retorna los filtros del proceso, creándolos según la configuración"""
+    global _filtros
+
+    if _filtros is None:
+        with _filtros_lock:
+            if _filtros is None:
+                _filtros = FiltrosDisponibilidad(
+                    intervalo=getattr(settings, 'DISPONIBILIDAD_INTERVALO', 5.0),
+                    reconstruccion=getattr(settings, 'DISPONIBILIDAD_RECONSTRUCCION', 3600.0),
+                    capacidad=getattr(settings, 'DISPONIBILIDAD_CAPACIDAD', 100000),
+                )
+    return _filtros
+
+
+def email_registrado(email):
+    """Indica si el email ya está registrado, consultando solo ante un posible acierto"""
+    if not get_filtros_disponibilidad().email_puede_existir(email):
+        return False
+    return User.objects.filter(email=email).exists()
+
+
+def documento_registrado(tipo_documento, numero_documento, extension=None):
+    """Igual que DocumentoIdentidad.existe_documento, con el filtro delante"""
+    if not get_filtros_disponibilidad().documento_puede_existir(tipo_documento, numero_documento, extension):
+        return False
+    return DocumentoIdentidad.existe_documento(
+        tipo_documento=tipo_documento,
+        numero_documento=numero_documento,
+        extension=extension
+    )
+
+
+def registros_existentes(email=None, username=None, documento=None):
+    """
+    Campos ya registrados ('email', 'username', 'documento') entre los dados,
+    en una sola consulta UNION. `documento` es (tipo, numero, extension); el
+    email y el documento solo se consultan ante un posible acierto del filtro.
+    """
+    filtros = get_filtros_disponibilidad()
+    consultas = []
+
+    if email and filtros.email_puede_existir(email):
+        consultas.append(('email', User.objects.filter(email=email)))
+    if username:
+        consultas.append(('username', User.objects.filter(username=username)))
+    if documento and filtros.documento_puede_existir(*documento):
+        consultas.append((
+            'documento', filtrar_documento(DocumentoIdentidad.objects.filter(activo=True), *documento)
+        ))
+
+    if not consultas:
+        return set()
+
+    consultas = [
+        queryset.annotate(campo=Value(campo, output_field=CharField())).values_list('campo', flat=True)
+        for campo, queryset in consultas
+    ]
+    return set(consultas[0].union(*consultas[1:], all=True))
@@ -3,6 +3,8 @@ from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 import re
 
+from core.validacion import ValidacionPorRestriccionesMixin
+
 
 class TipoDocumento(models.TextChoices):
     """Tipos de documentos de identidad"""
@@ -12,7 +14,7 @@ class TipoDocumento(models.TextChoices):
     CARNET_EXTRANJERO = 'CARNET_EXTRANJERO', 'Carnet de Extranjero'
 
 
-class DocumentoIdentidad(models.Model):
+class DocumentoIdentidad(ValidacionPorRestriccionesMixin, models.Model):
     """Modelo para gestionar documentos de identidad únicos"""
     
     tipo_documento = models.CharField(
@@ -36,7 +38,7 @@ class DocumentoIdentidad(models.Model):
     
     # Campos de auditoría
     fecha_registro = models.DateTimeField(auto_now_add=True)
-    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_index=True)
     activo = models.BooleanField(default=True)
     
     class Meta:
@@ -75,8 +77,9 @@ class DocumentoIdentidad(models.Model):
         # Validar formato según tipo de documento
         self._validar_formato_documento()
         
-        # Validar unicidad
-        self._validar_unicidad()
+        # Validar unicidad (en el modo por restricciones la valida la BD)
+        if self.validacion_completa:
+            self.validar_unicidad()
     
     def _validar_formato_documento(self):
         """Valida el formato según el tipo de documento"""
@@ -111,7 +114,7 @@ class DocumentoIdentidad(models.Model):
                     'numero_documento': 'El pasaporte debe contener entre 6 y 15 caracteres alfanuméricos'
                 })
     
-    def _validar_unicidad(self):
+    def validar_unicidad(self):
         """Valida que no exista otro documento igual activo"""
         queryset = DocumentoIdentidad.objects.filter(
             tipo_documento=self.tipo_documento,
@@ -137,9 +140,13 @@ class DocumentoIdentidad(models.Model):
                                   f'con número {documento_completo}'
             })
     
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+    def errores_integridad(self):
+        return [
+            (('unique_documento_completo', 'unique_documento_sin_extension',
+              'documentos_identidad.numero_documento'),
+             {'numero_documento': f'Ya existe un {self.get_tipo_documento_display()} '
+                                  f'con número {self.documento_completo}'}),
+        ]
     
     @property
     def documento_completo(self):
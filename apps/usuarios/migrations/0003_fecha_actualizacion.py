@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-16 23:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_documentoidentidad_user_documento_identidad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='documentoidentidad',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
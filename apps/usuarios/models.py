@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 from django.core.exceptions import ValidationError
+from core.validacion import ValidacionPorRestriccionesMixin
 from .document_models import DocumentoIdentidad, TipoDocumento
 
 class CustomUserManager(BaseUserManager):
@@ -18,10 +19,12 @@ class CustomUserManager(BaseUserManager):
         extra_fields.setdefault('is_superuser', True)
         return self.create_user(email, password, **extra_fields)
 
-class User(AbstractUser):
+class User(ValidacionPorRestriccionesMixin, AbstractUser):
     email = models.EmailField(unique=True)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(auto_now_add=True)
+    # Marca de cambios para la sincronización de los filtros de disponibilidad
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_index=True)
     
     # Relación con documento de identidad
     documento_identidad = models.OneToOneField(
@@ -59,6 +62,10 @@ class User(AbstractUser):
         """Validaciones personalizadas"""
         super().clean()
         
+        if self.validacion_completa:
+            self.validar_unicidad()
+    
+    def validar_unicidad(self):
         # Validar que el email no esté duplicado (además de la restricción de BD)
         if self.email:
             queryset = User.objects.filter(email=self.email)
@@ -67,9 +74,15 @@ class User(AbstractUser):
             if queryset.exists():
                 raise ValidationError({'email': 'Ya existe un usuario con este email'})
     
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+    def errores_integridad(self):
+        return [
+            (('usuarios_user_email', 'usuarios_user.email'),
+             {'email': 'Ya existe un usuario con este email'}),
+            (('usuarios_user_username', 'usuarios_user.username'),
+             {'username': 'Ya existe un usuario con este nombre de usuario'}),
+            (('usuarios_user_documento_identidad', 'usuarios_user.documento_identidad_id'),
+             {'documento_identidad': 'El documento ya está asociado a otro usuario'}),
+        ]
     
     @property
     def documento_numero(self):
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import invalidar_permisos, invalidar_todos
+from .disponibilidad import get_filtros_disponibilidad
+from .models import User as Usuario
+
+# Los permisos se cachean por modelo: el de login (AUTH_USER_MODEL) y
+# usuarios.User, con sus propias relaciones groups/user_permissions
+# (related_name='custom_user_set'). Si son el mismo, Django conecta una vez.
+User = get_user_model()
+
+ACCIONES_M2M = {'post_add', 'post_remove', 'post_clear'}
+
+
+def _al_confirmar(funcion, *args):
+    transaction.on_commit(lambda: funcion(*args))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Usuario.groups.through)
+@receiver(m2m_changed, sender=Usuario.user_permissions.through)
+def invalidar_permisos_usuario(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Grupos o permisos directos de usuarios modificados"""
+    if action not in ACCIONES_M2M:
+        return
+
+    if not reverse:
+        _al_confirmar(invalidar_permisos, instance._meta.label_lower, instance.pk)
+    elif pk_set:
+        # Desde el grupo o el permiso: pk_set son los usuarios (de `model`) afectados
+        for user_id in pk_set:
+            _al_confirmar(invalidar_permisos, model._meta.label_lower, user_id)
+    else:
+        # clear() desde el grupo o el permiso no informa los usuarios
+        _al_confirmar(invalidar_todos)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidar_permisos_grupo(sender, action, **kwargs):
+    """Permisos de un grupo modificados: afecta a todos sus usuarios"""
+    if action in ACCIONES_M2M:
+        _al_confirmar(invalidar_todos)
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidar_permisos_eliminados(sender, **kwargs):
+    _al_confirmar(invalidar_todos)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Usuario)
+def invalidar_permisos_guardado(sender, instance, **kwargs):
+    """is_superuser o is_active pueden haber cambiado"""
+    _al_confirmar(invalidar_permisos, instance._meta.label_lower, instance.pk)
+
+
+@receiver(post_save, sender='usuarios.User')
+def registrar_email_disponibilidad(sender, instance, **kwargs):
+    """El email deja de figurar como disponible de inmediato en este proceso"""
+    get_filtros_disponibilidad().agregar_email(instance.email)
+
+
+@receiver(post_save, sender='usuarios.DocumentoIdentidad')
+def registrar_documento_disponibilidad(sender, instance, **kwargs):
+    get_filtros_disponibilidad().agregar_documento(
+        instance.tipo_documento, instance.numero_documento, instance.extension
+    )
@@ -1,3 +1,430 @@
-from django.test import TestCase
+from unittest import mock
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.pruebas import CacheCompartidaMixin, ConsultasMixin, cache_de_otro_proceso
+from core.throttling import AlmacenCache, AlmacenLocal, get_almacen
+from .backends import clave_permisos, guardar_permisos, obtener_permisos
+from .disponibilidad import FiltrosDisponibilidad, get_filtros_disponibilidad
+from .document_models import DocumentoIdentidad, TipoDocumento
+from .models import User as Usuario
+
+User = get_user_model()
+
+
+@override_settings(
+    AUDITORIA_WRITER_MODE='sync',
+    AUTHENTICATION_BACKENDS=['apps.usuarios.backends.PermisosCacheBackend']
+)
+class PermisosCacheTest(CacheCompartidaMixin, TestCase):
+    """Pruebas para la caché de permisos entre requests"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='ana@ejemplo.com', email='ana@ejemplo.com', password='clave-segura'
+        )
+        self.grupo = Group.objects.create(name='Administradores')
+        self.ver_grupo = Permission.objects.get(codename='view_group')
+        self.cambiar_grupo = Permission.objects.get(codename='change_group')
+
+    def usuario_nuevo(self):
+        """Instancia nueva, como la de un request distinto"""
+        return User.objects.get(pk=self.user.pk)
+
+    def test_permisos_sin_consultas_en_otro_request(self):
+        """Test: Una instancia nueva del usuario no vuelve a consultar permisos"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.add(self.ver_grupo)
+        self.assertTrue(self.usuario_nuevo().has_perm('auth.view_group'))
+
+        usuario = self.usuario_nuevo()
+        with self.assertNumQueries(0):
+            self.assertTrue(usuario.has_perm('auth.view_group'))
+            self.assertFalse(usuario.has_perm('auth.change_group'))
+
+    def test_invalidacion_al_agregar_grupo(self):
+        """Test: Agregar al usuario a un grupo invalida sus permisos"""
+        self.grupo.permissions.add(self.cambiar_grupo)
+        self.assertFalse(self.usuario_nuevo().has_perm('auth.change_group'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(self.grupo)
+
+        self.assertTrue(self.usuario_nuevo().has_perm('auth.change_group'))
+
+    def test_invalidacion_al_editar_permisos_del_grupo(self):
+        """Test: Editar los permisos de un grupo invalida a sus usuarios"""
+        self.user.groups.add(self.grupo)
+        self.assertFalse(self.usuario_nuevo().has_perm('auth.change_group'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grupo.permissions.add(self.cambiar_grupo)
+
+        self.assertTrue(self.usuario_nuevo().has_perm('auth.change_group'))
+
+    def test_revocacion_visible_en_otro_proceso(self):
+        """Test: Quitar un permiso lo descarta de la caché que ven los demás procesos"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.add(self.ver_grupo)
+        self.assertTrue(self.usuario_nuevo().has_perm('auth.view_group'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.remove(self.ver_grupo)
+
+        otra = cache_de_otro_proceso()
+        self.assertIsNone(otra.get(clave_permisos('auth.user', self.user.pk)))
+        self.assertFalse(self.usuario_nuevo().has_perm('auth.view_group'))
+
+    def test_version_en_la_misma_lectura(self):
+        """Test: La versión de la caché se lee junto con los permisos, en una sola lectura"""
+        self.usuario_nuevo().has_perm('auth.view_group')
+        cache = caches['default']
+        with mock.patch.object(cache, 'get', wraps=cache.get) as get, \
+                mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            self.assertFalse(self.usuario_nuevo().has_perm('auth.view_group'))
+
+        # get_many de FileBasedCache llama get por clave: no hay otras lecturas
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual([c.args[0] for c in get.call_args_list], list(get_many.call_args.args[0]))
+
+    def test_claves_por_modelo(self):
+        """Test: auth.User y usuarios.User con el mismo pk no comparten permisos"""
+        usuario = Usuario.objects.create_user(email='ana@ejemplo.com', username='ana', password='clave')
+        self.user.pk = usuario.pk
+        version, _ = obtener_permisos(self.user)
+        guardar_permisos(self.user, version, {'user': {'auth.view_group'}, 'group': set()})
+
+        self.assertIsNone(obtener_permisos(usuario)[1])
+
+    def test_invalidacion_de_usuarios_user(self):
+        """Test: Los cambios en custom_user_set de usuarios.User invalidan su entrada"""
+        usuario = Usuario.objects.create_user(email='ana@ejemplo.com', username='ana', password='clave')
+        version, _ = obtener_permisos(usuario)
+        guardar_permisos(usuario, version, {'user': set(), 'group': set()})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.user_permissions.add(self.ver_grupo)
+        self.assertIsNone(obtener_permisos(usuario)[1])
+
+        guardar_permisos(usuario, version, {'user': set(), 'group': set()})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grupo.custom_user_set.add(usuario)
+        self.assertIsNone(obtener_permisos(usuario)[1])
+
+
+@override_settings(
+    AUDITORIA_WRITER_MODE='sync',
+    AUTHENTICATION_BACKENDS=['apps.usuarios.backends.PermisosCacheBackend']
+)
+class PermisosSinCacheCompartidaTest(TestCase):
+    """Pruebas para los permisos con una caché de cada proceso (LocMemCache)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='luis@ejemplo.com', email='luis@ejemplo.com', password='clave-segura'
+        )
+        self.ver_grupo = Permission.objects.get(codename='view_group')
+
+    def test_revocacion_sin_invalidacion_local(self):
+        """Test: Sin caché compartida un permiso quitado en otro proceso no queda vigente"""
+        self.user.user_permissions.add(self.ver_grupo)
+        self.assertTrue(User.objects.get(pk=self.user.pk).has_perm('auth.view_group'))
+
+        # Sin ejecutar las invalidaciones, como si el cambio viniera de otro worker
+        with self.captureOnCommitCallbacks(execute=False):
+            self.user.user_permissions.remove(self.ver_grupo)
+
+        self.assertFalse(User.objects.get(pk=self.user.pk).has_perm('auth.view_group'))
+        self.assertIsNone(cache.get(clave_permisos('auth.user', self.user.pk)))
+
+
+class CuboTokensTest(TestCase):
+    """Pruebas para el motor de throttling por cubo de tokens"""
+
+    def setUp(self):
+        cache.clear()
+
+    def verificar_almacen(self, almacen):
+        # Ráfaga de 3 y recarga de 1 token por segundo
+        esperas = [almacen.consumir('k', 3, 1.0, ahora=100.0) for _ in range(4)]
+        self.assertEqual(esperas[:3], [0, 0, 0])
+        self.assertAlmostEqual(esperas[3], 1.0)
+
+        self.assertEqual(almacen.consumir('k', 3, 1.0, ahora=101.0), 0)
+        self.assertGreater(almacen.consumir('k', 3, 1.0, ahora=101.0), 0)
+
+        # Tras mucho tiempo inactivo el cubo no supera su capacidad
+        esperas = [almacen.consumir('k', 3, 1.0, ahora=1000.0) for _ in range(4)]
+        self.assertEqual(esperas[:3], [0, 0, 0])
+        self.assertGreater(esperas[3], 0)
+
+    def test_almacen_local(self):
+        """Test: El cubo en memoria respeta la ráfaga y la recarga"""
+        self.verificar_almacen(AlmacenLocal())
+
+    def test_almacen_cache(self):
+        """Test: El cubo en caché compartida respeta la ráfaga y la recarga"""
+        self.verificar_almacen(AlmacenCache())
+
+    def test_cubo_cache_no_se_recarga_por_ttl(self):
+        """Test: Con requests continuos el cubo en caché concede lo mismo que el local"""
+        reloj = [0.0]
+        with mock.patch('time.time', lambda: reloj[0]):
+            concedidos = {}
+            for almacen in (AlmacenLocal(), AlmacenCache()):
+                concedidos[type(almacen)] = 0
+                for segundo in range(600):
+                    reloj[0] = 1000.0 + segundo
+                    if almacen.consumir('k', 5, 5 / 60, ahora=reloj[0]) == 0:
+                        concedidos[type(almacen)] += 1
+
+        self.assertEqual(concedidos[AlmacenCache], concedidos[AlmacenLocal])
+
+    def test_claves_independientes(self):
+        """Test: Cada clave tiene su propio cubo"""
+        almacen = AlmacenLocal()
+        almacen.consumir('a', 1, 1.0, ahora=0.0)
+        self.assertGreater(almacen.consumir('a', 1, 1.0, ahora=0.0), 0)
+        self.assertEqual(almacen.consumir('b', 1, 1.0, ahora=0.0), 0)
+
+
+@override_settings(THROTTLE_CUBOS={'validaciones': {'capacidad': 2, 'recarga': '10/min', 'clave': 'ip'}})
+class ThrottleValidacionesTest(ConsultasMixin, APITestCase):
+    """Pruebas para el throttling de los endpoints de validación"""
+
+    def setUp(self):
+        get_almacen().limpiar()
+
+    def test_x_forwarded_for_no_cambia_la_clave(self):
+        """Test: Variar X-Forwarded-For no da un cubo nuevo"""
+        url = reverse('usuarios:validaciones-verificar-email')
+        codigos = [
+            self.client.post(
+                url, {'email': 'x@ejemplo.com'}, format='json', HTTP_X_FORWARDED_FOR=f'10.0.0.{n}'
+            ).status_code
+            for n in range(3)
+        ]
+        self.assertEqual(codigos[2], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_verificar_email_limitado(self):
+        """Test: Superada la ráfaga se responde 429 sin consultar la base"""
+        url = reverse('usuarios:validaciones-verificar-email')
+        for _ in range(2):
+            response = self.client.post(url, {'email': 'x@ejemplo.com'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumConsultas(0):
+            response = self.client.post(url, {'email': 'x@ejemplo.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '6')
+
+
+@override_settings(THROTTLE_CUBOS={})
+class FiltrosDisponibilidadTest(ConsultasMixin, APITestCase):
+    """Pruebas para los filtros de Bloom de emails y documentos"""
+
+    def setUp(self):
+        Usuario.objects.create_user(
+            email='ana@ejemplo.com', username='ana', password='clave-segura'
+        )
+        DocumentoIdentidad.objects.create(tipo_documento=TipoDocumento.CI, numero_documento='1234567')
+        self.filtros = FiltrosDisponibilidad(intervalo=3600)
+
+    def test_disponible_sin_consultas(self):
+        """Test: Un email o documento inexistente se descarta en memoria"""
+        self.assertTrue(self.filtros.email_puede_existir('ana@ejemplo.com'))
+
+        with self.assertNumQueries(0):
+            self.assertFalse(self.filtros.email_puede_existir('luis@ejemplo.com'))
+            self.assertFalse(self.filtros.documento_puede_existir(TipoDocumento.CI, '7654321'))
+        self.assertTrue(self.filtros.documento_puede_existir(TipoDocumento.CI, '1234567'))
+        self.assertTrue(self.filtros.email_puede_existir(' ANA@ejemplo.com '))
+
+    def test_altas_por_senal(self):
+        """Test: Un alta del proceso se agrega al filtro sin reconstruirlo"""
+        get_filtros_disponibilidad().recargar()
+        get_filtros_disponibilidad().email_puede_existir('x@ejemplo.com')
+
+        Usuario.objects.create_user(email='luis@ejemplo.com', username='luis', password='clave')
+        with self.assertNumQueries(0):
+            self.assertTrue(get_filtros_disponibilidad().email_puede_existir('luis@ejemplo.com'))
+
+    def test_altas_de_otros_procesos(self):
+        """Test: Las altas sin señal se leen en la actualización por fecha_actualizacion"""
+        self.filtros.email_puede_existir('x@ejemplo.com')
+        Usuario.objects.bulk_create([Usuario(email='eva@ejemplo.com', username='eva')])
+
+        self.filtros._proxima_actualizacion = 0.0
+        self.assertTrue(self.filtros.email_puede_existir('eva@ejemplo.com'))
+
+    def test_cambios_de_otros_procesos(self):
+        """Test: Un cambio de email o documento de otro proceso se lee sin esperar la reconstrucción"""
+        self.filtros.email_puede_existir('x@ejemplo.com')
+
+        # Las señales actualizan los filtros del proceso, no esta instancia
+        usuario = Usuario.objects.get(email='ana@ejemplo.com')
+        usuario.email = 'ana.maria@ejemplo.com'
+        usuario.save()
+        documento = DocumentoIdentidad.objects.get()
+        documento.numero_documento = '7654321'
+        documento.save()
+
+        self.filtros._proxima_actualizacion = 0.0
+        self.assertTrue(self.filtros.email_puede_existir('ana.maria@ejemplo.com'))
+        self.assertTrue(self.filtros.documento_puede_existir(TipoDocumento.CI, '7654321'))
+
+    def test_endpoints_de_verificacion(self):
+        """Test: Los endpoints responden con el filtro delante de la base"""
+        get_filtros_disponibilidad().recargar()
+        url = reverse('usuarios:validaciones-verificar-email')
+
+        self.assertTrue(self.client.post(url, {'email': 'ana@ejemplo.com'}, format='json').data['existe'])
+        with self.assertNumConsultas(0):
+            response = self.client.post(url, {'email': 'nadie@ejemplo.com'}, format='json')
+        self.assertTrue(response.data['disponible'])
+
+
+@override_settings(THROTTLE_CUBOS={})
+class ConsultasValidacionTest(ConsultasMixin, APITestCase):
+    """Pruebas de cantidad de consultas de los endpoints de validación"""
+
+    def setUp(self):
+        from apps.socios.models import Socio
+
+        self.documento = DocumentoIdentidad.objects.create(
+            tipo_documento=TipoDocumento.CI, numero_documento='1234567'
+        )
+        self.usuario = Usuario.objects.create_user(
+            email='ana@ejemplo.com', username='ana', password='clave-segura',
+            first_name='Ana', last_name='Pérez', documento_identidad=self.documento
+        )
+        self.socio = Socio.objects.create(
+            usuario=self.usuario, tipo_socio='PRODUCTOR',
+            direccion='Calle 1', telefono='70000000'
+        )
+        # Filtros construidos antes de medir
+        get_filtros_disponibilidad().recargar()
+        get_filtros_disponibilidad().email_puede_existir('x@ejemplo.com')
+
+    def test_verificar_documento_una_consulta(self):
+        """Test: Documento, usuario y socio salen de un único JOIN"""
+        url = reverse('usuarios:validaciones-verificar-documento')
+
+        with self.assertNumConsultas(1):
+            response = self.client.post(url, {'numero_documento': '1234567'}, format='json')
+        self.assertTrue(response.data['existe'])
+        self.assertEqual(response.data['usuario_asociado']['id'], self.usuario.id)
+        self.assertEqual(response.data['socio_asociado']['id'], self.socio.id)
+
+    def test_buscar_por_criterio_sin_n_mas_uno(self):
+        """Test: El socio de cada usuario viene en la misma consulta"""
+        Usuario.objects.create_user(email='ana.maria@ejemplo.com', username='ana2', password='clave')
+        url = reverse('usuarios:validaciones-buscar-por-criterio')
+
+        with self.assertNumConsultas(1):
+            response = self.client.get(url, {'email': 'ana'})
+        self.assertEqual(response.data['total_encontrados'], 2)
+        self.assertEqual(sum(r['es_socio'] for r in response.data['resultados']), 1)
+
+    def test_verificar_lote(self):
+        """Test: Un lote se responde con una consulta IN por tipo"""
+        url = reverse('usuarios:validaciones-verificar-lote')
+        datos = {
+            'emails': ['ANA@ejemplo.com', 'nadie@ejemplo.com'],
+            'documentos': [
+                {'numero_documento': '123-4567'},
+                {'numero_documento': '1234567', 'extension': '1A'},
+                {'numero_documento': '7654321'},
+            ]
+        }
+
+        with self.assertNumConsultas(2):
+            response = self.client.post(url, datos, format='json')
+        self.assertEqual([e['existe'] for e in response.data['emails']], [True, False])
+        self.assertEqual([d['existe'] for d in response.data['documentos']], [True, False, False])
+        self.assertEqual(response.data['documentos'][0]['socio_asociado']['id'], self.socio.id)
+
+    def test_verificar_lote_excedido(self):
+        """Test: Un lote mayor al máximo se rechaza"""
+        url = reverse('usuarios:validaciones-verificar-lote')
+        response = self.client.post(url, {'emails': ['a@ejemplo.com'] * 101}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ValidacionPorRestriccionesTest(TestCase):
+    """Pruebas del guardado validado por restricciones de la BD"""
+
+    def setUp(self):
+        self.documento = DocumentoIdentidad.objects.create(
+            tipo_documento=TipoDocumento.CI, numero_documento='1234567'
+        )
+        Usuario.objects.create_user(email='ana@ejemplo.com', username='ana', password='clave')
+
+    def consultas_select(self, contexto):
+        return [q['sql'] for q in contexto.captured_queries if q['sql'].upper().startswith('SELECT')]
+
+    @override_settings(MODELOS_VALIDACION='restricciones')
+    def test_email_duplicado_sin_consulta_previa(self):
+        """Test: El email duplicado lo detecta la restricción, con el mismo mensaje"""
+        with CaptureQueriesContext(connection) as contexto:
+            with self.assertRaises(ValidationError) as error:
+                Usuario(email='ana@ejemplo.com', username='otra', password='x').save()
+
+        self.assertEqual(error.exception.message_dict, {'email': ['Ya existe un usuario con este email']})
+        self.assertEqual(self.consultas_select(contexto), [])
+        # La transacción externa sigue utilizable tras el savepoint
+        self.assertEqual(Usuario.objects.count(), 1)
+
+    @override_settings(MODELOS_VALIDACION='restricciones')
+    def test_documento_duplicado(self):
+        """Test: Las restricciones parciales de documento se traducen al mensaje de clean()"""
+        with self.assertRaises(ValidationError) as error:
+            DocumentoIdentidad.objects.create(tipo_documento=TipoDocumento.CI, numero_documento='1234567')
+
+        self.assertEqual(error.exception.message_dict['numero_documento'], ['Ya existe un Cédula de Identidad con número 1234567'])
+
+    @override_settings(MODELOS_VALIDACION='restricciones')
+    def test_validacion_explicita(self):
+        """Test: save(validar=True) mantiene las consultas de unicidad"""
+        with CaptureQueriesContext(connection) as contexto:
+            with self.assertRaises(ValidationError):
+                Usuario(email='ana@ejemplo.com', username='otra', password='x').save(validar=True)
+
+        self.assertTrue(self.consultas_select(contexto))
+
+    def test_solo_restricciones_unicas(self):
+        """Test: Una FK violada no se traduce como duplicado aunque su nombre empiece igual"""
+        def error_postgres(codigo, restriccion):
+            causa = Exception()
+            causa.sqlstate, causa.diag = codigo, SimpleNamespace(constraint_name=restriccion)
+            error = IntegrityError()
+            error.__cause__ = causa
+            return error
+
+        usuario = Usuario(email='luis@ejemplo.com', username='luis')
+        self.assertIsNone(usuario.traducir_integridad(error_postgres(
+            '23503', 'usuarios_user_documento_identidad_id_6f4f2b1e_fk_documentos_identidad_id'
+        )))
+        traducido = usuario.traducir_integridad(error_postgres('23505', 'usuarios_user_documento_identidad_id_key'))
+        self.assertEqual(traducido.message_dict, {'documento_identidad': ['El documento ya está asociado a otro usuario']})
+        self.assertIsNone(usuario.traducir_integridad(IntegrityError('FOREIGN KEY constraint failed')))
+
+    @override_settings(MODELOS_VALIDACION='completa')
+    def test_modo_completo(self):
+        """Test: En el modo completo save() llama full_clean() como antes"""
+        with self.assertRaises(ValidationError) as error:
+            DocumentoIdentidad(tipo_documento=TipoDocumento.CI, numero_documento='1234567').save()
+
+        self.assertIn('numero_documento', error.exception.message_dict)
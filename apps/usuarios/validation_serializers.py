@@ -3,6 +3,7 @@ from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
 from apps.usuarios.models import User
 from apps.usuarios.document_models import DocumentoIdentidad, TipoDocumento
+from apps.usuarios.disponibilidad import documento_registrado, email_registrado
 
 
 class DocumentoIdentidadSerializer(serializers.ModelSerializer):
@@ -197,7 +198,7 @@ class ValidacionDuplicadosSerializer(serializers.Serializer):
         # Validar email
         email = attrs.get('email')
         if email:
-            if User.objects.filter(email=email).exists():
+            if email_registrado(email):
                 errores['email'] = 'Este email ya está registrado'
             else:
                 info['email'] = 'Email disponible'
@@ -210,11 +211,7 @@ class ValidacionDuplicadosSerializer(serializers.Serializer):
         if tipo_documento and numero_documento:
             numero_normalizado = DocumentoIdentidad.normalizar_numero(numero_documento)
             
-            if DocumentoIdentidad.existe_documento(
-                tipo_documento=tipo_documento,
-                numero_documento=numero_normalizado,
-                extension=extension_documento
-            ):
+            if documento_registrado(tipo_documento, numero_normalizado, extension_documento):
                 documento_completo = numero_normalizado
                 if extension_documento:
                     documento_completo += f"-{extension_documento}"
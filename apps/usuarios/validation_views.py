@@ -2,8 +2,16 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q
+from core.throttling import CuboTokensThrottle
 from apps.usuarios.models import User
 from apps.usuarios.document_models import DocumentoIdentidad, TipoDocumento
+from apps.usuarios.disponibilidad import (
+    clave_documento,
+    email_registrado,
+    filtrar_documento,
+    get_filtros_disponibilidad,
+    normalizar_email
+)
 from apps.usuarios.validation_serializers import (
     DocumentoIdentidadSerializer, 
     UserExtendedSerializer,
@@ -17,6 +25,7 @@ class DocumentoIdentidadViewSet(viewsets.ModelViewSet):
     queryset = DocumentoIdentidad.objects.filter(activo=True)
     serializer_class = DocumentoIdentidadSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'validaciones'
     
     def get_permissions(self):
         """Permisos específicos por acción"""
@@ -27,6 +36,12 @@ class DocumentoIdentidadViewSet(viewsets.ModelViewSet):
         
         return [permission() for permission in permission_classes]
     
+    def get_throttles(self):
+        """Solo la validación pública se limita"""
+        if self.action == 'validar_duplicado':
+            return [CuboTokensThrottle()]
+        return super().get_throttles()
+    
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
     def validar_duplicado(self, request):
         """Endpoint para validar si un documento ya existe"""
@@ -90,10 +105,54 @@ class DocumentoIdentidadViewSet(viewsets.ModelViewSet):
         })
 
 
+def documentos_con_titular():
+    """Documentos activos con su usuario y socio en el mismo JOIN"""
+    return DocumentoIdentidad.objects.filter(activo=True).select_related('usuario__socio_perfil')
+
+
+def respuesta_documento(tipo_documento, numero_documento, extension, documento):
+    """Respuesta de verificación de un documento; `documento` es None si está disponible"""
+    existe = documento is not None
+    documento_completo = numero_documento
+    if extension:
+        documento_completo += f"-{extension}"
+    
+    respuesta = {
+        'tipo_documento': tipo_documento,
+        'numero_documento': numero_documento,
+        'extension': extension,
+        'documento_completo': documento_completo,
+        'existe': existe,
+        'disponible': not existe,
+        'mensaje': 'Documento ya registrado' if existe else 'Documento disponible'
+    }
+    
+    # Usuario y socio asociados, ya cargados por documentos_con_titular()
+    usuario = getattr(documento, 'usuario', None)
+    if usuario:
+        respuesta['usuario_asociado'] = {
+            'id': usuario.id,
+            'email': usuario.email,
+            'nombre': usuario.get_full_name()
+        }
+        socio = getattr(usuario, 'socio_perfil', None)
+        if socio:
+            respuesta['socio_asociado'] = {
+                'id': socio.id,
+                'tipo_socio': socio.get_tipo_socio_display(),
+                'activo': socio.activo
+            }
+    
+    return respuesta
+
+
 class ValidacionDuplicadosViewSet(viewsets.ViewSet):
     """ViewSet específico para validaciones de duplicados"""
     
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [CuboTokensThrottle]
+    throttle_scope = 'validaciones'
+    max_lote = 100
     
     @action(detail=False, methods=['post'])
     def verificar_email(self, request):
@@ -105,7 +164,7 @@ class ValidacionDuplicadosViewSet(viewsets.ViewSet):
                 'error': 'Email es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        existe = User.objects.filter(email=email).exists()
+        existe = email_registrado(email)
         
         return Response({
             'email': email,
@@ -129,56 +188,14 @@ class ValidacionDuplicadosViewSet(viewsets.ViewSet):
         # Normalizar número
         numero_normalizado = DocumentoIdentidad.normalizar_numero(numero_documento)
         
-        # Verificar existencia
-        existe = DocumentoIdentidad.existe_documento(
-            tipo_documento=tipo_documento,
-            numero_documento=numero_normalizado,
-            extension=extension
-        )
-        
-        documento_completo = numero_normalizado
-        if extension:
-            documento_completo += f"-{extension}"
-        
-        response_data = {
-            'tipo_documento': tipo_documento,
-            'numero_documento': numero_normalizado,
-            'extension': extension,
-            'documento_completo': documento_completo,
-            'existe': existe,
-            'disponible': not existe,
-            'mensaje': f'Documento ya registrado' if existe else 'Documento disponible'
-        }
+        # Una sola consulta con usuario y socio, solo ante un posible acierto
+        documento = None
+        if get_filtros_disponibilidad().documento_puede_existir(tipo_documento, numero_normalizado, extension):
+            documento = filtrar_documento(
+                documentos_con_titular(), tipo_documento, numero_normalizado, extension
+            ).first()
         
-        # Si existe, buscar información adicional
-        if existe:
-            try:
-                documento = DocumentoIdentidad.objects.get(
-                    tipo_documento=tipo_documento,
-                    numero_documento=numero_normalizado,
-                    extension=extension,
-                    activo=True
-                )
-                
-                # Buscar usuario asociado
-                if hasattr(documento, 'usuario') and documento.usuario:
-                    response_data['usuario_asociado'] = {
-                        'id': documento.usuario.id,
-                        'email': documento.usuario.email,
-                        'nombre': documento.usuario.get_full_name()
-                    }
-                
-                # Buscar socio asociado
-                if hasattr(documento, 'usuario') and documento.usuario and hasattr(documento.usuario, 'socio_perfil'):
-                    socio = documento.usuario.socio_perfil
-                    response_data['socio_asociado'] = {
-                        'id': socio.id,
-                        'tipo_socio': socio.get_tipo_socio_display(),
-                        'activo': socio.activo
-                    }
-                
-            except DocumentoIdentidad.DoesNotExist:
-                pass
+        response_data = respuesta_documento(tipo_documento, numero_normalizado, extension, documento)
         
         return Response(response_data)
     
@@ -201,6 +218,63 @@ class ValidacionDuplicadosViewSet(viewsets.ViewSet):
                 'errores': serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def verificar_lote(self, request):
+        """Verificar una lista de emails y/o documentos con una consulta por tipo"""
+        emails = request.data.get('emails') or []
+        documentos = request.data.get('documentos') or []
+        
+        if not isinstance(emails, list) or not isinstance(documentos, list):
+            return Response({
+                'error': 'emails y documentos deben ser listas'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(emails) + len(documentos) > self.max_lote:
+            return Response({
+                'error': f'Se permiten hasta {self.max_lote} elementos por lote'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        filtros = get_filtros_disponibilidad()
+        
+        # Emails: solo los posibles aciertos del filtro van al IN
+        emails = [normalizar_email(email) for email in emails if isinstance(email, str) and email.strip()]
+        candidatos = [email for email in emails if filtros.email_puede_existir(email)]
+        registrados = set(
+            User.objects.filter(email__in=candidatos).values_list('email', flat=True)
+        ) if candidatos else set()
+        
+        # Documentos: un IN por número y el cruce por clave completa en memoria
+        consultas = []
+        for dato in documentos:
+            if not isinstance(dato, dict) or not str(dato.get('numero_documento', '')).strip():
+                return Response({
+                    'error': 'Cada documento requiere numero_documento'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            consultas.append((
+                dato.get('tipo_documento', TipoDocumento.CI),
+                DocumentoIdentidad.normalizar_numero(str(dato['numero_documento']).strip()),
+                str(dato.get('extension') or '').strip() or None
+            ))
+        
+        numeros = {numero for tipo, numero, extension in consultas
+                   if filtros.documento_puede_existir(tipo, numero, extension)}
+        encontrados = {
+            clave_documento(documento.tipo_documento, documento.numero_documento, documento.extension): documento
+            for documento in documentos_con_titular().filter(numero_documento__in=numeros)
+        } if numeros else {}
+        
+        return Response({
+            'emails': [{
+                'email': email,
+                'existe': email in registrados,
+                'disponible': email not in registrados
+            } for email in emails],
+            'documentos': [
+                respuesta_documento(tipo, numero, extension, encontrados.get(clave_documento(tipo, numero, extension)))
+                for tipo, numero, extension in consultas
+            ]
+        })
+    
     @action(detail=False, methods=['get'])
     def buscar_por_criterio(self, request):
         """Buscar usuarios/socios por diferentes criterios"""
@@ -227,7 +301,7 @@ class ValidacionDuplicadosViewSet(viewsets.ViewSet):
             )
         
         # Limitar resultados
-        usuarios = usuarios_query.select_related('documento_identidad')[:20]
+        usuarios = usuarios_query.select_related('documento_identidad', 'socio_perfil')[:20]
         
         resultados = []
         for usuario in usuarios:
@@ -99,6 +99,14 @@ DATABASES = {
     }
 }
 
+# Caché compartida entre procesos (ej. redis://localhost:6379/1). Sin CACHE_URL
+# cada proceso usa su propia caché en memoria: las cachés de permisos y de
+# usuarios JWT se desactivan y los cubos de throttling y los contadores de
+# logins fallidos quedan por proceso (ver core/cache.py)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 # Configuración alternativa para desarrollo con SQLite
 # Descomenta las siguientes líneas si prefieres usar SQLite para desarrollo
 # DATABASES = {
@@ -128,6 +136,20 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Filtros de Bloom de emails y documentos registrados (apps/usuarios/disponibilidad.py):
+# segundos entre lecturas de altas y cambios, entre reconstrucciones completas y
+# cantidad prevista de filas
+DISPONIBILIDAD_INTERVALO = env.float('DISPONIBILIDAD_INTERVALO', default=5.0)
+DISPONIBILIDAD_RECONSTRUCCION = env.float('DISPONIBILIDAD_RECONSTRUCCION', default=3600.0)
+DISPONIBILIDAD_CAPACIDAD = env.int('DISPONIBILIDAD_CAPACIDAD', default=100000)
+
+# Los permisos de cada usuario se cachean entre requests (PERMISOS_CACHE_TTL
+# segundos, alias de CACHES en PERMISOS_CACHE, que debe ser compartida entre
+# procesos; con LocMemCache no se cachean); ver apps/usuarios/backends.py
+AUTHENTICATION_BACKENDS = ['apps.usuarios.backends.PermisosCacheBackend']
+PERMISOS_CACHE_TTL = env.int('PERMISOS_CACHE_TTL', default=3600)
+PERMISOS_CACHE = env('PERMISOS_CACHE', default='default')
+
 # Internationalization
 LANGUAGE_CODE = 'es'
 TIME_ZONE = 'America/La_Paz'
@@ -149,11 +171,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.auditoria.usuarios_jwt.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Proxies de confianza delante de la aplicación: con 0 la IP del cliente es
+    # REMOTE_ADDR y X-Forwarded-For (que el cliente puede falsear) se ignora
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=0),
 }
 
 # Spectacular settings
@@ -211,16 +236,136 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_REFRESH_SERIALIZER': 'apps.auditoria.usuarios_jwt.TokenRefreshRevocableSerializer',
+}
+
+# Segundos que se reutiliza el usuario de un token JWT sin leerlo de la base de datos
+# (0 desactiva la caché) y alias de CACHES donde se guarda, que debe ser compartida
+# entre procesos (con LocMemCache el usuario se lee en cada request)
+JWT_USUARIO_CACHE_TTL = env.int('JWT_USUARIO_CACHE_TTL', default=300)
+JWT_USUARIO_CACHE = env('JWT_USUARIO_CACHE', default='default')
+# Los endpoints de lectura con ClaimsJWTAuthentication arman el usuario desde
+# los claims del token, sin consultas (los cambios se ven al renovar el token)
+JWT_STATELESS_LECTURA = env.bool('JWT_STATELESS_LECTURA', default=False)
+
+# Throttling por cubo de tokens (core/throttling.py): por scope, ráfaga máxima,
+# recarga ('N/s', 'N/min', 'N/hora', 'N/dia') y clave ('ip' o 'usuario')
+THROTTLE_CUBOS = {
+    'login': {
+        'capacidad': env.int('THROTTLE_LOGIN_CAPACIDAD', default=5),
+        'recarga': env('THROTTLE_LOGIN_RECARGA', default='5/min'),
+        'clave': 'ip',
+    },
+    'validaciones': {
+        'capacidad': env.int('THROTTLE_VALIDACIONES_CAPACIDAD', default=20),
+        'recarga': env('THROTTLE_VALIDACIONES_RECARGA', default='60/min'),
+        'clave': 'ip',
+    },
 }
+# 'local' (memoria de cada proceso) o 'cache' (compartido, alias THROTTLE_CACHE)
+THROTTLE_ALMACEN = env('THROTTLE_ALMACEN', default='local')
+THROTTLE_CACHE = env('THROTTLE_CACHE', default='default')
+
+# Revocación de tokens (apps/auditoria/revocacion.py): segundos entre recargas del
+# filtro de Bloom de cada proceso y cantidad de revocaciones vigentes previstas
+JWT_REVOCACION_INTERVALO = env.float('JWT_REVOCACION_INTERVALO', default=30.0)
+JWT_REVOCACION_CAPACIDAD = env.int('JWT_REVOCACION_CAPACIDAD', default=10000)
+
+# Hasheo de contraseñas del login JWT en un pool acotado de hilos: trabajadores,
+# logins en espera (los demás reciben 503) y segundos máximos de espera
+LOGIN_HASH_WORKERS = env.int('LOGIN_HASH_WORKERS', default=2)
+LOGIN_HASH_QUEUE = env.int('LOGIN_HASH_QUEUE', default=16)
+LOGIN_HASH_TIMEOUT = env.float('LOGIN_HASH_TIMEOUT', default=10.0)
 
 # Configuración de Auditoría
 AUDITORIA_ENABLED = env.bool('AUDITORIA_ENABLED', default=True)
 AUDITORIA_LOG_ANONYMOUS = env.bool('AUDITORIA_LOG_ANONYMOUS', default=False)
 AUDITORIA_LOG_API_CALLS = env.bool('AUDITORIA_LOG_API_CALLS', default=True)
+# Guardar en los UPDATE solo los campos modificados en lugar de dos snapshots completos
+AUDITORIA_DIFF_MODE = env.bool('AUDITORIA_DIFF_MODE', default=False)
+
+# Modelos auditados: 'app_label.Modelo' -> opciones
+#   campos: campos a guardar (por defecto todos)
+#   excluir: campos que no se guardan ('password' se excluye siempre)
+#   acciones: subconjunto de CREATE, UPDATE, DELETE (por defecto las tres)
+AUDITORIA_MODELOS = {
+    'auth.User': {'excluir': ['password']},
+    # 'socios.Socio': {},
+    # 'socios.Aporte': {'acciones': ['CREATE', 'DELETE']},
+    # 'productos.Producto': {'excluir': ['imagen']},
+    # 'inventario.MovimientoInventario': {'acciones': ['CREATE']},
+}
+
+# Escritor de logs de auditoría: 'async' encola y escribe en lote desde un hilo,
+# 'sync' inserta cada log dentro del request (útil para tests)
+AUDITORIA_WRITER_MODE = env('AUDITORIA_WRITER_MODE', default='async')
+AUDITORIA_WRITER_BATCH_SIZE = env.int('AUDITORIA_WRITER_BATCH_SIZE', default=200)
+AUDITORIA_WRITER_FLUSH_INTERVAL = env.float('AUDITORIA_WRITER_FLUSH_INTERVAL', default=2.0)
+AUDITORIA_WRITER_QUEUE_SIZE = env.int('AUDITORIA_WRITER_QUEUE_SIZE', default=10000)
+# Política si la cola se llena: 'block', 'drop' (descarta y cuenta) o 'sync'
+AUDITORIA_WRITER_OVERFLOW = env('AUDITORIA_WRITER_OVERFLOW', default='block')
+AUDITORIA_WRITER_BLOCK_TIMEOUT = env.float('AUDITORIA_WRITER_BLOCK_TIMEOUT', default=5.0)
+
+# Contadores de logins fallidos (ventana deslizante y top de IPs/emails), comunes a
+# todos los procesos si el alias AUDITORIA_FALLIDOS_CACHE es una caché compartida
+AUDITORIA_FALLIDOS_VENTANA_HORAS = env.int('AUDITORIA_FALLIDOS_VENTANA_HORAS', default=24)
+AUDITORIA_FALLIDOS_INTERVALOS = env.int('AUDITORIA_FALLIDOS_INTERVALOS', default=24)
+AUDITORIA_FALLIDOS_CAPACIDAD = env.int('AUDITORIA_FALLIDOS_CAPACIDAD', default=100)
+AUDITORIA_FALLIDOS_CACHE = env('AUDITORIA_FALLIDOS_CACHE', default='default')
+# Fallos en la ventana tras los que el login JWT responde 429 sin verificar la
+# contraseña, por IP y por email (0 sin límite). El límite por email permite a
+# un tercero bloquear una cuenta conocida: activarlo solo si se acepta ese riesgo
+LOGIN_FALLIDOS_MAX_IP = env.int('LOGIN_FALLIDOS_MAX_IP', default=100)
+LOGIN_FALLIDOS_MAX_EMAIL = env.int('LOGIN_FALLIDOS_MAX_EMAIL', default=0)
+
+# Cantidad de User-Agents (texto -> id) en la caché LRU de cada proceso
+AUDITORIA_AGENTES_CACHE_SIZE = env.int('AUDITORIA_AGENTES_CACHE_SIZE', default=1024)
+
+# Segundos entre escrituras en lote de fecha_ultimo_acceso de las sesiones
+# (como máximo una escritura por sesión y proceso en cada intervalo)
+AUDITORIA_SESION_FLUSH_INTERVAL = env.float('AUDITORIA_SESION_FLUSH_INTERVAL', default=60.0)
+
+# Retención de logs de auditoría (comando retencion_auditoria)
+AUDITORIA_RETENCION_DIAS = env.int('AUDITORIA_RETENCION_DIAS', default=365)
+# Periodos específicos por acción, ej: VIEW=30,LOGIN_FAILED=180
+AUDITORIA_RETENCION_POR_ACCION = env.dict(
+    'AUDITORIA_RETENCION_POR_ACCION', cast={'value': int}, default={}
+)
+AUDITORIA_ARCHIVO_DIR = env('AUDITORIA_ARCHIVO_DIR', default=str(BASE_DIR / 'archivo_auditoria'))
 
 # Configuración de Validaciones
 VALIDACION_DUPLICADOS_ENABLED = env.bool('VALIDACION_DUPLICADOS_ENABLED', default=True)
 VALIDACION_DOCUMENTOS_STRICT = env.bool('VALIDACION_DOCUMENTOS_STRICT', default=True)
+# save() de User, DocumentoIdentidad y Socio: 'completa' (full_clean con consultas
+# de unicidad) o 'restricciones' (la unicidad la valida la BD); ver core/validacion.py
+MODELOS_VALIDACION = env('MODELOS_VALIDACION', default='completa')
+# Alta masiva de socios (apps/socios/importacion.py): filas por transacción y
+# procesos para hashear contraseñas (0 = uno por núcleo)
+IMPORTACION_LOTE = env.int('IMPORTACION_LOTE', default=500)
+IMPORTACION_PROCESOS = env.int('IMPORTACION_PROCESOS', default=0)
+# Límites del endpoint POST /socios/importar/; archivos mayores van por el comando
+IMPORTACION_API_MAX_BYTES = env.int('IMPORTACION_API_MAX_BYTES', default=1024 * 1024)
+IMPORTACION_API_MAX_FILAS = env.int('IMPORTACION_API_MAX_FILAS', default=1000)
+# Correo saliente. Para probar el despacho en local sin enviar correos reales:
+# EMAIL_PORT=1025 y "python -m aiosmtpd -n -l localhost:1025"
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = env('EMAIL_HOST', default='localhost')
+EMAIL_PORT = env.int('EMAIL_PORT', default=25)
+EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=False)
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='webmaster@localhost')
+
+# Bandeja de salida de correos (apps/socios/correos.py, comando despachar_correos):
+# correos por conexión, segundos entre ciclos, reintentos con espera exponencial
+# desde CORREOS_REINTENTO_BASE segundos, reserva de un lote en curso y días que
+# se conservan los enviados
+CORREOS_LOTE = env.int('CORREOS_LOTE', default=100)
+CORREOS_INTERVALO = env.float('CORREOS_INTERVALO', default=5.0)
+CORREOS_MAX_INTENTOS = env.int('CORREOS_MAX_INTENTOS', default=5)
+CORREOS_REINTENTO_BASE = env.int('CORREOS_REINTENTO_BASE', default=60)
+CORREOS_RESERVA = env.int('CORREOS_RESERVA', default=300)
+CORREOS_RETENCION_DIAS = env.int('CORREOS_RETENCION_DIAS', default=7)
 
 # Configuración de Logging para PostgreSQL
 LOGGING = {
@@ -19,7 +19,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenRefreshView
-from apps.auditoria.authentication import CustomTokenObtainPairView
+from apps.auditoria.authentication import CustomTokenObtainPairView, RevocarTokenView
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularRedocView,
@@ -33,6 +33,7 @@ urlpatterns = [
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/revocar/', RevocarTokenView.as_view(), name='token_revoke'),
     path('api/usuarios/', include('apps.usuarios.urls')),
     path('api/productos/', include('apps.productos.urls')),
     path('api/inventario/', include('apps.inventario.urls')),
@@ -0,0 +1,52 @@
+"""
+Filtro de Bloom en memoria.
+
+Responde "seguro que no está" o "puede estar": sin falsos negativos y con
+una tasa de falsos positivos acotada por la capacidad con la que se creó.
+Se usa como camino rápido delante de consultas a la base de datos, que
+solo se hacen cuando el filtro responde "puede estar".
+"""
+import hashlib
+import math
+
+
+class FiltroBloom:
+    """Filtro de Bloom de tamaño fijo para claves de texto"""
+
+    def __init__(self, capacidad=10000, tasa_error=0.01):
+        capacidad = max(capacidad, 1)
+        self.capacidad = capacidad
+        self.bits = max(8, math.ceil(-capacidad * math.log(tasa_error) / math.log(2) ** 2))
+        self.funciones = max(1, round(self.bits / capacidad * math.log(2)))
+        self._arreglo = bytearray((self.bits + 7) // 8)
+        self.elementos = 0
+
+    @classmethod
+    def desde(cls, claves, capacidad=10000, tasa_error=0.01):
+        """Crea un filtro con las claves dadas, con lugar para al menos el doble"""
+        claves = list(claves)
+        filtro = cls(max(capacidad, 2 * len(claves)), tasa_error)
+        for clave in claves:
+            filtro.agregar(clave)
+        return filtro
+
+    def _posiciones(self, clave):
+        # Doble hash: las k posiciones salen de dos mitades de un único digest
+        digest = hashlib.blake2b(str(clave).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.funciones)]
+
+    def agregar(self, clave):
+        for posicion in self._posiciones(clave):
+            self._arreglo[posicion >> 3] |= 1 << (posicion & 7)
+        self.elementos += 1
+
+    def __contains__(self, clave):
+        return all(
+            self._arreglo[posicion >> 3] & (1 << (posicion & 7))
+            for posicion in self._posiciones(clave)
+        )
+
+    def __len__(self):
+        return self.elementos
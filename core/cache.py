@@ -0,0 +1,15 @@
+"""
+Cachés compartidas entre procesos.
+
+LocMemCache (la caché de Django sin CACHE_URL) es de cada proceso: lo que
+un worker guarda o invalida no lo ven los demás. Las cachés que otro
+proceso debe poder invalidar (permisos, usuarios JWT) solo se usan sobre
+un backend compartido (Redis, Memcached, base de datos o archivos).
+"""
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def es_compartida(alias='default'):
+    """Indica si lo guardado en la caché `alias` lo ven todos los procesos"""
+    return not isinstance(caches[alias], LocMemCache)
@@ -0,0 +1,36 @@
+"""
+Hasheo de contraseñas en un pool de procesos.
+
+Los hashers de Django consumen CPU por diseño: un lote grande de altas
+se reparte entre procesos para usar todos los núcleos, sin depender de
+que el hasher libere el GIL. Los procesos se crean con 'spawn', seguro
+desde un servidor con hilos, y solo configuran PASSWORD_HASHERS: este
+módulo no importa modelos, así que no hace falta django.setup().
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+
+def _inicializar_proceso(hashers):
+    if not settings.configured:
+        settings.configure(PASSWORD_HASHERS=hashers)
+
+
+def hashear_passwords(passwords, procesos=None):
+    """Hashes de `passwords` en el mismo orden, usando hasta `procesos` procesos"""
+    passwords = list(passwords)
+    procesos = min(procesos or os.cpu_count() or 1, len(passwords))
+    if procesos <= 1:
+        return [make_password(password) for password in passwords]
+
+    with ProcessPoolExecutor(
+        max_workers=procesos,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_inicializar_proceso,
+        initargs=(settings.PASSWORD_HASHERS,),
+    ) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (procesos * 4))))
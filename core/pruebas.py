@@ -0,0 +1,65 @@
+"""
+Utilidades de pruebas compartidas entre apps.
+
+Con ATOMIC_REQUESTS=True (el valor por defecto de config/settings.py) cada
+request abre un SAVEPOINT dentro de la transacción del test y lo libera al
+terminar; lo mismo hace cualquier transaction.atomic() anidado. Esas
+sentencias no son consultas de la vista, así que los presupuestos de
+consultas se miden sin ellas para no depender de ATOMIC_REQUESTS.
+
+CacheCompartidaMixin reemplaza la caché por una en archivos, que como
+Redis o Memcached ven todos los procesos; cache_de_otro_proceso la abre
+desde cero, como lo haría otro worker.
+"""
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.core.cache import CacheHandler
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+PREFIJOS_SAVEPOINT = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def consultas_reales(contexto):
+    """Consultas capturadas sin las sentencias de savepoint"""
+    return [
+        consulta['sql'] for consulta in contexto.captured_queries
+        if not consulta['sql'].lstrip().upper().startswith(PREFIJOS_SAVEPOINT)
+    ]
+
+
+class ConsultasMixin:
+    """Mixin de TestCase con assertNumQueries que ignora los savepoints"""
+
+    @contextmanager
+    def assertNumConsultas(self, cantidad):
+        with CaptureQueriesContext(connection) as contexto:
+            yield contexto
+        consultas = consultas_reales(contexto)
+        self.assertEqual(
+            len(consultas), cantidad,
+            f'{len(consultas)} consultas ejecutadas, se esperaban {cantidad}:\n' + '\n'.join(consultas)
+        )
+
+
+class CacheCompartidaMixin:
+    """Mixin de TestCase con la caché 'default' compartida entre procesos"""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.mkdtemp(prefix='cache-pruebas-')
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        self.enterContext(override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directorio,
+            },
+        }))
+
+
+def cache_de_otro_proceso(alias='default'):
+    """Conexión nueva a la caché, sin nada en común con la del proceso"""
+    return CacheHandler()[alias]
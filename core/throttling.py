@@ -0,0 +1,159 @@
+"""
+Throttling por cubo de tokens.
+
+Cada clave (scope + IP o usuario) tiene un cubo de `capacidad` tokens que
+se recarga a la tasa configurada; cada request consume uno y, sin tokens,
+se rechaza con 429 y Retry-After. El throttle se evalúa en initial() de
+DRF, antes del método de la vista: un request rechazado no llega a la
+base de datos ni al hasher de contraseñas.
+
+Los cubos se guardan en memoria del proceso (THROTTLE_ALMACEN='local') o
+en una caché compartida ('cache', alias THROTTLE_CACHE) usando incr/decr
+atómicos, para que el límite sea común a todos los procesos.
+
+La clave 'ip' sale de get_ident de DRF: REMOTE_ADDR, o X-Forwarded-For
+solo detrás de los NUM_PROXIES proxies de confianza configurados.
+
+Configuración por scope en THROTTLE_CUBOS:
+    {'login': {'capacidad': 5, 'recarga': '5/min', 'clave': 'ip'}}
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+PERIODOS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parsear_recarga(recarga):
+    """'5/min' -> tokens por segundo"""
+    cantidad, periodo = recarga.split('/')
+    return int(cantidad) / PERIODOS[periodo[0]]
+
+
+class AlmacenLocal:
+    """Cubos en memoria del proceso, con a lo sumo `max_claves` claves (LRU)"""
+
+    def __init__(self, max_claves=10000):
+        self.max_claves = max_claves
+        self._cubos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave, capacidad, tasa, ahora=None):
+        """Consume un token. Retorna 0 si se concedió o los segundos de espera"""
+        ahora = time.monotonic() if ahora is None else ahora
+        with self._lock:
+            tokens, ultimo = self._cubos.pop(clave, (capacidad, ahora))
+            tokens = min(capacidad, tokens + (ahora - ultimo) * tasa)
+            if tokens >= 1:
+                tokens -= 1
+                espera = 0
+            else:
+                espera = (1 - tokens) / tasa
+            self._cubos[clave] = (tokens, ahora)
+            while len(self._cubos) > self.max_claves:
+                self._cubos.popitem(last=False)
+        return espera
+
+    def limpiar(self):
+        with self._lock:
+            self._cubos.clear()
+
+
+class AlmacenCache:
+    """
+    Cubos en una caché compartida.
+
+    El cubo se guarda como un contador de tokens consumidos, que se
+    incrementa de forma atómica, y un origen desde el que se acumula la
+    recarga: disponibles = capacidad + tasa * (ahora - origen) - consumidos.
+    Si el cubo excede su capacidad (cubo inactivo) el origen se adelanta.
+    Cada request renueva el TTL de ambas claves: si el origen venciera
+    antes que el consumo, el cubo se recargaría entero.
+    """
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    def consumir(self, clave, capacidad, tasa, ahora=None):
+        ahora = time.time() if ahora is None else ahora
+        cache = caches[self.alias]
+        ttl = math.ceil(capacidad / tasa) + 1
+        clave_consumo, clave_origen = f'cubo:{clave}:consumo', f'cubo:{clave}:origen'
+
+        try:
+            consumidos = cache.incr(clave_consumo)
+        except ValueError:
+            cache.add(clave_consumo, 0, ttl)
+            consumidos = cache.incr(clave_consumo)
+        cache.touch(clave_consumo, ttl)
+
+        # Consumo previo a este request y recarga acumulada desde el origen
+        previos = consumidos - 1
+        origen = cache.get(clave_origen)
+        if origen is None or tasa * (ahora - origen) > previos:
+            origen = ahora - previos / tasa
+            cache.set(clave_origen, origen, ttl)
+        else:
+            cache.touch(clave_origen, ttl)
+
+        disponibles = capacidad + tasa * (ahora - origen) - previos
+        if disponibles >= 1:
+            return 0
+        cache.decr(clave_consumo)
+        return (1 - disponibles) / tasa
+
+    def limpiar(self):
+        caches[self.alias].clear()
+
+
+_almacen = None
+_almacen_lock = threading.Lock()
+
+
+def get_almacen():
+    """Retorna el almacén de cubos del proceso según THROTTLE_ALMACEN"""
+    global _almacen
+
+    if _almacen is None:
+        with _almacen_lock:
+            if _almacen is None:
+                if getattr(settings, 'THROTTLE_ALMACEN', 'local') == 'cache':
+                    _almacen = AlmacenCache(getattr(settings, 'THROTTLE_CACHE', 'default'))
+                else:
+                    _almacen = AlmacenLocal()
+    return _almacen
+
+
+class CuboTokensThrottle(BaseThrottle):
+    """
+    Throttle de DRF por cubo de tokens. El scope sale de
+    `view.throttle_scope`; los scopes sin configuración no se limitan.
+    """
+
+    scope_attr = 'throttle_scope'
+
+    def allow_request(self, request, view):
+        self.espera = None
+        scope = getattr(view, self.scope_attr, None)
+        config = getattr(settings, 'THROTTLE_CUBOS', {}).get(scope)
+        if not config:
+            return True
+
+        clave = f'{scope}:{self.get_clave(request, config.get("clave", "ip"))}'
+        self.espera = get_almacen().consumir(
+            clave, config['capacidad'], parsear_recarga(config['recarga'])
+        )
+        return self.espera == 0
+
+    def get_clave(self, request, tipo):
+        if tipo == 'usuario' and request.user and request.user.is_authenticated:
+            return f'usuario:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def wait(self):
+        return self.espera
@@ -0,0 +1,103 @@
+"""
+Guardado de modelos validado por las restricciones de la base de datos.
+
+Los modelos que llaman full_clean() en save() repiten en cada guardado
+consultas exists() de unicidad que ya cubren las restricciones únicas de
+la base de datos (y, en los endpoints, los serializers). En el modo
+'restricciones' (MODELOS_VALIDACION) save() valida campos y formato sin
+consultas de unicidad, inserta dentro de un savepoint y traduce el
+IntegrityError al mismo ValidationError en español que daría clean().
+
+La validación completa sigue disponible con save(validar=True), con
+MODELOS_VALIDACION='completa' o llamando full_clean() (formularios y
+admin), que siempre incluye las consultas de unicidad.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+
+# SQLSTATE de PostgreSQL para unique_violation
+UNIQUE_VIOLATION = '23505'
+
+
+def restriccion_unica_violada(error):
+    """
+    Nombre de la restricción única (PostgreSQL) o texto del error (SQLite),
+    o None si el IntegrityError no es de unicidad: los nombres de las FK
+    comienzan igual que los de las restricciones únicas de la misma columna.
+    """
+    causa = error.__cause__
+    codigo = getattr(causa, 'sqlstate', None) or getattr(causa, 'pgcode', None)
+    if codigo:
+        if codigo != UNIQUE_VIOLATION:
+            return None
+        return getattr(getattr(causa, 'diag', None), 'constraint_name', None)
+    mensaje = str(error)
+    return mensaje if mensaje.startswith('UNIQUE constraint failed') else None
+
+
+class ValidacionPorRestriccionesMixin:
+    """
+    Mixin de modelo para save() con validación completa o por restricciones.
+
+    Los modelos declaran en `validar_unicidad()` sus consultas de unicidad
+    (llamada desde clean() solo si `validacion_completa`) y en
+    `errores_integridad()` los pares (identificadores, errores) con que se
+    traduce un IntegrityError: los identificadores son nombres de
+    restricción o columnas 'tabla.columna' tal como los informa la base.
+    """
+
+    validacion_completa = True
+
+    def validar_unicidad(self):
+        pass
+
+    def errores_integridad(self):
+        return []
+
+    def save(self, *args, validar=None, savepoint=True, **kwargs):
+        """
+        `savepoint=False` omite el savepoint cuando quien llama descarta la
+        transacción completa ante un error (p. ej. un alta de varios modelos).
+        """
+        if validar is None:
+            validar = getattr(settings, 'MODELOS_VALIDACION', 'completa') == 'completa'
+
+        if validar:
+            self.full_clean()
+            super().save(*args, **kwargs)
+            return
+
+        # Las FK con la instancia ya asignada las valida la restricción de la BD
+        relaciones = [
+            campo.name for campo in self._meta.concrete_fields
+            if (campo.many_to_one or campo.one_to_one)
+            and campo.is_cached(self) and getattr(self, campo.attname) is not None
+        ]
+
+        self.validacion_completa = False
+        try:
+            self.full_clean(exclude=relaciones, validate_unique=False, validate_constraints=False)
+        finally:
+            del self.validacion_completa
+
+        try:
+            # Savepoint: el IntegrityError no invalida la transacción externa
+            with transaction.atomic(using=kwargs.get('using'), savepoint=savepoint):
+                super().save(*args, **kwargs)
+        except IntegrityError as error:
+            traducido = self.traducir_integridad(error)
+            if traducido is None:
+                raise
+            raise traducido from error
+
+    def traducir_integridad(self, error):
+        """ValidationError equivalente al IntegrityError, o None si no se reconoce"""
+        violada = restriccion_unica_violada(error)
+        if not violada:
+            return None
+        for identificadores, errores in self.errores_integridad():
+            if any(identificador in violada for identificador in identificadores):
+                return ValidationError(errores)
+        return None